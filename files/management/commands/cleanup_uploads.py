@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from azure.core.exceptions import ResourceNotFoundError
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from files.models import UploadSession
+from files.services import AzureBlobService
+
+
+class Command(BaseCommand):
+    help = "Delete expired direct uploads and the blobs their upload URLs could write"
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=settings.UPLOAD_SESSION_RETENTION_HOURS)
+        # Finished uploads are included: their upload URL may have recreated
+        # the blob after it was copied out
+        expired = UploadSession.objects.filter(expires_at__lt=cutoff)
+
+        blob_service = AzureBlobService()
+        count = 0
+        for session in expired:
+            try:
+                blob_service.delete(session.blob_name)
+            except ResourceNotFoundError:
+                pass
+            session.delete()
+            count += 1
+
+        self.stdout.write(f"Deleted {count} expired upload(s)")
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0002_rename_extention_audiofile_extension'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audiofile',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='SHA-256 digest of the file content', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='audiofile',
+            name='blob_name',
+            field=models.CharField(blank=True, help_text='Blob holding the content, shared by identical uploads', max_length=255, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='audiofile',
+            index=models.Index(fields=['content_hash'], name='files_audio_content_hash_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0003_audiofile_content_hash_blob_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='audiofile',
+            index=models.Index(fields=['user', '-uploaded_at', '-id'], name='files_audio_user_uploaded_idx'),
+        ),
+    ]
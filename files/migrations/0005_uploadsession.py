@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:03
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0004_audiofile_user_uploaded_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Unique identifier for the upload', primary_key=True, serialize=False)),
+                ('name', models.CharField(help_text='Name of the audio file', max_length=255)),
+                ('extension', models.CharField(help_text='File extension (e.g., mp3, wav)', max_length=10)),
+                ('size', models.PositiveIntegerField(help_text='Size of the audio file in bytes, as declared by the client')),
+                ('blob_name', models.CharField(help_text='Blob reserved for the upload', max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('expires_at', models.DateTimeField(help_text='When the upload URL stops accepting writes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0005_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField(help_text='Position of the block in the file')),
+                ('size', models.PositiveIntegerField(help_text='Size of the block in bytes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocks', to='files.uploadsession')),
+            ],
+            options={
+                'ordering': ['index'],
+                'unique_together': {('session', 'index')},
+            },
+        ),
+    ]
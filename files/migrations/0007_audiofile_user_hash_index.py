@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 21:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0006_uploadblock'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='audiofile',
+            name='files_audio_content_hash_idx',
+        ),
+        migrations.AlterField(
+            model_name='audiofile',
+            name='blob_name',
+            field=models.CharField(blank=True, help_text="Blob holding the content, shared by the user's identical uploads", max_length=255, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='audiofile',
+            index=models.Index(fields=['user', 'content_hash'], name='files_audio_user_hash_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 21:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0007_audiofile_user_hash_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadblock',
+            name='digest',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 digest of the block', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='audiofile',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='Digest identifying the file content, for deduplication', max_length=64, null=True),
+        ),
+    ]
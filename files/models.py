@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.contrib.auth.models import User as AuthUser
 
@@ -13,6 +14,10 @@ class AudioFile(models.Model):
         max_length=10, help_text="File extension (e.g., mp3, wav)")
     durtion_seconds = models.PositiveIntegerField(
         help_text="Duration of the audio file in seconds")
+    content_hash = models.CharField(
+        max_length=64, blank=True, null=True, help_text="Digest identifying the file content, for deduplication")
+    blob_name = models.CharField(
+        max_length=255, blank=True, null=True, help_text="Blob holding the content, shared by the user's identical uploads")
 
     user = models.ForeignKey('auth.User', on_delete=models.CASCADE)
 
@@ -25,3 +30,70 @@ class AudioFile(models.Model):
         verbose_name = "Audio File"
         verbose_name_plural = "Audio Files"
         ordering = ['-uploaded_at']
+        indexes = [
+            # Duplicates are only looked up among a user's own files
+            models.Index(fields=['user', 'content_hash'],
+                         name='files_audio_user_hash_idx'),
+            # Backs the keyset pagination of a user's files
+            models.Index(fields=['user', '-uploaded_at', '-id'],
+                         name='files_audio_user_uploaded_idx'),
+        ]
+
+
+class UploadSession(models.Model):
+    """
+    A blob name reserved for an upload that the client sends straight to
+    Azure Blob Storage. The AudioFile is created when the upload is finalized.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4,
+                          editable=False, help_text="Unique identifier for the upload")
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE)
+    name = models.CharField(max_length=255, help_text="Name of the audio file")
+    extension = models.CharField(
+        max_length=10, help_text="File extension (e.g., mp3, wav)")
+    size = models.PositiveIntegerField(
+        help_text="Size of the audio file in bytes, as declared by the client")
+    blob_name = models.CharField(
+        max_length=255, help_text="Blob reserved for the upload")
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    expires_at = models.DateTimeField(
+        help_text="When the upload URL stops accepting writes")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class UploadBlock(models.Model):
+    """
+    A block of an upload that has been staged in blob storage but not yet
+    committed. Clients use the recorded blocks to resume an upload.
+    """
+    session = models.ForeignKey(
+        UploadSession, on_delete=models.CASCADE, related_name='blocks')
+    index = models.PositiveIntegerField(help_text="Position of the block in the file")
+    size = models.PositiveIntegerField(help_text="Size of the block in bytes")
+    digest = models.CharField(
+        max_length=64, blank=True, default='', help_text="SHA-256 digest of the block")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Block {self.index} of upload {self.session_id}"
+
+    class Meta:
+        ordering = ['index']
+        unique_together = ('session', 'index')
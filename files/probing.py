@@ -0,0 +1,93 @@
+import io
+
+from mutagen import File
+
+# Bytes kept from each end of the upload to probe its duration
+PROBE_HEAD_BYTES = 1024 * 1024
+PROBE_TAIL_BYTES = 1024 * 1024
+
+
+def looks_like_audio(extension, head):
+    """
+    Check the leading bytes of a file against the signature of its format.
+    """
+    if extension == 'mp3':
+        return head[:3] == b'ID3' or (head[0] == 0xFF and head[1] & 0xE0 == 0xE0)
+    if extension == 'wav':
+        return head[:4] == b'RIFF' and head[8:12] == b'WAVE'
+    if extension == 'ogg':
+        return head[:4] == b'OggS'
+    if extension == 'flac':
+        return head[:4] == b'fLaC' or head[:3] == b'ID3'
+    if extension == 'm4a':
+        return head[4:8] == b'ftyp'
+    return False
+
+
+class ProbeFile(io.RawIOBase):
+    """
+    Read-only file that holds only the head and tail of a larger file and
+    reads as zeros in between. Enough for mutagen to read the headers and
+    trailing index of common audio formats without keeping the whole file.
+    """
+
+    def __init__(self, head, tail, size):
+        self.head = bytes(head)
+        self.tail = bytes(tail)
+        self.size = size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = max(0, offset)
+        return self.position
+
+    def readinto(self, buffer):
+        start = self.position
+        end = min(self.size, start + len(buffer))
+        if end <= start:
+            return 0
+
+        tail_start = self.size - len(self.tail)
+        view = memoryview(buffer)
+        view[:end - start] = bytes(end - start)
+        if start < len(self.head):
+            head_end = min(end, len(self.head))
+            view[:head_end - start] = self.head[start:head_end]
+        if end > tail_start:
+            tail_from = max(start, tail_start)
+            view[tail_from - start:end - start] = self.tail[tail_from - tail_start:end - tail_start]
+
+        self.position = end
+        return end - start
+
+
+def probe_duration(head, tail, size):
+    """
+    Read the duration of a ``size``-byte audio file from its first and last
+    bytes, or return None if it cannot be read.
+    """
+    if size <= len(head) + len(tail):
+        # Head and tail overlap, so together they hold the whole file
+        probe = io.BytesIO(bytes(head) + bytes(tail[len(head) + len(tail) - size:]))
+    else:
+        probe = io.BufferedReader(ProbeFile(head, tail, size))
+    try:
+        audio = File(probe)
+    except Exception:
+        return None
+    if audio is None:
+        return None
+    return audio.info.length
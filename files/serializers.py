@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import AudioFile
+from .models import AudioFile, UploadSession
 from users.serializers import UserSerializer
 
 
@@ -11,3 +11,30 @@ class AudioFileSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'size', 'extension',
                   'durtion_seconds', 'user', 'uploaded_at')
         read_only_fields = ('id', 'user', 'uploaded_at')
+
+
+class AudioFileListQuerySerializer(serializers.Serializer):
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        required=False, default=50, min_value=1, max_value=200)
+    uploaded_after = serializers.DateTimeField(required=False)
+    uploaded_before = serializers.DateTimeField(required=False)
+    name = serializers.CharField(required=False, max_length=255)
+
+
+class UploadStartSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    received_blocks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ('id', 'name', 'size', 'extension', 'status', 'expires_at',
+                  'received_blocks')
+        read_only_fields = fields
+
+    def get_received_blocks(self, obj):
+        return [block.index for block in obj.blocks.all()]
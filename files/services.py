@@ -1,24 +1,61 @@
-from .models import AudioFile
+from .models import AudioFile, UploadBlock, UploadSession
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.db.models import Q, Sum
 from datetime import datetime, timedelta
 from django.utils import timezone
-from azure.storage.blob import BlobServiceClient, ContentSettings, generate_blob_sas, BlobSasPermissions
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceModifiedError, ResourceNotFoundError
+from azure.storage.blob import BlobBlock, ContentSettings, generate_blob_sas, BlobSasPermissions
 from django.conf import settings
-import environ
+from functools import cached_property
+from meetingscribe.clients import (get_async_blob_container_client,
+                                   get_blob_container_client, get_blob_sas_settings)
+from collections import OrderedDict
+from datetime import timezone as dt_timezone
+import base64
+import hashlib
+import json
+import math
+import threading
+import tempfile
 import uuid
 from mutagen import File
 from users.services import UserQuotaService
+from .probing import PROBE_HEAD_BYTES, PROBE_TAIL_BYTES, looks_like_audio, probe_duration
 
-# Use the same environment instance as Django settings
-env = environ.Env()
+ALLOWED_EXTENSIONS = ['mp3', 'wav', 'ogg', 'flac', 'm4a']
+MAX_AUDIO_FILE_SIZE = 50 * 1024 * 1024
+BLOB_DIR_ROOT = "meetingscribe/"
+
+# Signed URLs per (blob name, content disposition, expiry), in LRU order
+_sas_url_cache = OrderedDict()
+_sas_url_cache_lock = threading.Lock()
+
+
+class StreamedAudioUpload(UploadedFile):
+    """
+    An upload whose bytes were staged in blob storage as uncommitted blocks
+    while the request body was received (see files.upload_handlers). It
+    carries what was learned on the way: digest, duration and block ids.
+    """
+
+    def __init__(self, name, size, content_type, upload_id, blob_name, block_ids,
+                 content_hash, duration_seconds):
+        super().__init__(file=None, name=name, content_type=content_type, size=size)
+        self.upload_id = upload_id
+        self.blob_name = blob_name
+        self.block_ids = block_ids
+        self.content_hash = content_hash
+        self.duration_seconds = duration_seconds
 
 
 class AzureBlobService:
-    def __init__(self):
-        self.connection_string = env('AZURE_BLOB_CONNECTION_STRING')
-        self.client = BlobServiceClient.from_connection_string(
-            self.connection_string)
-        self.container = self.client.get_container_client(
-            env('AZURE_STORAGE_CONTAINER_NAME'))
+
+    @cached_property
+    def container(self):
+        # Shared by the whole process, see meetingscribe.clients
+        return get_blob_container_client()
 
     def upload(self, blob_name, file, content_type="application/octet-stream"):
         print(f"Uploading file to Azure Blob Storage: {blob_name}")
@@ -32,114 +69,598 @@ class AzureBlobService:
     def delete(self, blob_name):
         self.container.delete_blob(blob_name)
 
-    def generate_sas_url(self, blob_name, content_disposition=None, expiry_minutes=15):
+    def get_block_id(self, index):
+        # Azure requires every block id of a blob to have the same length
+        return base64.b64encode(f"block-{index:08d}".encode()).decode()
+
+    def stage_block(self, blob_name, block_id, data):
+        self.container.get_blob_client(blob_name).stage_block(
+            block_id, data, length=len(data))
+
+    def commit_blocks(self, blob_name, block_ids):
+        """
+        Assemble previously staged blocks, in the given order, into the blob.
+        """
+        self.container.get_blob_client(blob_name).commit_block_list(
+            [BlobBlock(block_id=block_id) for block_id in block_ids])
+
+    def get_size(self, blob_name):
+        """
+        Return the size of a blob in bytes, or None if it does not exist.
+        """
+        properties = self.get_properties(blob_name)
+        return properties.size if properties else None
+
+    def get_properties(self, blob_name):
+        try:
+            return self.container.get_blob_client(blob_name).get_blob_properties()
+        except ResourceNotFoundError:
+            return None
+
+    def download_range(self, blob_name, offset, length, etag):
+        """
+        Read ``length`` bytes from ``offset``, failing with
+        ResourceModifiedError if the blob no longer has ``etag``.
+        """
+        return self.container.get_blob_client(blob_name).download_blob(
+            offset=offset, length=length, etag=etag,
+            match_condition=MatchConditions.IfNotModified).readall()
+
+    def copy_blob(self, source_name, target_name, source_etag):
+        """
+        Copy a blob server-side, provided it still has ``source_etag``.
+        Raises ResourceModifiedError otherwise.
+        """
+        source_url = self.generate_sas_url(source_name, expiry_minutes=5)
+        self.container.get_blob_client(target_name).upload_blob_from_url(
+            source_url, source_etag=source_etag,
+            source_match_condition=MatchConditions.IfNotModified)
+
+    def download_to_stream(self, blob_name, stream):
+        """
+        Copy a blob into ``stream`` one chunk at a time and rewind it.
+        """
+        downloader = self.container.get_blob_client(
+            blob_name).download_blob(max_concurrency=1)
+        for chunk in downloader.chunks():
+            stream.write(chunk)
+        stream.seek(0)
+        return stream
+
+    async def adownload_to_stream(self, blob_name, stream):
+        """
+        Async version of download_to_stream, for the ASGI views.
+        """
+        downloader = await get_async_blob_container_client().get_blob_client(
+            blob_name).download_blob(max_concurrency=1)
+        async for chunk in downloader.chunks():
+            stream.write(chunk)
+        stream.seek(0)
+        return stream
+
+    def generate_sas_url(self, blob_name, content_disposition=None, expiry_minutes=None):
+        """
+        Return a read-only SAS URL for a blob.
+
+        URLs are cached and reused until BLOB_SAS_REFRESH_MARGIN_SECONDS
+        before they expire. Expiry times are rounded up to a multiple of that
+        margin, so every worker signs the same URL for the same window and
+        browsers and CDNs can cache the download.
+        """
+        expiry_minutes = expiry_minutes or settings.BLOB_SAS_EXPIRY_MINUTES
+        key = (blob_name, content_disposition, expiry_minutes)
+        now = timezone.now()
+        margin = settings.BLOB_SAS_REFRESH_MARGIN_SECONDS
+
+        with _sas_url_cache_lock:
+            cached = _sas_url_cache.get(key)
+            if cached and cached[1] - timedelta(seconds=margin) > now:
+                _sas_url_cache.move_to_end(key)
+                return cached[0]
+
+        expiry_timestamp = (now + timedelta(minutes=expiry_minutes)).timestamp()
+        expiry = datetime.fromtimestamp(
+            math.ceil(expiry_timestamp / margin) * margin, tz=dt_timezone.utc)
+
         blob_client = self.container.get_blob_client(blob_name)
 
         # Create SAS token with content disposition
         sas_token = generate_blob_sas(
-            account_name=env('AZURE_STORAGE_ACCOUNT_NAME'),
-            container_name=env('AZURE_STORAGE_CONTAINER_NAME'),
             blob_name=blob_name,
-            account_key=env('AZURE_STORAGE_KEY'),
             permission=BlobSasPermissions(read=True),
-            expiry=timezone.now() + timedelta(minutes=expiry_minutes),
-            content_disposition=content_disposition  # Add content disposition
+            expiry=expiry,
+            content_disposition=content_disposition,  # Add content disposition
+            **get_blob_sas_settings()
         )
 
         # Construct the full URL with SAS token
+        url = f"{blob_client.url}?{sas_token}"
+
+        with _sas_url_cache_lock:
+            _sas_url_cache[key] = (url, expiry)
+            _sas_url_cache.move_to_end(key)
+            while len(_sas_url_cache) > settings.BLOB_SAS_CACHE_SIZE:
+                _sas_url_cache.popitem(last=False)
+        return url
+
+    def generate_upload_sas_url(self, blob_name, expiry):
+        """
+        Return a write-only SAS URL that lets a client upload ``blob_name``
+        directly to Azure until ``expiry``.
+        """
+        blob_client = self.container.get_blob_client(blob_name)
+        sas_token = generate_blob_sas(
+            blob_name=blob_name,
+            permission=BlobSasPermissions(create=True, write=True),
+            expiry=expiry,
+            **get_blob_sas_settings()
+        )
         return f"{blob_client.url}?{sas_token}"
 
 
 class AudioFileService:
 
     def __init__(self, user):
-        self.azure_blob_service = AzureBlobService()
         self.user = user
-        self.dir_root = "meetingscribe/"
+        self.dir_root = BLOB_DIR_ROOT
+
+    @cached_property
+    def azure_blob_service(self):
+        return AzureBlobService()
 
     def upload_audio_file(self, audio_file):
         if not audio_file:
             raise ValueError("No audio file provided")
         print("Uploading audio file...")
 
+        extension = self.validate_upload(audio_file.name, audio_file.size)
+        streamed = isinstance(audio_file, StreamedAudioUpload)
+
+        # Identical content that is already stored can share its blob
+        if streamed:
+            content_hash = audio_file.content_hash
+        else:
+            content_hash = self.compute_content_hash(audio_file)
+        duplicate = self.find_duplicate(content_hash)
+
+        if duplicate:
+            duraton_seconds = duplicate.durtion_seconds
+            print(f"Duplicate of audio file {duplicate.id}, reusing its blob")
+        elif streamed:
+            # Probed from the head and tail of the stream as it arrived
+            if audio_file.duration_seconds is None:
+                raise ValueError("Could not read the audio file")
+            duraton_seconds = audio_file.duration_seconds
+        else:
+            # check autio file duration is less than maximum allowed duration
+            duraton_seconds = self.read_duration(audio_file)
+            print("Audio file duration in seconds:", duraton_seconds)
+
+        # Hold the quota while the slow blob upload runs, so concurrent
+        # uploads from the same user cannot overshoot it
+        quota_service = UserQuotaService(self.user)
+        reservation = quota_service.reserve(duraton_seconds / 60)
+
+        try:
+            # Create a unique blob name
+            unique_id = str(uuid.uuid4())
+            if duplicate:
+                # Blocks staged for a streamed upload are never committed and
+                # are discarded by Azure
+                blob_name = self.get_blob_name(duplicate)
+            elif streamed:
+                unique_id = audio_file.upload_id
+                blob_name = audio_file.blob_name
+                self.azure_blob_service.commit_blocks(
+                    blob_name, audio_file.block_ids)
+            else:
+                blob_name = f"{self.dir_root}{unique_id}.{extension}"
+                print(f"Blob name: {blob_name}")
+
+                # Upload the file to Azure Blob Storage
+                try:
+                    url = self.azure_blob_service.upload(blob_name, audio_file)
+
+                except Exception as e:
+                    print("Azure upload error:", str(e))
+                    raise
+
+                print(f"File uploaded to Azure Blob Storage: {url}")
+                if not url:
+                    raise ValueError(
+                        "Failed to upload audio file to Azure Blob Storage")
+
+            with transaction.atomic():
+                audio_file_record = self.save_audio_file(
+                    unique_id=unique_id,
+                    name=audio_file.name,
+                    size=audio_file.size,
+                    extension=extension,
+                    duration_seconds=duraton_seconds,
+                    content_hash=content_hash,
+                    blob_name=blob_name
+                )
+                quota_service.commit(reservation)
+        except BaseException:
+            quota_service.release(reservation)
+            raise
+
+        return audio_file_record
+
+    def validate_upload(self, name, size):
+        """
+        Check the file name and size of an upload and return its extension.
+        """
         # check file extension
-        if not audio_file.name:
+        if not name:
             raise ValueError("Audio file name is required")
-        if '.' not in audio_file.name:
+        if '.' not in name:
             raise ValueError("Audio file name must have an extension")
-        extension = audio_file.name.split('.')[-1].lower()
-        if extension not in ['mp3', 'wav', 'ogg', 'flac', 'm4a']:
+        extension = name.split('.')[-1].lower()
+        if extension not in ALLOWED_EXTENSIONS:
             raise ValueError("Unsupported audio file format")
 
         # chek file size is less than 50MB
-        if audio_file.size > 50 * 1024 * 1024:  #
+        if size > MAX_AUDIO_FILE_SIZE:
             raise ValueError("Audio file size exceeds 50MB limit")
+        return extension
 
-        # check autio file duration is less than maximum allowed duration
+    def read_duration(self, audio_file):
         audio = File(audio_file)
-        duraton_seconds = audio.info.length
-        print("Audio file duration in seconds:", duraton_seconds)
+        if audio is None:
+            raise ValueError("Could not read the audio file")
 
         # Reset file pointer to start
         audio_file.seek(0)
+        return audio.info.length
 
-        user_quota_service = UserQuotaService(self.user)
-        user_quota = user_quota_service.get_quota()
-        print("User quota:", user_quota)
-        if duraton_seconds > (user_quota.max_minutes - user_quota.used_minutes) * 60:
-            raise ValueError("Audio file duration exceeds user's limit")
-
-        # Create a unique blob name
-        unique_id = str(uuid.uuid4())
-        blob_name = f"{self.dir_root}{unique_id}.{extension}"
-        print(f"Blob name: {blob_name}")
-
-        # Upload the file to Azure Blob Storage
-        try:
-            url = self.azure_blob_service.upload(blob_name, audio_file)
-
-        except Exception as e:
-            print("Azure upload error:", str(e))
-            raise
-
-        print(f"File uploaded to Azure Blob Storage: {url}")
-        if not url:
-            raise ValueError(
-                "Failed to upload audio file to Azure Blob Storage")
-
+    def save_audio_file(self, unique_id, name, size, extension, duration_seconds,
+                        content_hash, blob_name):
         # Save the file metadata to the database
         audio_file_record = AudioFile.objects.create(
             id=unique_id,
-            name=audio_file.name,
-            size=audio_file.size,
+            name=name,
+            size=size,
             extension=extension,
-            durtion_seconds=duraton_seconds,
+            durtion_seconds=duration_seconds,
+            content_hash=content_hash,
+            blob_name=blob_name,
             user=self.user,
             uploaded_at=timezone.now()
         )
-
-        # Update user's quota
-        user_quota_service.update_quota(duraton_seconds / 60)
         return audio_file_record
 
     def get_audio_file_url(self, audioFile_id):
         try:
             audio_file = AudioFile.objects.get(
                 id=audioFile_id, user=self.user)
-            blob_name = f"{self.dir_root}{audio_file.id}.{audio_file.extension}"
-            return self.azure_blob_service.generate_sas_url(blob_name)
+            return self.get_playback_url(audio_file)
 
         except AudioFile.DoesNotExist:
             raise ValueError("Audio File not found")
 
+    async def aget_audio_file_url(self, audioFile_id):
+        audio_file = await self.aget_audio_file_by_id(audioFile_id)
+        # Signing is local, so this does not block the event loop
+        return self.get_playback_url(audio_file)
+
+    def get_playback_url(self, audio_file):
+        blob_name = self.get_blob_name(audio_file)
+        return self.azure_blob_service.generate_sas_url(blob_name)
+
+    def compute_content_hash(self, audio_file):
+        digest = hashlib.sha256()
+        if hasattr(audio_file, 'chunks'):
+            chunks = audio_file.chunks()
+        else:
+            chunks = iter(lambda: audio_file.read(
+                settings.BLOB_DOWNLOAD_CHUNK_BYTES), b'')
+        for chunk in chunks:
+            digest.update(chunk)
+        audio_file.seek(0)
+        return digest.hexdigest()
+
+    def find_duplicate(self, content_hash):
+        """
+        Return one of the user's own audio files with the same content, if
+        any. Other users' files are never matched, so nothing derived from
+        them can reach this user.
+        """
+        return AudioFile.objects.filter(
+            user=self.user, content_hash=content_hash).order_by('uploaded_at').first()
+
+    def get_blob_name(self, audio_file):
+        # Files uploaded before deduplication have no stored blob name
+        if audio_file.blob_name:
+            return audio_file.blob_name
+        return f"{self.dir_root}{audio_file.id}.{audio_file.extension}"
+
+    def open_audio_stream(self, audio_file):
+        """
+        Download an audio file straight from blob storage into a spooled
+        buffer. It stays in memory up to AUDIO_SPOOL_MAX_BYTES and spills to
+        a temporary file above that, so peak memory does not grow with the
+        file size. The caller is responsible for closing the stream.
+        """
+        return self.open_blob_stream(self.get_blob_name(audio_file))
+
+    def open_blob_stream(self, blob_name):
+        stream = tempfile.SpooledTemporaryFile(
+            max_size=settings.AUDIO_SPOOL_MAX_BYTES)
+        try:
+            self.azure_blob_service.download_to_stream(blob_name, stream)
+        except Exception:
+            stream.close()
+            raise
+        return stream
+
+    async def aopen_audio_stream(self, audio_file):
+        """
+        Async version of open_audio_stream, for the ASGI views.
+        """
+        stream = tempfile.SpooledTemporaryFile(
+            max_size=settings.AUDIO_SPOOL_MAX_BYTES)
+        try:
+            await self.azure_blob_service.adownload_to_stream(
+                self.get_blob_name(audio_file), stream)
+        except Exception:
+            stream.close()
+            raise
+        return stream
+
     def get_user_audio_files(self):
-        audio_files = AudioFile.objects.filter(user=self.user)
+        audio_files = AudioFile.objects.filter(
+            user=self.user).select_related('user')
 
         return audio_files
 
+    def list_audio_files(self, cursor=None, limit=50, uploaded_after=None,
+                         uploaded_before=None, name=None):
+        """
+        Return one page of the user's audio files, newest first, and the
+        cursor of the next page (None on the last page).
+
+        Pages are keyed on (uploaded_at, id) rather than offsets, so each page
+        is a range scan on the (user, uploaded_at, id) index however deep the
+        client pages.
+        """
+        audio_files = self.get_user_audio_files().order_by('-uploaded_at', '-id')
+
+        if uploaded_after:
+            audio_files = audio_files.filter(uploaded_at__gte=uploaded_after)
+        if uploaded_before:
+            audio_files = audio_files.filter(uploaded_at__lt=uploaded_before)
+        if name:
+            audio_files = audio_files.filter(name__icontains=name)
+        if cursor:
+            uploaded_at, last_id = self._decode_cursor(cursor)
+            audio_files = audio_files.filter(
+                Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=last_id))
+
+        page = list(audio_files[:limit + 1])
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = self._encode_cursor(page[-1])
+        return page, next_cursor
+
+    def _encode_cursor(self, audio_file):
+        position = [audio_file.uploaded_at.isoformat(), audio_file.id]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def _decode_cursor(self, cursor):
+        try:
+            uploaded_at, last_id = json.loads(
+                base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(uploaded_at), last_id
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+
     def get_audio_file_by_id(self, audioFile_id):
         try:
             audio_file = AudioFile.objects.get(id=audioFile_id, user=self.user)
             return audio_file
         except AudioFile.DoesNotExist:
             raise ValueError("Audio File not found")
+
+    async def aget_audio_file_by_id(self, audioFile_id):
+        try:
+            return await AudioFile.objects.aget(id=audioFile_id, user=self.user)
+        except AudioFile.DoesNotExist:
+            raise ValueError("Audio File not found")
+
+
+class UploadSessionService:
+    """
+    Direct-to-blob uploads. The client gets a short-lived, write-only SAS URL
+    for a reserved blob and sends the file to Azure itself; finalizing the
+    upload verifies the blob and creates the AudioFile record.
+
+    The SAS URL can rewrite its blob until it expires, so the AudioFile never
+    points at it: the verified version is copied server-side to the blob
+    from ``get_final_blob_name``. Blocks sent through the API are staged
+    straight into that blob, which no SAS URL covers.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def audio_file_service(self):
+        return AudioFileService(self.user)
+
+    def start_upload(self, name, size):
+        extension = self.audio_file_service.validate_upload(name, size)
+
+        # The duration is only known after the upload, so reject users
+        # with no quota left before they send anything
+        if not UserQuotaService(self.user).has_remaining():
+            raise ValueError("User's quota is used up")
+
+        upload_id = uuid.uuid4()
+        session = UploadSession.objects.create(
+            id=upload_id,
+            user=self.user,
+            name=name,
+            extension=extension,
+            size=size,
+            blob_name=f"{self.audio_file_service.dir_root}incoming/{upload_id}.{extension}",
+            expires_at=timezone.now() + timedelta(minutes=settings.UPLOAD_SAS_EXPIRY_MINUTES)
+        )
+        upload_url = self.audio_file_service.azure_blob_service.generate_upload_sas_url(
+            session.blob_name, session.expires_at)
+        return session, upload_url
+
+    def get_final_blob_name(self, session):
+        return f"{self.audio_file_service.dir_root}{session.id}.{session.extension}"
+
+    def get_session(self, upload_id):
+        try:
+            return UploadSession.objects.get(
+                id=upload_id, user=self.user, status=UploadSession.STATUS_PENDING)
+        except (UploadSession.DoesNotExist, ValueError):
+            raise ValueError("Upload not found")
+
+    def stage_block(self, upload_id, index, data):
+        """
+        Stage one block of an upload. Blocks can be sent in any order and
+        concurrently; sending a block again replaces it.
+        """
+        session = self.get_session(upload_id)
+        if not data:
+            raise ValueError("Block is empty")
+        if len(data) > settings.UPLOAD_BLOCK_MAX_BYTES:
+            raise ValueError("Block exceeds the maximum block size")
+        if index >= settings.UPLOAD_MAX_BLOCKS:
+            raise ValueError("Block index is out of range")
+
+        received = session.blocks.exclude(index=index).aggregate(
+            total=Sum('size'))['total'] or 0
+        if received + len(data) > MAX_AUDIO_FILE_SIZE:
+            raise ValueError("Audio file size exceeds 50MB limit")
+
+        blob_service = self.audio_file_service.azure_blob_service
+        blob_service.stage_block(
+            self.get_final_blob_name(session), blob_service.get_block_id(index), data)
+        # Hashed here, so finalizing does not have to read the file back
+        block, _ = UploadBlock.objects.update_or_create(
+            session=session, index=index,
+            defaults={'size': len(data), 'digest': hashlib.sha256(data).hexdigest()})
+        return block
+
+    def finalize_upload(self, upload_id):
+        session = self.get_session(upload_id)
+        blob_service = self.audio_file_service.azure_blob_service
+        final_blob_name = self.get_final_blob_name(session)
+
+        # Uploads sent as blocks through the API are assembled in place
+        blocks = list(session.blocks.values_list('index', 'digest'))
+        if blocks:
+            if [index for index, _ in blocks] != list(range(len(blocks))):
+                raise ValueError("Upload is missing blocks")
+            blob_service.commit_blocks(
+                final_blob_name, [blob_service.get_block_id(index) for index, _ in blocks])
+            source_blob_name = final_blob_name
+        else:
+            source_blob_name = session.blob_name
+
+        properties = blob_service.get_properties(source_blob_name)
+        if properties is None:
+            raise ValueError("Uploaded file not found")
+
+        quota_service = UserQuotaService(self.user)
+        try:
+            duration_seconds = self._verify_blob(session, source_blob_name, properties)
+            reservation = quota_service.reserve(duration_seconds / 60)
+        except ValueError:
+            # The upload can never be accepted, so don't keep its bytes
+            blob_service.delete(source_blob_name)
+            UploadSession.objects.filter(id=session.id).update(
+                status=UploadSession.STATUS_FAILED)
+            raise
+
+        content_hash = self._content_hash(blocks, properties)
+        duplicate = content_hash and self.audio_file_service.find_duplicate(content_hash)
+
+        try:
+            if duplicate:
+                print(f"Duplicate of audio file {duplicate.id}, reusing its blob")
+                blob_name = self.audio_file_service.get_blob_name(duplicate)
+            elif blocks:
+                blob_name = final_blob_name
+            else:
+                # Pinned to the verified version; a rewrite through the SAS
+                # URL since then makes the copy fail
+                try:
+                    blob_service.copy_blob(
+                        session.blob_name, final_blob_name, properties.etag)
+                except ResourceModifiedError:
+                    raise ValueError("Uploaded file changed while it was being verified")
+                blob_name = final_blob_name
+
+            with transaction.atomic():
+                # Guards against the same upload being finalized twice
+                claimed = UploadSession.objects.filter(
+                    id=session.id, status=UploadSession.STATUS_PENDING
+                ).update(status=UploadSession.STATUS_COMPLETED)
+                if not claimed:
+                    raise ValueError("Upload not found")
+
+                audio_file_record = self.audio_file_service.save_audio_file(
+                    unique_id=str(session.id),
+                    name=session.name,
+                    size=properties.size,
+                    extension=session.extension,
+                    duration_seconds=duration_seconds,
+                    content_hash=content_hash,
+                    blob_name=blob_name
+                )
+                quota_service.commit(reservation)
+        except BaseException:
+            quota_service.release(reservation)
+            raise
+
+        if source_blob_name != blob_name:
+            blob_service.delete(source_blob_name)
+        return audio_file_record
+
+    def _verify_blob(self, session, blob_name, properties):
+        """
+        Check the upload's size, signature and duration from its first and
+        last bytes, and return the duration. Both reads are pinned to the
+        version described by ``properties``.
+        """
+        size = properties.size
+        extension = self.audio_file_service.validate_upload(session.name, size)
+        blob_service = self.audio_file_service.azure_blob_service
+        tail_length = min(size, PROBE_TAIL_BYTES)
+        try:
+            head = blob_service.download_range(
+                blob_name, 0, min(size, PROBE_HEAD_BYTES), properties.etag)
+            tail = blob_service.download_range(
+                blob_name, size - tail_length, tail_length, properties.etag)
+        except ResourceModifiedError:
+            raise ValueError("Uploaded file changed while it was being verified")
+
+        if len(head) < 12 or not looks_like_audio(extension, head):
+            raise ValueError("File content does not match its audio format")
+
+        duration_seconds = probe_duration(head, tail, size)
+        if duration_seconds is None:
+            raise ValueError("Could not read the audio file")
+        return duration_seconds
+
+    def _content_hash(self, blocks, properties):
+        """
+        Identify the upload's content without reading it back: from the
+        digests of the blocks staged through the API, or from the MD5 Azure
+        stores for a blob sent in one PUT. These differ from the SHA-256 of
+        other uploads, so a file only matches files sent the same way.
+        """
+        if blocks:
+            material = 'blocks:' + ','.join(digest for _, digest in blocks)
+        elif properties.content_settings.content_md5:
+            material = 'md5:' + bytes(properties.content_settings.content_md5).hex()
+        else:
+            return None
+        return hashlib.sha256(material.encode()).hexdigest()
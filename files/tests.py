@@ -1,3 +1,52 @@
-from django.test import TestCase
+import io
+import wave
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from .probing import PROBE_HEAD_BYTES, PROBE_TAIL_BYTES, ProbeFile, looks_like_audio, probe_duration
+
+
+def make_wav(seconds, rate=8000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as output:
+        output.setnchannels(1)
+        output.setsampwidth(2)
+        output.setframerate(rate)
+        output.writeframes(bytes(2 * rate * seconds))
+    return buffer.getvalue()
+
+
+class LooksLikeAudioTests(SimpleTestCase):
+
+    def test_signatures(self):
+        self.assertTrue(looks_like_audio('wav', make_wav(1)[:12]))
+        self.assertTrue(looks_like_audio('mp3', b'ID3\x04' + bytes(8)))
+        self.assertTrue(looks_like_audio('ogg', b'OggS' + bytes(8)))
+        self.assertFalse(looks_like_audio('wav', b'OggS' + bytes(8)))
+        self.assertFalse(looks_like_audio('exe', b'MZ' + bytes(10)))
+
+
+class ProbeFileTests(SimpleTestCase):
+
+    def test_reads_head_and_tail_with_zeros_between(self):
+        probe = ProbeFile(b'abc', b'xyz', 10)
+        self.assertEqual(probe.read(), b'abc\x00\x00\x00\x00xyz')
+        probe.seek(-2, io.SEEK_END)
+        self.assertEqual(probe.read(), b'yz')
+
+
+class ProbeDurationTests(SimpleTestCase):
+
+    def test_small_file_held_whole(self):
+        data = make_wav(3)
+        self.assertAlmostEqual(
+            probe_duration(data[:PROBE_HEAD_BYTES], data[-PROBE_TAIL_BYTES:], len(data)), 3.0)
+
+    def test_large_file_from_head_and_tail(self):
+        data = make_wav(300)
+        self.assertGreater(len(data), PROBE_HEAD_BYTES + PROBE_TAIL_BYTES)
+        self.assertAlmostEqual(
+            probe_duration(data[:PROBE_HEAD_BYTES], data[-PROBE_TAIL_BYTES:], len(data)), 300.0)
+
+    def test_not_audio(self):
+        self.assertIsNone(probe_duration(b'not audio at all', b'', 16))
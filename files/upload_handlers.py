@@ -0,0 +1,124 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+from users.services import UserQuotaService
+from .probing import PROBE_HEAD_BYTES, PROBE_TAIL_BYTES, looks_like_audio, probe_duration
+from .services import (ALLOWED_EXTENSIONS, BLOB_DIR_ROOT, MAX_AUDIO_FILE_SIZE,
+                       AzureBlobService, StreamedAudioUpload)
+
+# Allowance for multipart boundaries and form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class AudioUploadHandler(FileUploadHandler):
+    """
+    Streams an audio upload to blob storage as it is received.
+
+    Requests are rejected from their Content-Length and the file name before
+    the body is read, and from the first bytes if they are not audio. While
+    the file streams in it is hashed, its head and tail are kept for probing
+    the duration, and it is staged in blob storage block by block, so each
+    upload is read exactly once. The blocks are only committed once
+    AudioFileService has accepted the upload.
+
+    The reason for a rejection is kept in ``error``.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.error = None
+        self.blob_service = AzureBlobService()
+
+    def reject(self, message):
+        self.error = message
+        raise StopUpload(connection_reset=True)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > MAX_AUDIO_FILE_SIZE + MULTIPART_OVERHEAD_BYTES:
+            self.error = "Audio file size exceeds 50MB limit"
+        else:
+            if not UserQuotaService(self.request.user).has_remaining():
+                self.error = "User's quota is used up"
+
+        if self.error:
+            # Report the request as parsed so the body is never read
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None,
+                 content_type_extra=None):
+        super().new_file(field_name, file_name, content_type,
+                         content_length, charset, content_type_extra)
+        if field_name != 'audio_file':
+            self.reject("Unexpected file field")
+        if not file_name or '.' not in file_name:
+            self.reject("Audio file name must have an extension")
+        self.extension = file_name.split('.')[-1].lower()
+        if self.extension not in ALLOWED_EXTENSIONS:
+            self.reject("Unsupported audio file format")
+
+        self.upload_id = str(uuid.uuid4())
+        self.blob_name = f"{BLOB_DIR_ROOT}{self.upload_id}.{self.extension}"
+        self.digest = hashlib.sha256()
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.block = bytearray()
+        self.block_ids = []
+        self.received = 0
+        self.signature_checked = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > MAX_AUDIO_FILE_SIZE:
+            self.reject("Audio file size exceeds 50MB limit")
+
+        self.digest.update(raw_data)
+        if len(self.head) < PROBE_HEAD_BYTES:
+            self.head += raw_data[:PROBE_HEAD_BYTES - len(self.head)]
+        self.tail += raw_data
+        if len(self.tail) > 2 * PROBE_TAIL_BYTES:
+            del self.tail[:-PROBE_TAIL_BYTES]
+
+        if not self.signature_checked and len(self.head) >= 12:
+            self.check_signature()
+
+        self.block += raw_data
+        if len(self.block) >= settings.UPLOAD_BLOCK_MAX_BYTES:
+            self.stage_block()
+        return None
+
+    def file_complete(self, file_size):
+        if not self.signature_checked:
+            self.check_signature()
+        if self.block:
+            self.stage_block()
+
+        return StreamedAudioUpload(
+            name=self.file_name,
+            size=file_size,
+            content_type=self.content_type,
+            upload_id=self.upload_id,
+            blob_name=self.blob_name,
+            block_ids=self.block_ids,
+            content_hash=self.digest.hexdigest(),
+            duration_seconds=self.probe_duration(file_size)
+        )
+
+    def check_signature(self):
+        self.signature_checked = True
+        if len(self.head) < 12 or not looks_like_audio(self.extension, self.head):
+            self.reject("File content does not match its audio format")
+
+    def stage_block(self):
+        block_id = self.blob_service.get_block_id(len(self.block_ids))
+        self.blob_service.stage_block(self.blob_name, block_id, bytes(self.block))
+        self.block_ids.append(block_id)
+        self.block = bytearray()
+
+    def probe_duration(self, file_size):
+        return probe_duration(self.head, self.tail[-PROBE_TAIL_BYTES:], file_size)
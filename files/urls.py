@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AudioFileViewSet
+from .views import AudioFileViewSet, UploadViewSet
 
 router = DefaultRouter()
 router.register(r'audio-files', AudioFileViewSet, basename='audio-files')
+router.register(r'uploads', UploadViewSet, basename='uploads')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,8 +1,16 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from meetingscribe.async_views import jwt_required
 from rest_framework.viewsets import ViewSet
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
-from .services import AudioFileService
-from .serializers import AudioFileSerializer
+from django.conf import settings
+from .services import AudioFileService, UploadSessionService
+from .upload_handlers import AudioUploadHandler
+from .serializers import (AudioFileSerializer, AudioFileListQuerySerializer,
+                          UploadSessionSerializer, UploadStartSerializer)
 
 
 class AudioFileViewSet(ViewSet):
@@ -13,7 +21,17 @@ class AudioFileViewSet(ViewSet):
         POST /audio-files/
         """
         try:
+            # Stream the body to blob storage as it is parsed, and stop
+            # reading it as soon as the upload can be rejected
+            upload_handler = AudioUploadHandler(request)
+            request.upload_handlers = [upload_handler]
+
             audio_file = request.FILES.get('audio_file')
+            if upload_handler.error:
+                return Response(
+                    {"error": upload_handler.error},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             if not audio_file:
                 return Response(
                     {"error": "No audio file provided"},
@@ -59,21 +77,189 @@ class AudioFileViewSet(ViewSet):
 
     def list(self, request):
         """
-        List all audio files for the authenticated user.
-        GET /audio-files/
+        List the authenticated user's audio files, newest first.
+        GET /audio-files/?cursor=&limit=&uploaded_after=&uploaded_before=&name=
+        Pass the returned next_cursor to get the following page.
         """
+        query_serializer = AudioFileListQuerySerializer(
+            data=request.query_params)
+        if not query_serializer.is_valid():
+            return Response(query_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             user = request.user
             file_service = AudioFileService(user)
-            audio_files = file_service.get_user_audio_files()
+            audio_files, next_cursor = file_service.list_audio_files(
+                **query_serializer.validated_data)
             serializer = AudioFileSerializer(audio_files, many=True)
 
             return Response({
-                "data": serializer.data
+                "data": serializer.data,
+                "next_cursor": next_cursor
             }, status=status.HTTP_200_OK)
 
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class UploadViewSet(ViewSet):
+    """
+    Direct-to-blob uploads: reserve a blob, PUT the file to Azure with the
+    returned URL (or send it in blocks through the API), then finalize.
+    """
+
+    def create(self, request):
+        """
+        Reserve a blob and get a write-only upload URL.
+        POST /uploads/
+        """
+        serializer = UploadStartSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            upload_service = UploadSessionService(request.user)
+            session, upload_url = upload_service.start_upload(
+                name=serializer.validated_data['name'],
+                size=serializer.validated_data['size']
+            )
+
+            return Response({
+                "data": {
+                    **UploadSessionSerializer(session).data,
+                    "upload_url": upload_url,
+                    "upload_headers": {"x-ms-blob-type": "BlockBlob"},
+                    "block_size": settings.UPLOAD_BLOCK_MAX_BYTES,
+                }
+            }, status=status.HTTP_201_CREATED)
+
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    def retrieve(self, request, pk=None):
+        """
+        Get an upload and the blocks received so far, to resume it.
+        GET /uploads/{id}/
+        """
+        try:
+            upload_service = UploadSessionService(request.user)
+            session = upload_service.get_session(pk)
+
+            return Response({
+                "data": UploadSessionSerializer(session).data
+            }, status=status.HTTP_200_OK)
+
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+    @action(detail=True, methods=['put'], url_path=r'blocks/(?P<index>\d+)')
+    def blocks(self, request, pk=None, index=None):
+        """
+        Upload one block of the file as the raw request body.
+        PUT /uploads/{id}/blocks/{index}/
+        Blocks may be sent concurrently and in any order.
+        """
+        try:
+            # Read at most one byte past the limit instead of the whole body
+            data = request.stream.read(
+                settings.UPLOAD_BLOCK_MAX_BYTES + 1) if request.stream else b''
+            upload_service = UploadSessionService(request.user)
+            block = upload_service.stage_block(pk, int(index), data)
+
+            return Response({
+                "data": {"index": block.index, "size": block.size}
+            }, status=status.HTTP_200_OK)
+
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        """
+        Verify the uploaded blob and create the audio file record.
+        POST /uploads/{id}/finalize/
+        """
+        try:
+            upload_service = UploadSessionService(request.user)
+            audio_file_record = upload_service.finalize_upload(pk)
+            serializer = AudioFileSerializer(audio_file_record)
+
+            return Response({
+                "message": "Audio file uploaded successfully",
+                "data": serializer.data,
+            }, status=status.HTTP_201_CREATED)
+
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+
+@require_GET
+@jwt_required
+async def list_audio_files_async(request):
+    """
+    Async version of AudioFileViewSet.list.
+    GET /async/files/audio-files/?cursor=&limit=&uploaded_after=&uploaded_before=&name=
+    """
+    query_serializer = AudioFileListQuerySerializer(data=request.GET)
+    if not query_serializer.is_valid():
+        return JsonResponse(query_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        file_service = AudioFileService(request.user)
+        audio_files, next_cursor = await sync_to_async(file_service.list_audio_files)(
+            **query_serializer.validated_data)
+        # The users are already joined in, so serializing runs no queries
+        serializer = AudioFileSerializer(audio_files, many=True)
+
+        return JsonResponse({
+            "data": serializer.data,
+            "next_cursor": next_cursor
+        }, status=status.HTTP_200_OK)
+
+    except ValueError as e:
+        return JsonResponse(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+@require_GET
+@jwt_required
+async def retrieve_audio_file_async(request, pk):
+    """
+    Async version of AudioFileViewSet.retrieve.
+    GET /async/files/audio-files/{id}/
+    """
+    try:
+        file_service = AudioFileService(request.user)
+        audio_file_url = await file_service.aget_audio_file_url(pk)
+
+        return JsonResponse({
+            "audio_file_url": audio_file_url
+        }, status=status.HTTP_200_OK)
+
+    except ValueError as e:
+        return JsonResponse(
+            {"error": str(e)},
+            status=status.HTTP_404_NOT_FOUND
+        )
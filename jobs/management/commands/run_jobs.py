@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from jobs.services import JobWorker
+
+
+class Command(BaseCommand):
+    help = "Run a worker that drains the background job queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--worker-id', default=None,
+                            help="Identifier recorded on leased jobs")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true',
+                            help="Run until the queue is empty, then exit")
+
+    def handle(self, *args, **options):
+        worker = JobWorker(worker_id=options['worker_id'])
+        if options['once']:
+            count = 0
+            while worker.run():
+                count += 1
+            self.stdout.write(f"Processed {count} job(s)")
+            return
+
+        worker.run_forever(poll_interval=options['poll_interval'])
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('transcribe', 'Transcribe'), ('summarize', 'Summarize'), ('batch', 'Batch')], max_length=50),
+        ),
+    ]
@@ -0,0 +1,57 @@
+import uuid
+from django.db import models
+
+
+class Job(models.Model):
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    KIND_TRANSCRIBE = 'transcribe'
+    KIND_SUMMARIZE = 'summarize'
+    KIND_BATCH = 'batch'
+    KIND_CHOICES = [
+        (KIND_TRANSCRIBE, 'Transcribe'),
+        (KIND_SUMMARIZE, 'Summarize'),
+        (KIND_BATCH, 'Batch'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4,
+                          editable=False, help_text="Unique identifier for the job")
+    user = models.ForeignKey(
+        'auth.User', on_delete=models.CASCADE, related_name='jobs')
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    payload = models.JSONField(
+        default=dict, help_text="Arguments passed to the job handler")
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    lease_owner = models.CharField(
+        max_length=255, blank=True, null=True, help_text="Worker currently holding the job")
+    leased_until = models.DateTimeField(
+        blank=True, null=True, help_text="When the current lease expires")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'leased_until'],
+                         name='jobs_status_lease_idx'),
+        ]
@@ -0,0 +1,22 @@
+from django.conf import settings
+from rest_framework import serializers
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ('id', 'kind', 'status', 'payload', 'result', 'error',
+                  'attempts', 'created_at', 'updated_at', 'finished_at')
+        read_only_fields = fields
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    audio_file_ids = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        min_length=1, max_length=settings.BATCH_MAX_ITEMS)
+    operations = serializers.MultipleChoiceField(
+        choices=[Job.KIND_TRANSCRIBE, Job.KIND_SUMMARIZE], allow_empty=False)
+    resummarize = serializers.BooleanField(default=False, required=False)
+    concurrency = serializers.IntegerField(
+        required=False, min_value=1, max_value=settings.BATCH_MAX_CONCURRENCY)
@@ -0,0 +1,291 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from files.models import AudioFile
+from .models import Job
+
+
+def _run_transcribe(user, payload):
+    # Imported lazily: the transcription app enqueues jobs from its views
+    from transcription.services import TranscriptionService
+
+    text = TranscriptionService(user).create_transcription(
+        payload['audio_file_id'])
+    return {"audio_file_id": payload['audio_file_id'], "text": text}
+
+
+def _run_summarize(user, payload):
+    from summarizer.services import SummarizerService
+
+    summarizer_service = SummarizerService(user)
+    if payload.get('section'):
+        return summarizer_service.recompute_section(
+            payload['audio_file_id'], payload['section'])
+    return summarizer_service.summarize_all(
+        payload['audio_file_id'],
+        resummarize=payload.get('resummarize', False),
+        mode=payload.get('mode', 'combined'))
+
+
+def _run_batch_item(user, audio_file_id, operations, resummarize):
+    from summarizer.services import SummarizerService
+    from transcription.services import TranscriptionService
+
+    result = {"audio_file_id": audio_file_id}
+    try:
+        # Work that is already done is skipped, so a retried batch only
+        # repeats the items that failed
+        if Job.KIND_TRANSCRIBE in operations:
+            transcription_service = TranscriptionService(user)
+            if transcription_service.get_transcription(audio_file_id):
+                result[Job.KIND_TRANSCRIBE] = 'skipped'
+            else:
+                transcription_service.create_transcription(audio_file_id)
+                result[Job.KIND_TRANSCRIBE] = 'done'
+
+        if Job.KIND_SUMMARIZE in operations:
+            summarizer_service = SummarizerService(user)
+            if not resummarize and summarizer_service.get_summary(audio_file_id):
+                result[Job.KIND_SUMMARIZE] = 'skipped'
+            else:
+                summarizer_service.summarize_all(
+                    audio_file_id, resummarize=resummarize)
+                result[Job.KIND_SUMMARIZE] = 'done'
+
+        result['status'] = Job.STATUS_DONE
+    except Exception as e:
+        print(f"Batch item {audio_file_id} failed: {e}")
+        result.update(status=Job.STATUS_FAILED, error=str(e))
+    finally:
+        connections.close_all()
+    return result
+
+
+def _run_batch(user, payload):
+    """
+    Run the operations for every file of a batch, at most ``concurrency``
+    files at a time. Items fail independently and are reported one by one.
+    """
+    concurrency = min(
+        payload.get('concurrency') or settings.BATCH_DEFAULT_CONCURRENCY,
+        settings.BATCH_MAX_CONCURRENCY)
+    operations = payload['operations']
+    resummarize = payload.get('resummarize', False)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch') as executor:
+        items = list(executor.map(
+            lambda audio_file_id: _run_batch_item(
+                user, audio_file_id, operations, resummarize),
+            payload['audio_file_ids']))
+
+    failed = sum(1 for item in items if item['status'] == Job.STATUS_FAILED)
+    return {"done": len(items) - failed, "failed": failed, "items": items}
+
+
+JOB_HANDLERS = {
+    Job.KIND_TRANSCRIBE: _run_transcribe,
+    Job.KIND_SUMMARIZE: _run_summarize,
+    Job.KIND_BATCH: _run_batch,
+}
+
+# Shared by the "thread" backend so jobs run in-process without a worker
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.JOBS_THREAD_WORKERS,
+                thread_name_prefix='jobs')
+        return _executor
+
+
+def _claimable(now):
+    # Queued jobs, and running jobs whose worker stopped renewing the lease
+    return Q(status=Job.STATUS_QUEUED) | Q(status=Job.STATUS_RUNNING, leased_until__lt=now)
+
+
+def _run_in_thread(job_id):
+    try:
+        JobWorker().run(job_id)
+    finally:
+        connections.close_all()
+
+
+class JobService:
+
+    def __init__(self, user):
+        self.user = user
+
+    def enqueue(self, kind, **payload):
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        # Reuse a job that is already waiting or running for the same input
+        existing = Job.objects.filter(
+            user=self.user,
+            kind=kind,
+            payload=payload,
+            status__in=[Job.STATUS_QUEUED, Job.STATUS_RUNNING]
+        ).first()
+        if existing:
+            # Only the "database" backend polls for jobs, so on the others a
+            # job lost with its worker is handed out again here. A job that
+            # is still on its way to a worker is only claimed once
+            if settings.JOBS_BACKEND != 'database' and Job.objects.filter(
+                    _claimable(timezone.now()), id=existing.id).exists():
+                self._dispatch(existing)
+            return existing
+
+        job = Job.objects.create(user=self.user, kind=kind, payload=payload)
+        transaction.on_commit(lambda: self._dispatch(job))
+        return job
+
+    def enqueue_batch(self, audio_file_ids, operations, resummarize=False, concurrency=None):
+        """
+        Queue one job that transcribes and/or summarizes many files.
+        """
+        audio_file_ids = list(dict.fromkeys(audio_file_ids))
+        found = set(AudioFile.objects.filter(
+            user=self.user, id__in=audio_file_ids).values_list('id', flat=True))
+        missing = [audio_file_id for audio_file_id in audio_file_ids
+                   if audio_file_id not in found]
+        if missing:
+            raise ValueError(f"Audio files not found: {', '.join(missing)}")
+
+        # Transcription always runs before summarization for each file
+        operations = [kind for kind in (Job.KIND_TRANSCRIBE, Job.KIND_SUMMARIZE)
+                      if kind in operations]
+        return self.enqueue(
+            Job.KIND_BATCH,
+            audio_file_ids=audio_file_ids,
+            operations=operations,
+            resummarize=resummarize,
+            concurrency=concurrency
+        )
+
+    def get_job(self, job_id):
+        try:
+            return Job.objects.get(id=job_id, user=self.user)
+        except (Job.DoesNotExist, ValueError):
+            raise ValueError("Job not found")
+
+    def _dispatch(self, job):
+        backend = settings.JOBS_BACKEND
+        if backend == 'thread':
+            _get_executor().submit(_run_in_thread, job.id)
+        elif backend == 'celery':
+            from meetingscribe import celery_app
+            if celery_app is None:
+                raise ValueError("Celery is not installed")
+            celery_app.send_task('jobs.run_job', args=[str(job.id)])
+        # The "database" backend leaves the job for `manage.py run_jobs`
+
+
+class JobWorker:
+    """
+    Claims queued jobs under a time-limited lease and runs them.
+
+    A lease is taken with a conditional UPDATE, so any number of workers can
+    poll the same table and each job is only picked up by one of them. If a
+    worker dies, its lease expires and the job becomes claimable again.
+    """
+
+    def __init__(self, worker_id=None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = settings.JOBS_LEASE_SECONDS
+        self.max_attempts = settings.JOBS_MAX_ATTEMPTS
+
+    def claim(self, job_id=None):
+        now = timezone.now()
+        candidates = Job.objects.filter(_claimable(now))
+        if job_id is not None:
+            candidates = candidates.filter(id=job_id)
+
+        for candidate_id in candidates.order_by('created_at').values_list('id', flat=True)[:10]:
+            claimed = Job.objects.filter(_claimable(now), id=candidate_id).update(
+                status=Job.STATUS_RUNNING,
+                lease_owner=self.worker_id,
+                leased_until=now + timedelta(seconds=self.lease_seconds),
+                attempts=F('attempts') + 1,
+                updated_at=now
+            )
+            if claimed:
+                return Job.objects.select_related('user').get(id=candidate_id)
+        return None
+
+    def run(self, job_id=None):
+        """
+        Claim and execute one job. Returns the job, or None if nothing was claimable.
+        """
+        job = self.claim(job_id)
+        if not job:
+            return None
+
+        print(f"Worker {self.worker_id} running job {job.id} ({job.kind})")
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job.id, stop_heartbeat), daemon=True)
+        heartbeat.start()
+
+        try:
+            result = JOB_HANDLERS[job.kind](job.user, job.payload)
+        except Exception as e:
+            print(f"Job {job.id} failed: {e}")
+            retry = not isinstance(
+                e, ValueError) and job.attempts < self.max_attempts
+            requeued = self._finish(
+                job, Job.STATUS_QUEUED if retry else Job.STATUS_FAILED, error=str(e))
+            if retry and requeued and settings.JOBS_BACKEND != 'database':
+                # Nothing polls for queued jobs on the other backends
+                JobService(job.user)._dispatch(job)
+        else:
+            self._finish(job, Job.STATUS_DONE, result=result)
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+
+        job.refresh_from_db()
+        return job
+
+    def run_forever(self, poll_interval=2.0):
+        print(f"Worker {self.worker_id} started")
+        while True:
+            job = self.run()
+            close_old_connections()
+            if not job:
+                time.sleep(poll_interval)
+
+    def _heartbeat(self, job_id, stop):
+        # Extend the lease while the handler is still working
+        try:
+            while not stop.wait(self.lease_seconds / 3):
+                Job.objects.filter(id=job_id, lease_owner=self.worker_id).update(
+                    leased_until=timezone.now() + timedelta(seconds=self.lease_seconds))
+        finally:
+            connections.close_all()
+
+    def _finish(self, job, status, result=None, error=None):
+        now = timezone.now()
+        return Job.objects.filter(id=job.id, lease_owner=self.worker_id).update(
+            status=status,
+            result=result,
+            error=error,
+            lease_owner=None,
+            leased_until=None,
+            updated_at=now,
+            finished_at=None if status == Job.STATUS_QUEUED else now
+        )
@@ -0,0 +1,16 @@
+from celery import shared_task
+from django.db import close_old_connections
+
+from .services import JobWorker
+
+
+@shared_task(name='jobs.run_job')
+def run_job(job_id):
+    """
+    Celery entry point. The job is still claimed through its database lease,
+    so a redelivered message never runs a job twice.
+    """
+    try:
+        JobWorker().run(job_id)
+    finally:
+        close_old_connections()
@@ -0,0 +1,111 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .services import JOB_HANDLERS, JobService, JobWorker
+
+
+def fail_with(error):
+    def handler(user, payload):
+        raise error
+    return handler
+
+
+@override_settings(JOBS_BACKEND='database', JOBS_MAX_ATTEMPTS=2, JOBS_LEASE_SECONDS=300)
+class JobWorkerTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('worker', password='password')
+        self.job = Job.objects.create(
+            user=self.user, kind=Job.KIND_TRANSCRIBE, payload={'audio_file_id': 'a'})
+
+    def test_claimed_by_one_worker(self):
+        first, second = JobWorker('first'), JobWorker('second')
+        claimed = first.claim()
+        self.assertEqual(claimed.id, self.job.id)
+        self.assertEqual(claimed.status, Job.STATUS_RUNNING)
+        self.assertEqual(claimed.lease_owner, 'first')
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNone(second.claim())
+
+    def test_expired_lease_is_claimed_again(self):
+        JobWorker('dead').claim()
+        Job.objects.filter(id=self.job.id).update(
+            leased_until=timezone.now() - timedelta(seconds=1))
+        claimed = JobWorker('next').claim()
+        self.assertEqual(claimed.lease_owner, 'next')
+        self.assertEqual(claimed.attempts, 2)
+
+    def test_live_lease_is_not_claimed(self):
+        JobWorker('alive').claim()
+        self.assertIsNone(JobWorker('next').claim(self.job.id))
+
+    def test_done(self):
+        handler = mock.Mock(return_value={'text': 'hello'})
+        with mock.patch.dict(JOB_HANDLERS, {Job.KIND_TRANSCRIBE: handler}):
+            job = JobWorker('worker').run()
+        self.assertEqual(job.status, Job.STATUS_DONE)
+        self.assertEqual(job.result, {'text': 'hello'})
+        self.assertIsNone(job.lease_owner)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_retried_until_max_attempts(self):
+        with mock.patch.dict(JOB_HANDLERS, {Job.KIND_TRANSCRIBE: fail_with(RuntimeError("boom"))}):
+            job = JobWorker('worker').run()
+            self.assertEqual(job.status, Job.STATUS_QUEUED)
+            self.assertIsNone(job.finished_at)
+            job = JobWorker('worker').run()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.error, "boom")
+
+    def test_value_error_is_not_retried(self):
+        with mock.patch.dict(JOB_HANDLERS, {Job.KIND_TRANSCRIBE: fail_with(ValueError("bad input"))}):
+            job = JobWorker('worker').run()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.attempts, 1)
+
+    @override_settings(JOBS_BACKEND='thread')
+    def test_retry_dispatched_again_without_polling_worker(self):
+        with mock.patch.dict(JOB_HANDLERS, {Job.KIND_TRANSCRIBE: fail_with(RuntimeError("boom"))}), \
+                mock.patch.object(JobService, '_dispatch') as dispatch:
+            JobWorker('worker').run()
+        dispatch.assert_called_once()
+        self.assertEqual(dispatch.call_args.args[0].id, self.job.id)
+
+    def test_retry_left_for_polling_worker(self):
+        with mock.patch.dict(JOB_HANDLERS, {Job.KIND_TRANSCRIBE: fail_with(RuntimeError("boom"))}), \
+                mock.patch.object(JobService, '_dispatch') as dispatch:
+            JobWorker('worker').run()
+        dispatch.assert_not_called()
+
+
+@override_settings(JOBS_BACKEND='thread', JOBS_LEASE_SECONDS=300)
+class JobServiceTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('service', password='password')
+
+    def test_enqueue_reuses_and_redispatches_lost_job(self):
+        with mock.patch.object(JobService, '_dispatch') as dispatch:
+            with self.captureOnCommitCallbacks(execute=True):
+                job = JobService(self.user).enqueue(Job.KIND_TRANSCRIBE, audio_file_id='a')
+            self.assertEqual(dispatch.call_count, 1)
+
+            # Its worker died holding the lease
+            Job.objects.filter(id=job.id).update(
+                status=Job.STATUS_RUNNING, attempts=1,
+                leased_until=timezone.now() - timedelta(seconds=1))
+            again = JobService(self.user).enqueue(Job.KIND_TRANSCRIBE, audio_file_id='a')
+            self.assertEqual(again.id, job.id)
+            self.assertEqual(dispatch.call_count, 2)
+
+            # A job that is running normally is not handed out twice
+            Job.objects.filter(id=job.id).update(
+                leased_until=timezone.now() + timedelta(seconds=300))
+            JobService(self.user).enqueue(Job.KIND_TRANSCRIBE, audio_file_id='a')
+            self.assertEqual(dispatch.call_count, 2)
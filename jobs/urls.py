@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import BatchView, JobStatusView
+
+urlpatterns = [
+    path('batch/', BatchView.as_view(), name='job-batch'),
+    path('<uuid:job_id>/', JobStatusView.as_view(), name='job-status'),
+]
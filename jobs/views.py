@@ -0,0 +1,59 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from .services import JobService
+from .serializers import BatchRequestSerializer, JobSerializer
+
+
+class JobStatusView(APIView):
+
+    def get(self, request, job_id):
+        """
+        Poll the status of a background job.
+        GET /jobs/{job_id}/
+        """
+        try:
+            job_service = JobService(request.user)
+            job = job_service.get_job(job_id)
+            serializer = JobSerializer(job)
+
+            return Response({
+                "data": serializer.data
+            }, status=status.HTTP_200_OK)
+
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+
+class BatchView(APIView):
+
+    def post(self, request):
+        """
+        Queue transcription and/or summarization of many audio files.
+        POST /jobs/batch/
+        {"audio_file_ids": [...], "operations": ["transcribe", "summarize"],
+         "resummarize": false, "concurrency": 4}
+        Poll the returned job at GET /jobs/{job_id}/; its result lists the
+        outcome of every file.
+        """
+        request_serializer = BatchRequestSerializer(data=request.data)
+        if not request_serializer.is_valid():
+            return Response(request_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            job_service = JobService(request.user)
+            job = job_service.enqueue_batch(**request_serializer.validated_data)
+
+            return Response({
+                "message": "Batch queued",
+                "data": JobSerializer(job).data
+            }, status=status.HTTP_202_ACCEPTED)
+
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
@@ -0,0 +1,76 @@
+import hashlib
+
+import numpy as np
+from django.conf import settings
+
+from meetingscribe.clients import get_openai_client
+from meetingscribe.ratelimit import get_limiter
+from summarizer.chunking import count_tokens, normalize
+
+
+def normalize_rows(vectors):
+    """
+    Scale each row to unit length, so a dot product is a cosine similarity.
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class HashingEmbedder:
+    """
+    Offline embedder that hashes words and word pairs into a fixed number of
+    signed buckets. It needs no model or network access, but only matches
+    shared vocabulary, not paraphrases.
+    """
+
+    def __init__(self, dimensions=512):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = normalize(text).split()
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            for feature in features:
+                value = int.from_bytes(hashlib.blake2b(
+                    feature.encode('utf-8'), digest_size=8).digest(), 'little')
+                sign = 1.0 if value >> 63 else -1.0
+                vectors[row, value % self.dimensions] += sign
+        return normalize_rows(vectors)
+
+
+class OpenAIEmbedder:
+    """
+    Embeds text with an Azure OpenAI embedding deployment, through the same
+    shared client the transcription service uses.
+    """
+
+    batch_size = 64
+
+    def __init__(self, deployment):
+        self.deployment = deployment
+        self.name = f"openai-{deployment}"
+
+    def embed(self, texts):
+        client = get_openai_client(api_version="2024-06-01")
+        rows = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            response = get_limiter('embedding').call(
+                lambda: client.embeddings.create(
+                    model=self.deployment, input=batch),
+                tokens=sum(count_tokens(text) for text in batch))
+            rows.extend(item.embedding for item in sorted(
+                response.data, key=lambda item: item.index))
+        return normalize_rows(np.asarray(rows, dtype=np.float32))
+
+
+def get_embedder():
+    backend = settings.EMBEDDING_BACKEND
+    if backend == 'openai':
+        return OpenAIEmbedder(settings.EMBEDDING_DEPLOYMENT)
+    if backend == 'hashing':
+        return HashingEmbedder(settings.EMBEDDING_DIMENSIONS)
+    raise ValueError(f"Unknown embedding backend: {backend}")
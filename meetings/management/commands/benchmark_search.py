@@ -0,0 +1,74 @@
+import time
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from meetings.embeddings import normalize_rows
+from meetings.services import SemanticSearchService
+from meetings.vector_index import VectorIndex
+
+
+class Command(BaseCommand):
+    help = "Measure semantic search latency on a synthetic index or a user's index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunks', type=int, default=100000,
+                            help="Vectors in the synthetic index")
+        parser.add_argument('--dimensions', type=int, default=512)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--user-id', type=int, default=None,
+                            help="Benchmark this user's real index and embedder instead")
+        parser.add_argument('--query', default="budget for next quarter",
+                            help="Query text used with --user-id")
+
+    def handle(self, *args, **options):
+        if options['user_id'] is not None:
+            self.benchmark_user(options)
+        else:
+            self.benchmark_synthetic(options)
+
+    def benchmark_synthetic(self, options):
+        rng = np.random.default_rng(0)
+        vectors = normalize_rows(rng.standard_normal(
+            (options['chunks'], options['dimensions']), dtype=np.float32))
+
+        index = VectorIndex()
+        started = time.perf_counter()
+        index.add(np.arange(1, len(vectors) + 1), vectors)
+        self.stdout.write(
+            f"Built index of {len(index)} x {options['dimensions']} in "
+            f"{(time.perf_counter() - started) * 1000:.1f} ms")
+
+        queries = normalize_rows(rng.standard_normal(
+            (options['queries'], options['dimensions']), dtype=np.float32))
+        self.report("Top-k search", [
+            self.time_call(index.search, query, options['k']) for query in queries
+        ])
+
+    def benchmark_user(self, options):
+        search_service = SemanticSearchService(
+            User.objects.get(id=options['user_id']))
+
+        started = time.perf_counter()
+        index = search_service.get_index()
+        self.stdout.write(
+            f"Loaded index of {len(index)} chunk(s) in "
+            f"{(time.perf_counter() - started) * 1000:.1f} ms")
+
+        self.report("End-to-end search", [
+            self.time_call(search_service.search, options['query'], options['k'])
+            for _ in range(options['queries'])
+        ])
+
+    def time_call(self, function, *args):
+        started = time.perf_counter()
+        function(*args)
+        return (time.perf_counter() - started) * 1000
+
+    def report(self, label, timings):
+        p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+        self.stdout.write(
+            f"{label}: {len(timings)} queries, p50 {p50:.2f} ms, "
+            f"p95 {p95:.2f} ms, p99 {p99:.2f} ms")
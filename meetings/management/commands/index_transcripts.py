@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from meetings.embeddings import get_embedder
+from meetings.services import SemanticSearchService
+from transcription.models import Transcription
+
+
+class Command(BaseCommand):
+    help = "Embed transcriptions that are missing from the semantic search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, default=None,
+                            help="Only index this user's transcriptions")
+
+    def handle(self, *args, **options):
+        embedder = get_embedder()
+        missing = Transcription.objects.exclude(
+            chunks__embedder=embedder.name
+        ).select_related('audio_file__user').order_by('id')
+        if options['user_id'] is not None:
+            missing = missing.filter(audio_file__user_id=options['user_id'])
+
+        count = 0
+        for transcription in missing.iterator():
+            SemanticSearchService(
+                transcription.audio_file.user, embedder
+            ).index_transcription(transcription)
+            count += 1
+
+        self.stdout.write(f"Indexed {count} transcription(s) with {embedder.name}")
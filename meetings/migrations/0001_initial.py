@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('transcription', '0003_transcription_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('embedder', models.CharField(help_text='Embedder that produced the embedding', max_length=100)),
+                ('embedding', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('transcription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='transcription.transcription')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['index'],
+                'indexes': [models.Index(fields=['user', 'embedder', 'id'], name='meetings_chunk_user_idx')],
+                'unique_together': {('transcription', 'embedder', 'index')},
+            },
+        ),
+    ]
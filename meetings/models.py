@@ -0,0 +1,29 @@
+from django.db import models
+from transcription.models import Transcription
+
+
+class TranscriptChunk(models.Model):
+    """
+    A passage of a transcription with its embedding, stored as float32 bytes.
+    Chunks are loaded into a per-user VectorIndex for semantic search.
+    """
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE)
+    transcription = models.ForeignKey(
+        Transcription, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    text = models.TextField()
+    embedder = models.CharField(
+        max_length=100, help_text="Embedder that produced the embedding")
+    embedding = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Chunk {self.index} of transcription {self.transcription_id}"
+
+    class Meta:
+        ordering = ['index']
+        unique_together = ('transcription', 'embedder', 'index')
+        indexes = [
+            models.Index(fields=['user', 'embedder', 'id'],
+                         name='meetings_chunk_user_idx'),
+        ]
@@ -0,0 +1,50 @@
+from rest_framework import serializers
+from files.serializers import AudioFileSerializer
+from summarizer.serializers import SummaryResultSerializer
+
+
+class MeetingTranscriptionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    text = serializers.CharField()
+    created_at = serializers.DateTimeField()
+
+
+class MeetingSerializer(serializers.Serializer):
+    audio_file = AudioFileSerializer()
+    audio_file_url = serializers.CharField()
+    transcription = MeetingTranscriptionSerializer(allow_null=True)
+    summary = SummaryResultSerializer(allow_null=True)
+
+
+class MeetingSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=255)
+    page = serializers.IntegerField(
+        required=False, default=1, min_value=1, max_value=100)
+    page_size = serializers.IntegerField(
+        required=False, default=20, min_value=1, max_value=50)
+
+
+class MeetingSearchHitSerializer(serializers.Serializer):
+    kind = serializers.CharField()
+    id = serializers.IntegerField()
+    audio_file = serializers.CharField()
+    audio_file_name = serializers.CharField()
+    transcription = serializers.IntegerField()
+    rank = serializers.FloatField()
+    snippet = serializers.CharField(allow_null=True)
+
+
+class SemanticSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=1000)
+    limit = serializers.IntegerField(
+        required=False, default=10, min_value=1, max_value=50)
+
+
+class SemanticSearchHitSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    audio_file = serializers.CharField()
+    audio_file_name = serializers.CharField()
+    transcription = serializers.IntegerField()
+    index = serializers.IntegerField()
+    text = serializers.CharField()
+    score = serializers.FloatField()
@@ -0,0 +1,245 @@
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F, Prefetch, Q
+from django.utils import timezone
+from files.models import AudioFile
+from files.services import AudioFileService
+from summarizer.chunking import split_into_chunks
+from summarizer.models import KeyPoint, Summary, actionItem
+from transcription.models import SEARCH_CONFIG, Transcription
+from .embeddings import get_embedder
+from .models import TranscriptChunk
+from .vector_index import VectorIndex
+import html
+import numpy as np
+import threading
+
+# (kind, model, searched field, path from the model to its transcription)
+SEARCH_SOURCES = (
+    ('transcription', Transcription, 'text', ''),
+    ('subject', Summary, 'subject', 'transcription__'),
+    ('key_point', KeyPoint, 'content', 'summary__transcription__'),
+    ('action_item', actionItem, 'description', 'summary__transcription__'),
+)
+
+# Private-use characters that PostgreSQL wraps around matches in snippets;
+# they become <mark> tags only after the snippet text has been escaped
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_STOP = '\ue001'
+
+# Semantic indexes of recently active users, keyed by (user id, embedder)
+_vector_indexes = OrderedDict()
+_vector_indexes_lock = threading.Lock()
+
+
+def highlight_snippet(snippet):
+    """
+    Turn a headline built with the HIGHLIGHT_* markers into HTML: the
+    transcript text is escaped and the matches are wrapped in <mark>.
+    """
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(
+        HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+
+
+class MeetingService:
+    """
+    Read-side view of a meeting: the audio file with its latest transcription
+    and summary, loaded in a constant number of queries.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def get_meeting(self, audio_file_id):
+        try:
+            # 4 queries: audio file (with user), transcriptions joined to
+            # their summary, action items and key points
+            audio_file = AudioFile.objects.select_related('user').prefetch_related(
+                Prefetch(
+                    'transcriptions',
+                    queryset=Transcription.objects.select_related(
+                        'summary').order_by('-created_at')
+                ),
+                'transcriptions__summary__action_items',
+                'transcriptions__summary__key_points',
+            ).get(id=audio_file_id, user=self.user)
+        except AudioFile.DoesNotExist:
+            raise ValueError("Audio File not found")
+
+        transcriptions = list(audio_file.transcriptions.all())
+        transcription = transcriptions[0] if transcriptions else None
+        summary = getattr(transcription, 'summary',
+                          None) if transcription else None
+
+        return dict(
+            audio_file=audio_file,
+            audio_file_url=AudioFileService(
+                self.user).get_playback_url(audio_file),
+            transcription=transcription,
+            summary=summary
+        )
+
+    def search(self, query, page=1, page_size=20):
+        """
+        Full-text search over the user's transcripts, summary subjects, key
+        points and action items, best match first.
+
+        Each source is ranked through its GIN index and only the ids and ranks
+        of the best ``page * page_size`` hits are fetched. Snippets, the
+        expensive part, are only built for the hits on the requested page.
+        """
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch')
+        window = page * page_size
+
+        ranked = []
+        for kind, model, field, path in SEARCH_SOURCES:
+            rows = model.objects.filter(
+                **{f"{path}audio_file__user": self.user},
+                search_vector=search_query
+            ).annotate(
+                rank=SearchRank(F('search_vector'), search_query)
+            ).order_by('-rank', '-id').values_list('id', 'rank')[:window + 1]
+            ranked.extend((rank, kind, row_id) for row_id, rank in rows)
+
+        ranked.sort(key=lambda hit: (-hit[0], hit[1], -hit[2]))
+        page_hits = ranked[window - page_size:window]
+        has_next = len(ranked) > window
+
+        hits = {}
+        for kind, model, field, path in SEARCH_SOURCES:
+            ids = [row_id for _, hit_kind, row_id in page_hits if hit_kind == kind]
+            if not ids:
+                continue
+            rows = model.objects.filter(id__in=ids).annotate(
+                snippet=SearchHeadline(
+                    field, search_query, config=SEARCH_CONFIG,
+                    start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP,
+                    max_fragments=2, fragment_delimiter=' ... '),
+                # Prefixed, as Transcription and Summary have fields of
+                # these names
+                hit_transcription=F(f"{path}id"),
+                hit_audio_file=F(f"{path}audio_file_id"),
+                hit_audio_file_name=F(f"{path}audio_file__name"),
+            ).values('id', 'snippet', 'hit_transcription', 'hit_audio_file',
+                     'hit_audio_file_name')
+            for row in rows:
+                hits[(kind, row['id'])] = dict(
+                    id=row['id'],
+                    snippet=highlight_snippet(row['snippet']),
+                    transcription=row['hit_transcription'],
+                    audio_file=row['hit_audio_file'],
+                    audio_file_name=row['hit_audio_file_name'],
+                )
+
+        results = [
+            dict(hits[(kind, row_id)], kind=kind, rank=rank)
+            for rank, kind, row_id in page_hits if (kind, row_id) in hits
+        ]
+        return results, has_next
+
+
+class SemanticSearchService:
+    """
+    Semantic search over transcript chunks.
+
+    Each user's chunk embeddings are held in a VectorIndex cached in the
+    process. Before a search the index loads any chunks added since it was
+    last used, so new transcriptions become searchable without a rebuild.
+    """
+
+    def __init__(self, user, embedder=None):
+        self.user = user
+        self.embedder = embedder or get_embedder()
+
+    def index_transcription(self, transcription):
+        """
+        Split a transcription into chunks and store their embeddings.
+        """
+        chunks = split_into_chunks(
+            transcription.text, settings.SEMANTIC_CHUNK_TOKENS)
+        if not chunks:
+            return 0
+
+        vectors = self.embedder.embed(chunks)
+        TranscriptChunk.objects.bulk_create([
+            TranscriptChunk(
+                user=self.user,
+                transcription=transcription,
+                index=index,
+                text=text,
+                embedder=self.embedder.name,
+                embedding=vector.tobytes()
+            )
+            for index, (text, vector) in enumerate(zip(chunks, vectors))
+        ], ignore_conflicts=True)
+        return len(chunks)
+
+    def get_index(self):
+        key = (self.user.id, self.embedder.name)
+        with _vector_indexes_lock:
+            index = _vector_indexes.get(key)
+            if index is None:
+                index = _vector_indexes[key] = VectorIndex()
+            _vector_indexes.move_to_end(key)
+            while len(_vector_indexes) > settings.SEMANTIC_INDEX_CACHE_SIZE:
+                _vector_indexes.popitem(last=False)
+
+        # Catch up with chunks added since the index was last used. Ids are
+        # allocated before commit, so a chunk can become visible after one
+        # with a higher id was indexed; chunks created within the lookback
+        # window of the last catch-up are checked again against the index
+        started = timezone.now()
+        chunks = TranscriptChunk.objects.filter(
+            user=self.user, embedder=self.embedder.name)
+        if index.synced_at is not None:
+            since = index.synced_at - timedelta(
+                seconds=settings.SEMANTIC_INDEX_LOOKBACK_SECONDS)
+            chunks = chunks.filter(Q(id__gt=index.last_id) | Q(created_at__gte=since))
+        missing = index.missing(
+            chunks.order_by('id').values_list('id', flat=True).iterator(chunk_size=2000))
+
+        for first in range(0, len(missing), 2000):
+            rows = TranscriptChunk.objects.filter(
+                id__in=missing[first:first + 2000]).order_by('id').values_list('id', 'embedding')
+            ids, embeddings = [], []
+            for chunk_id, embedding in rows:
+                ids.append(chunk_id)
+                embeddings.append(bytes(embedding))
+            if ids:
+                vectors = np.frombuffer(b''.join(embeddings), dtype=np.float32)
+                index.add(ids, vectors.reshape(len(ids), -1))
+        index.synced_at = started
+        return index
+
+    def search(self, query, limit=10):
+        index = self.get_index()
+        query_vector = self.embedder.embed([query])[0]
+        scores = dict(index.search(query_vector, limit))
+        if not scores:
+            return []
+
+        # Chunks of deleted meetings may still be in the index, so only
+        # rows that still exist are returned
+        chunks = TranscriptChunk.objects.filter(
+            id__in=scores, user=self.user
+        ).select_related('transcription__audio_file')
+
+        results = [
+            dict(
+                id=chunk.id,
+                transcription=chunk.transcription_id,
+                audio_file=chunk.transcription.audio_file_id,
+                audio_file_name=chunk.transcription.audio_file.name,
+                index=chunk.index,
+                text=chunk.text,
+                score=scores[chunk.id]
+            )
+            for chunk in chunks
+        ]
+        results.sort(key=lambda result: -result['score'])
+        return results
@@ -0,0 +1,79 @@
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from files.models import AudioFile
+from summarizer.models import KeyPoint, Summary, actionItem
+from transcription.models import Transcription
+from .services import HIGHLIGHT_START, HIGHLIGHT_STOP, MeetingService, highlight_snippet
+from .vector_index import VectorIndex
+
+
+class HighlightSnippetTests(SimpleTestCase):
+
+    def test_escapes_text_and_marks_matches(self):
+        snippet = f"<script>alert(1)</script> the {HIGHLIGHT_START}budget{HIGHLIGHT_STOP} & plan"
+        self.assertEqual(
+            highlight_snippet(snippet),
+            "&lt;script&gt;alert(1)&lt;/script&gt; the <mark>budget</mark> &amp; plan")
+
+    def test_markup_in_text_is_not_a_highlight(self):
+        self.assertEqual(highlight_snippet("<mark>x</mark>"),
+                         "&lt;mark&gt;x&lt;/mark&gt;")
+
+    def test_none(self):
+        self.assertIsNone(highlight_snippet(None))
+
+
+class VectorIndexTests(SimpleTestCase):
+
+    def test_adds_ids_committed_out_of_order_once(self):
+        index = VectorIndex()
+        vectors = np.eye(4, dtype=np.float32)
+        self.assertEqual(index.add([1, 3], vectors[[0, 2]]), 2)
+        self.assertEqual(index.missing([1, 2, 3, 4]), [2, 4])
+        self.assertEqual(index.add([2, 3, 4], vectors[[1, 2, 3]]), 2)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.last_id, 4)
+        self.assertEqual(index.search(vectors[1], 1), [(2, 1.0)])
+
+
+class MeetingSearchTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('search', password='password')
+        self.audio_file = AudioFile.objects.create(
+            id='search-audio', name='Planning.mp3', size=1000, extension='mp3',
+            durtion_seconds=60, user=self.user)
+        self.transcription = Transcription.objects.create(
+            audio_file=self.audio_file, text="We went through the budget line by line.")
+        summary = Summary.objects.create(
+            transcription=self.transcription, subject="Budget review")
+        KeyPoint.objects.create(summary=summary, content="The budget is over by 5%.")
+        actionItem.objects.create(summary=summary, description="Send the revised budget.")
+
+        other = User.objects.create_user('other', password='password')
+        other_file = AudioFile.objects.create(
+            id='other-audio', name='Other.mp3', size=1000, extension='mp3',
+            durtion_seconds=60, user=other)
+        Transcription.objects.create(audio_file=other_file, text="Their budget.")
+
+    def test_hits_from_every_source(self):
+        hits, has_next = MeetingService(self.user).search('budget')
+
+        self.assertFalse(has_next)
+        self.assertEqual(sorted(hit['kind'] for hit in hits),
+                         ['action_item', 'key_point', 'subject', 'transcription'])
+        for hit in hits:
+            self.assertEqual(hit['transcription'], self.transcription.id)
+            self.assertEqual(hit['audio_file'], self.audio_file.id)
+            self.assertEqual(hit['audio_file_name'], 'Planning.mp3')
+            self.assertIn('<mark>', hit['snippet'].lower())
+
+    def test_pages(self):
+        first, has_next = MeetingService(self.user).search('budget', page=1, page_size=3)
+        second, _ = MeetingService(self.user).search('budget', page=2, page_size=3)
+        self.assertTrue(has_next)
+        self.assertEqual(len(first) + len(second), 4)
+        self.assertFalse({(hit['kind'], hit['id']) for hit in first}
+                         & {(hit['kind'], hit['id']) for hit in second})
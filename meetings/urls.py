@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import MeetingSearchView, MeetingView, SemanticSearchView
+
+urlpatterns = [
+    path('search/', MeetingSearchView.as_view(), name='meeting-search'),
+    path('semantic-search/', SemanticSearchView.as_view(),
+         name='meeting-semantic-search'),
+    path('<str:audio_file_id>/', MeetingView.as_view(), name='meeting'),
+]
@@ -0,0 +1,88 @@
+import threading
+
+import numpy as np
+
+
+class VectorIndex:
+    """
+    In-memory index of unit-length float32 vectors keyed by chunk id.
+
+    Vectors live in one contiguous matrix that grows by doubling, so adding a
+    transcription's chunks is amortised O(chunks) and a query is a single
+    matrix-vector product followed by a partial sort.
+    """
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = None
+        self.size = 0
+        self.last_id = 0
+        # Ids held, so chunks seen again by a catch-up are not added twice
+        self.known = set()
+        # When the index last caught up with the database
+        self.synced_at = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.size
+
+    def missing(self, ids):
+        """
+        Return the ``ids`` that are not indexed yet.
+        """
+        with self.lock:
+            return [id for id in ids if id not in self.known]
+
+    def add(self, ids, vectors):
+        """
+        Append vectors for ``ids``, in any order. Ids already indexed are
+        skipped.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self.lock:
+            new = np.array([int(id) not in self.known for id in ids], dtype=bool)
+            ids, vectors = ids[new], vectors[new]
+            if not len(ids):
+                return 0
+
+            if self.vectors is None:
+                self.vectors = np.empty(
+                    (max(len(ids), 64), vectors.shape[1]), dtype=np.float32)
+                self.ids = np.empty(len(self.vectors), dtype=np.int64)
+            elif vectors.shape[1] != self.vectors.shape[1]:
+                raise ValueError("Embedding dimensions do not match the index")
+
+            end = self.size + len(ids)
+            if end > len(self.vectors):
+                capacity = max(end, 2 * len(self.vectors))
+                grown = np.empty((capacity, self.vectors.shape[1]), dtype=np.float32)
+                grown[:self.size] = self.vectors[:self.size]
+                grown_ids = np.empty(capacity, dtype=np.int64)
+                grown_ids[:self.size] = self.ids[:self.size]
+                self.vectors, self.ids = grown, grown_ids
+
+            self.vectors[self.size:end] = vectors
+            self.ids[self.size:end] = ids
+            # Readers only look at rows below size, so publish it last
+            self.size = end
+            self.known.update(int(id) for id in ids)
+            self.last_id = max(self.last_id, int(ids.max()))
+            return len(ids)
+
+    def search(self, query, k):
+        """
+        Return up to ``k`` (id, cosine similarity) pairs, best first.
+        """
+        with self.lock:
+            size, vectors, ids = self.size, self.vectors, self.ids
+        if not size or k <= 0:
+            return []
+
+        scores = vectors[:size] @ np.asarray(query, dtype=np.float32)
+        if k < size:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(size)
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(ids[i]), float(scores[i])) for i in top]
@@ -0,0 +1,92 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from .services import MeetingService, SemanticSearchService
+from .serializers import (MeetingSearchHitSerializer,
+                          MeetingSearchQuerySerializer, MeetingSerializer,
+                          SemanticSearchHitSerializer,
+                          SemanticSearchQuerySerializer)
+
+
+class MeetingView(APIView):
+
+    def get(self, request, audio_file_id):
+        """
+        Get an audio file with its playback URL, transcription and summary.
+        GET /meetings/{audio_file_id}/
+        """
+        try:
+            meeting_service = MeetingService(request.user)
+            meeting = meeting_service.get_meeting(audio_file_id)
+            serializer = MeetingSerializer(meeting)
+
+            return Response({
+                "data": serializer.data
+            }, status=status.HTTP_200_OK)
+
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+
+class MeetingSearchView(APIView):
+
+    def get(self, request):
+        """
+        Search the user's transcripts and summaries.
+        GET /meetings/search/?q=&page=&page_size=
+        """
+        query_serializer = MeetingSearchQuerySerializer(
+            data=request.query_params)
+        if not query_serializer.is_valid():
+            return Response(query_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            meeting_service = MeetingService(request.user)
+            hits, has_next = meeting_service.search(
+                **query_serializer.validated_data)
+            serializer = MeetingSearchHitSerializer(hits, many=True)
+
+            return Response({
+                "data": serializer.data,
+                "page": query_serializer.validated_data['page'],
+                "has_next": has_next
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class SemanticSearchView(APIView):
+
+    def get(self, request):
+        """
+        Find transcript passages similar in meaning to the query.
+        GET /meetings/semantic-search/?q=&limit=
+        """
+        query_serializer = SemanticSearchQuerySerializer(
+            data=request.query_params)
+        if not query_serializer.is_valid():
+            return Response(query_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            search_service = SemanticSearchService(request.user)
+            hits = search_service.search(
+                query_serializer.validated_data['q'],
+                limit=query_serializer.validated_data['limit'])
+            serializer = SemanticSearchHitSerializer(hits, many=True)
+
+            return Response({
+                "data": serializer.data
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
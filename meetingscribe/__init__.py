@@ -0,0 +1,7 @@
+try:
+    from .celery import app as celery_app
+except ImportError:
+    # Celery is optional; jobs fall back to the database or thread backends
+    celery_app = None
+
+__all__ = ('celery_app',)
@@ -0,0 +1,18 @@
+"""
+Async endpoints, for deployments served by an ASGI server.
+"""
+from django.urls import path
+from files.views import list_audio_files_async, retrieve_audio_file_async
+from summarizer.views import summarize_async
+from transcription.views import transcribe_async
+
+urlpatterns = [
+    path('files/audio-files/', list_audio_files_async,
+         name='async-audio-files'),
+    path('files/audio-files/<str:pk>/', retrieve_audio_file_async,
+         name='async-audio-file'),
+    path('transcriptions/<str:audio_file_id>/', transcribe_async,
+         name='async-transcribe'),
+    path('summarizer/summarize/<str:audio_id>/', summarize_async,
+         name='async-summarize'),
+]
@@ -0,0 +1,37 @@
+"""
+Helpers for the async views served under ASGI.
+
+DRF views only run synchronously, so the async endpoints are plain Django
+views that authenticate the JWT themselves with ``jwt_required``.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+def jwt_required(view):
+    """
+    Authenticate an async view with the same JWT as the DRF views, setting
+    ``request.user``, and answer 401 like DRF when the token is missing or
+    invalid.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            # Loads the user from the database
+            result = await sync_to_async(JWTAuthentication().authenticate)(request)
+        except AuthenticationFailed as e:
+            return JsonResponse({"detail": e.detail}, status=401)
+        if result is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."}, status=401)
+
+        request.user = result[0]
+        return await view(request, *args, **kwargs)
+
+    # Token authentication, like the DRF views, needs no CSRF check
+    return csrf_exempt(wrapper)
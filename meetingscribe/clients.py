@@ -0,0 +1,175 @@
+"""
+Process-wide SDK clients.
+
+Clients are built on first use and then shared by every request and thread in
+the worker process, so their keep-alive connection pools and TLS sessions are
+reused instead of being set up again for each request.
+
+The async clients used by the ASGI views hold connections bound to an event
+loop, so they are shared per loop rather than per process, and closed when
+their loop shuts down.
+"""
+import asyncio
+import threading
+import weakref
+
+import environ
+import httpx
+import requests
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobServiceClient
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+from django.conf import settings
+from openai import (AsyncAzureOpenAI, AzureOpenAI, DefaultAsyncHttpxClient,
+                    DefaultHttpxClient)
+
+env = environ.Env()
+
+_clients = {}
+_lock = threading.Lock()
+
+# Async clients of each event loop, with the async generator that closes them
+# when the loop shuts down
+_loop_clients = weakref.WeakKeyDictionary()
+
+
+def _get_or_create(key, factory):
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = factory()
+                _clients[key] = client
+    return client
+
+
+async def _close_on_shutdown(clients):
+    # Parked at its yield until the loop finalizes its async generators,
+    # which asyncio.run and the ASGI servers do before closing the loop, so
+    # the clients are closed on the loop their connections belong to
+    try:
+        yield
+    finally:
+        for client in clients.values():
+            try:
+                await client.close()
+            except Exception as e:
+                print(f"Error closing async client: {e}")
+        clients.clear()
+        with _lock:
+            _loop_clients.pop(asyncio.get_running_loop(), None)
+
+
+def _get_or_create_for_loop(key, factory):
+    loop = asyncio.get_running_loop()
+    with _lock:
+        entry = _loop_clients.get(loop)
+        if entry is None:
+            # The closer keeps its loop alive, so loops closed without
+            # shutting down their generators are dropped here
+            for closed in [other for other in _loop_clients if other.is_closed()]:
+                del _loop_clients[closed]
+            clients = {}
+            closer = _close_on_shutdown(clients)
+            # Run it to its yield, which registers it with the running loop
+            try:
+                closer.asend(None).send(None)
+            except StopIteration:
+                pass
+            entry = _loop_clients[loop] = (clients, closer)
+        clients = entry[0]
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = factory()
+    return client
+
+
+def _create_blob_service_client():
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1, pool_maxsize=settings.HTTP_POOL_MAXSIZE)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    # Bound how much of a blob a single download request holds in memory
+    return BlobServiceClient.from_connection_string(
+        env('AZURE_BLOB_CONNECTION_STRING'),
+        transport=RequestsTransport(session=session, session_owner=False),
+        max_single_get_size=settings.BLOB_DOWNLOAD_CHUNK_BYTES,
+        max_chunk_get_size=settings.BLOB_DOWNLOAD_CHUNK_BYTES)
+
+
+def get_blob_service_client():
+    return _get_or_create('blob', _create_blob_service_client)
+
+
+def get_blob_container_client():
+    return _get_or_create(
+        'blob-container',
+        lambda: get_blob_service_client().get_container_client(
+            env('AZURE_STORAGE_CONTAINER_NAME')))
+
+
+def get_blob_sas_settings():
+    """
+    Account name, container and key used to sign SAS URLs, read once.
+    """
+    return _get_or_create('blob-sas', lambda: dict(
+        account_name=env('AZURE_STORAGE_ACCOUNT_NAME'),
+        container_name=env('AZURE_STORAGE_CONTAINER_NAME'),
+        account_key=env('AZURE_STORAGE_KEY'),
+    ))
+
+
+def get_openai_client(api_version):
+    """
+    Return the shared Azure OpenAI client for ``api_version``.
+    """
+    def create():
+        return AzureOpenAI(
+            azure_endpoint=env('OPENAI_API_BASE'),
+            api_key=env('OPENAI_API_KEY'),
+            api_version=api_version,
+            # Retries are left to meetingscribe.ratelimit, which honours
+            # Retry-After and throttles the whole process
+            max_retries=0,
+            http_client=DefaultHttpxClient(limits=httpx.Limits(
+                max_connections=settings.HTTP_POOL_MAXSIZE,
+                max_keepalive_connections=settings.HTTP_POOL_MAXSIZE))
+        )
+
+    return _get_or_create(('openai', api_version), create)
+
+
+def get_async_blob_container_client():
+    """
+    Return the async container client for the running event loop.
+    """
+    def create():
+        return AsyncBlobServiceClient.from_connection_string(
+            env('AZURE_BLOB_CONNECTION_STRING'),
+            max_single_get_size=settings.BLOB_DOWNLOAD_CHUNK_BYTES,
+            max_chunk_get_size=settings.BLOB_DOWNLOAD_CHUNK_BYTES
+        ).get_container_client(env('AZURE_STORAGE_CONTAINER_NAME'))
+
+    return _get_or_create_for_loop('blob-container', create)
+
+
+def get_async_openai_client(api_version):
+    """
+    Return the async Azure OpenAI client for ``api_version`` and the running
+    event loop.
+    """
+    def create():
+        return AsyncAzureOpenAI(
+            azure_endpoint=env('OPENAI_API_BASE'),
+            api_key=env('OPENAI_API_KEY'),
+            api_version=api_version,
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(
+                max_connections=settings.ASYNC_HTTP_POOL_MAXSIZE,
+                max_keepalive_connections=settings.ASYNC_HTTP_POOL_MAXSIZE))
+        )
+
+    return _get_or_create_for_loop(('openai', api_version), create)
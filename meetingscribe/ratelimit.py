@@ -0,0 +1,335 @@
+"""
+Client-side rate limiting for Azure OpenAI.
+
+Every call to a deployment goes through its AdaptiveLimiter, shared by all
+threads (and the event loop) of the process. The limiter keeps the process
+inside the deployment's requests-per-minute and tokens-per-minute quota,
+retries throttled and transient failures itself, and adapts how many calls
+it lets run at once to how often Azure throttles them.
+"""
+import asyncio
+import email.utils
+import random
+import threading
+import time
+
+import openai
+from django.conf import settings
+
+# Status codes worth retrying besides 429
+RETRYABLE_STATUS_CODES = {408, 409, 500, 502, 503, 504}
+
+# Bound on how long a waiting caller sleeps before checking again
+POLL_SECONDS = 0.05
+
+# Throttles within this window of the last decrease do not shrink the
+# concurrency limit again
+DECREASE_COOLDOWN_SECONDS = 5.0
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name):
+    """
+    Return the process-wide limiter for the deployment called ``name``.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            config = settings.OPENAI_RATE_LIMITS.get(name, {})
+            limiter = _limiters[name] = AdaptiveLimiter(
+                name,
+                requests_per_minute=config.get('rpm'),
+                tokens_per_minute=config.get('tpm'))
+        return limiter
+
+
+def get_limiter_stats():
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.stats() for limiter in limiters]
+
+
+class TokenBucket:
+    """
+    Budget of ``per_minute`` units, refilled continuously.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.available = min(
+            self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        # A request larger than the whole budget waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def take(self, amount):
+        self.available -= amount
+
+    def give_back(self, amount):
+        self.available = min(self.capacity, self.available + amount)
+
+
+class AdaptiveLimiter:
+    """
+    Requests/tokens-per-minute budgets plus an AIMD concurrency limit.
+
+    The concurrency limit grows by about one per limit's worth of successful
+    calls and halves when Azure throttles (at most once per backoff window,
+    so a burst of 429s from calls already in flight counts once). A 429's
+    Retry-After pauses every caller of the deployment, not just the one
+    that was throttled.
+    """
+
+    def __init__(self, name, requests_per_minute=None, tokens_per_minute=None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.min_concurrency = settings.OPENAI_MIN_CONCURRENCY
+        self.max_concurrency = settings.OPENAI_MAX_CONCURRENCY
+        self.concurrency = float(settings.OPENAI_INITIAL_CONCURRENCY)
+        self.in_flight = 0
+        self.waiting = 0
+        self.paused_until = 0.0
+        self.last_decrease = float('-inf')
+        self.counters = dict(requests=0, throttled=0, retries=0, failures=0)
+        self.condition = threading.Condition()
+
+    # Admission
+
+    def _try_acquire(self, tokens):
+        """
+        Take a slot and budget and return 0, or return how long to wait.
+        Called with the condition held.
+        """
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= int(self.concurrency):
+            return None  # until a call finishes
+
+        delay = 0.0
+        for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+            if bucket is not None and amount:
+                bucket.refill(now)
+                delay = max(delay, bucket.wait_time(amount))
+        if delay:
+            return delay
+
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None and tokens:
+            self.tokens.take(tokens)
+        self.in_flight += 1
+        self.counters['requests'] += 1
+        return 0
+
+    def acquire(self, tokens=0):
+        with self.condition:
+            self.waiting += 1
+            try:
+                while True:
+                    delay = self._try_acquire(tokens)
+                    if delay == 0:
+                        return
+                    self.condition.wait(timeout=delay)
+            finally:
+                self.waiting -= 1
+
+    async def aacquire(self, tokens=0):
+        with self.condition:
+            self.waiting += 1
+        try:
+            while True:
+                with self.condition:
+                    delay = self._try_acquire(tokens)
+                if delay == 0:
+                    return
+                await asyncio.sleep(min(delay or POLL_SECONDS, POLL_SECONDS * 20))
+        finally:
+            with self.condition:
+                self.waiting -= 1
+
+    def release(self, succeeded=False, throttled=False, retry_after=None,
+                reserved_tokens=0, used_tokens=None):
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self.counters['throttled'] += 1
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+                if now - self.last_decrease > DECREASE_COOLDOWN_SECONDS:
+                    self.concurrency = max(
+                        self.min_concurrency, self.concurrency / 2)
+                    self.last_decrease = now
+            elif succeeded:
+                self.concurrency = min(
+                    self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            if self.tokens is not None and used_tokens is not None and reserved_tokens > used_tokens:
+                # Return what the estimate over-reserved
+                self.tokens.give_back(reserved_tokens - used_tokens)
+            self.condition.notify_all()
+
+    # Calls
+
+    def call(self, function, tokens=0):
+        """
+        Run ``function`` (an OpenAI SDK call) within the limits, retrying
+        throttled and transient failures. ``tokens`` is the estimated token
+        cost reserved from the tokens-per-minute budget.
+        """
+        for attempt in range(settings.OPENAI_MAX_RETRIES + 1):
+            self.acquire(tokens)
+            try:
+                response = function()
+            except openai.APIError as e:
+                delay = self._handle_error(e, attempt)
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self.release()
+                raise
+            self.release(succeeded=True, reserved_tokens=tokens,
+                         used_tokens=_used_tokens(response))
+            return response
+
+    async def acall(self, function, tokens=0):
+        """
+        Async version of ``call``; ``function`` returns an awaitable.
+        """
+        for attempt in range(settings.OPENAI_MAX_RETRIES + 1):
+            await self.aacquire(tokens)
+            try:
+                response = await function()
+            except openai.APIError as e:
+                delay = self._handle_error(e, attempt)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self.release()
+                raise
+            self.release(succeeded=True, reserved_tokens=tokens,
+                         used_tokens=_used_tokens(response))
+            return response
+
+    def stream(self, function, tokens=0):
+        """
+        Like ``call`` for a streaming ``function``, but yields the chunks of
+        the stream it opens and holds the slot until the stream has ended, so
+        a long generation counts against the concurrency limit for as long as
+        it runs. The token reservation is settled from the usage reported on
+        the final chunk. Only opening the stream is retried.
+        """
+        for attempt in range(settings.OPENAI_MAX_RETRIES + 1):
+            self.acquire(tokens)
+            try:
+                response = function()
+            except openai.APIError as e:
+                delay = self._handle_error(e, attempt)
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self.release()
+                raise
+            break
+
+        succeeded = False
+        used_tokens = None
+        try:
+            for chunk in response:
+                used_tokens = _used_tokens(chunk) or used_tokens
+                yield chunk
+            succeeded = True
+        finally:
+            if not succeeded:
+                # Abandoned or failed midway; free the connection
+                response.close()
+            self.release(succeeded=succeeded, reserved_tokens=tokens,
+                         used_tokens=used_tokens)
+
+    def _handle_error(self, error, attempt):
+        """
+        Release the slot after a failed call and return how long to wait
+        before retrying, or re-raise when the error is final.
+        """
+        throttled = isinstance(error, openai.RateLimitError)
+        retryable = throttled or isinstance(error, openai.APIConnectionError) or (
+            isinstance(error, openai.APIStatusError)
+            and error.status_code in RETRYABLE_STATUS_CODES)
+        retry_after = _retry_after(error) if throttled else None
+        self.release(throttled=throttled, retry_after=retry_after)
+
+        with self.condition:
+            if not retryable or attempt >= settings.OPENAI_MAX_RETRIES:
+                self.counters['failures'] += 1
+                raise error
+            self.counters['retries'] += 1
+
+        # Full jitter keeps retries from many callers from lining up
+        backoff = random.uniform(0, min(
+            settings.OPENAI_BACKOFF_MAX_SECONDS,
+            settings.OPENAI_BACKOFF_BASE_SECONDS * 2 ** attempt))
+        if retry_after:
+            return retry_after + backoff * 0.1
+        return backoff
+
+    def stats(self):
+        with self.condition:
+            now = time.monotonic()
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket.refill(now)
+            return dict(
+                name=self.name,
+                concurrency_limit=int(self.concurrency),
+                in_flight=self.in_flight,
+                queue_depth=self.waiting,
+                paused_seconds=max(0.0, round(self.paused_until - now, 3)),
+                requests_available=(
+                    int(self.requests.available) if self.requests else None),
+                tokens_available=(
+                    int(self.tokens.available) if self.tokens else None),
+                **self.counters
+            )
+
+
+def _used_tokens(response):
+    usage = getattr(response, 'usage', None)
+    return getattr(usage, 'total_tokens', None)
+
+
+def _retry_after(error):
+    """
+    Seconds the server asked us to wait, from Retry-After headers.
+    """
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
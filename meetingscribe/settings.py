@@ -31,6 +31,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -38,6 +39,8 @@ INSTALLED_APPS = [
     'files',
     'transcription',
     "summarizer",
+    'jobs',
+    'meetings',
 ]
 
 MIDDLEWARE = [
@@ -145,3 +148,141 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),  # Default is "Bearer"
 }
+
+# config for background jobs
+# JOBS_BACKEND is one of "database" (drained by `manage.py run_jobs`),
+# "thread" (run inside the web process) or "celery"
+JOBS_BACKEND = env('JOBS_BACKEND', default='database')
+JOBS_LEASE_SECONDS = env.int('JOBS_LEASE_SECONDS', default=300)
+JOBS_MAX_ATTEMPTS = env.int('JOBS_MAX_ATTEMPTS', default=3)
+JOBS_THREAD_WORKERS = env.int('JOBS_THREAD_WORKERS', default=2)
+# A batch job processes up to BATCH_MAX_CONCURRENCY files at a time; each file
+# may still fan out to TRANSCRIPTION_MAX_WORKERS or SUMMARY_MAX_WORKERS calls
+BATCH_MAX_ITEMS = env.int('BATCH_MAX_ITEMS', default=500)
+BATCH_DEFAULT_CONCURRENCY = env.int('BATCH_DEFAULT_CONCURRENCY', default=4)
+BATCH_MAX_CONCURRENCY = env.int('BATCH_MAX_CONCURRENCY', default=16)
+
+CELERY_BROKER_URL = env('CELERY_BROKER_URL', default='redis://localhost:6379/0')
+CELERY_TASK_ACKS_LATE = True
+
+# config for audio streaming
+# Blobs are downloaded in chunks of this size, and buffered in memory up to
+# AUDIO_SPOOL_MAX_BYTES before spilling to a temporary file
+BLOB_DOWNLOAD_CHUNK_BYTES = env.int(
+    'BLOB_DOWNLOAD_CHUNK_BYTES', default=4 * 1024 * 1024)
+AUDIO_SPOOL_MAX_BYTES = env.int('AUDIO_SPOOL_MAX_BYTES', default=8 * 1024 * 1024)
+
+# config for playback URLs
+# Signed URLs are reused until BLOB_SAS_REFRESH_MARGIN_SECONDS before expiry
+BLOB_SAS_EXPIRY_MINUTES = env.int('BLOB_SAS_EXPIRY_MINUTES', default=15)
+BLOB_SAS_REFRESH_MARGIN_SECONDS = env.int(
+    'BLOB_SAS_REFRESH_MARGIN_SECONDS', default=120)
+BLOB_SAS_CACHE_SIZE = env.int('BLOB_SAS_CACHE_SIZE', default=10000)
+
+# config for direct-to-blob uploads
+UPLOAD_SAS_EXPIRY_MINUTES = env.int('UPLOAD_SAS_EXPIRY_MINUTES', default=15)
+# Resumable uploads are sent as blocks of at most UPLOAD_BLOCK_MAX_BYTES
+UPLOAD_BLOCK_MAX_BYTES = env.int('UPLOAD_BLOCK_MAX_BYTES', default=4 * 1024 * 1024)
+UPLOAD_MAX_BLOCKS = env.int('UPLOAD_MAX_BLOCKS', default=50000)
+# Unfinalized uploads are removed by `manage.py cleanup_uploads` after this
+UPLOAD_SESSION_RETENTION_HOURS = env.int(
+    'UPLOAD_SESSION_RETENTION_HOURS', default=24)
+
+# config for usage quotas
+# Quota held for an upload is given back after this if the upload never
+# finished, e.g. because its worker died; `manage.py release_quota_reservations`
+# sweeps every user, and each user's own expired holds are also swept on use
+QUOTA_RESERVATION_TTL_MINUTES = env.int('QUOTA_RESERVATION_TTL_MINUTES', default=30)
+
+# config for transcription
+# Whisper rejects uploads above 25MB; larger or long recordings are split into
+# segments of about TRANSCRIPTION_SEGMENT_SECONDS and transcribed in parallel
+WHISPER_MAX_BYTES = env.int('WHISPER_MAX_BYTES', default=25 * 1024 * 1024)
+TRANSCRIPTION_SEGMENT_SECONDS = env.int(
+    'TRANSCRIPTION_SEGMENT_SECONDS', default=600)
+TRANSCRIPTION_SEGMENT_OVERLAP_SECONDS = env.float(
+    'TRANSCRIPTION_SEGMENT_OVERLAP_SECONDS', default=2.0)
+TRANSCRIPTION_MAX_WORKERS = env.int('TRANSCRIPTION_MAX_WORKERS', default=4)
+# Uploads above TRANSCODE_SKIP_BYTES_PER_SECOND are re-encoded to 16 kHz mono
+# TRANSCODE_FORMAT ("mp3" or "opus") before transcription, at most
+# TRANSCODE_MAX_WORKERS at a time per process
+TRANSCODE_ENABLED = env.bool('TRANSCODE_ENABLED', default=True)
+TRANSCODE_FORMAT = env('TRANSCODE_FORMAT', default='mp3')
+TRANSCODE_BITRATE = env('TRANSCODE_BITRATE', default='32k')
+TRANSCODE_MAX_WORKERS = env.int('TRANSCODE_MAX_WORKERS', default=2)
+TRANSCODE_SKIP_BYTES_PER_SECOND = env.int(
+    'TRANSCODE_SKIP_BYTES_PER_SECOND', default=8000)
+# Silence is cut out before transcription: frames quieter than VAD_MARGIN_DB
+# above the noise floor for at least VAD_MIN_SILENCE_SECONDS are removed,
+# keeping VAD_PADDING_SECONDS around speech. Recordings that would lose less
+# than VAD_MIN_REMOVED_SECONDS are sent whole
+VAD_ENABLED = env.bool('VAD_ENABLED', default=True)
+VAD_FRAME_SECONDS = env.float('VAD_FRAME_SECONDS', default=0.03)
+VAD_MARGIN_DB = env.float('VAD_MARGIN_DB', default=10.0)
+VAD_MIN_THRESHOLD_DB = env.float('VAD_MIN_THRESHOLD_DB', default=-55.0)
+VAD_MIN_SPEECH_SECONDS = env.float('VAD_MIN_SPEECH_SECONDS', default=0.15)
+VAD_MIN_SILENCE_SECONDS = env.float('VAD_MIN_SILENCE_SECONDS', default=1.5)
+VAD_PADDING_SECONDS = env.float('VAD_PADDING_SECONDS', default=0.3)
+VAD_MIN_REMOVED_SECONDS = env.float('VAD_MIN_REMOVED_SECONDS', default=10.0)
+# Also copy the summary when a transcription is reused from an identical upload
+DEDUP_REUSE_SUMMARY = env.bool('DEDUP_REUSE_SUMMARY', default=True)
+
+# config for outbound HTTP
+# Size of the keep-alive connection pool each shared SDK client keeps per worker
+HTTP_POOL_MAXSIZE = env.int('HTTP_POOL_MAXSIZE', default=10)
+# Connections the async OpenAI client may open per event loop; async views
+# share one loop per process, so this bounds concurrent model calls under ASGI
+ASYNC_HTTP_POOL_MAXSIZE = env.int('ASYNC_HTTP_POOL_MAXSIZE', default=200)
+
+# config for Azure OpenAI rate limiting
+# Budgets are per process: set them to the deployment's quota divided by the
+# number of worker processes. Concurrency starts at OPENAI_INITIAL_CONCURRENCY
+# and adapts between the min and max as Azure throttles
+OPENAI_RATE_LIMITS = {
+    'gpt-4': dict(rpm=env.int('GPT_REQUESTS_PER_MINUTE', default=60),
+                  tpm=env.int('GPT_TOKENS_PER_MINUTE', default=80000)),
+    'whisper': dict(rpm=env.int('WHISPER_REQUESTS_PER_MINUTE', default=3)),
+    'embedding': dict(rpm=env.int('EMBEDDING_REQUESTS_PER_MINUTE', default=300),
+                      tpm=env.int('EMBEDDING_TOKENS_PER_MINUTE', default=150000)),
+}
+OPENAI_INITIAL_CONCURRENCY = env.int('OPENAI_INITIAL_CONCURRENCY', default=4)
+OPENAI_MIN_CONCURRENCY = env.int('OPENAI_MIN_CONCURRENCY', default=1)
+OPENAI_MAX_CONCURRENCY = env.int('OPENAI_MAX_CONCURRENCY', default=32)
+OPENAI_MAX_RETRIES = env.int('OPENAI_MAX_RETRIES', default=6)
+OPENAI_BACKOFF_BASE_SECONDS = env.float(
+    'OPENAI_BACKOFF_BASE_SECONDS', default=1.0)
+OPENAI_BACKOFF_MAX_SECONDS = env.float(
+    'OPENAI_BACKOFF_MAX_SECONDS', default=60.0)
+
+# config for summarization
+# Transcripts longer than SUMMARY_CHUNK_TOKENS are summarized in chunks of that
+# size, SUMMARY_MAX_WORKERS at a time, and the chunk summaries merged
+SUMMARY_CHUNK_TOKENS = env.int('SUMMARY_CHUNK_TOKENS', default=6000)
+SUMMARY_MAX_WORKERS = env.int('SUMMARY_MAX_WORKERS', default=4)
+# Output budget of each action item and key point prompt in sectioned mode
+SUMMARY_SECTION_MAX_TOKENS = env.int('SUMMARY_SECTION_MAX_TOKENS', default=600)
+# Output budget of the subject line prompts
+SUMMARY_SUBJECT_MAX_TOKENS = env.int('SUMMARY_SUBJECT_MAX_TOKENS', default=60)
+# Chat completions are cached by prompt and transcript digest. LLM_CACHE_BACKEND
+# is "database", "django" (the cache named LLM_CACHE_ALIAS) or "none"
+LLM_CACHE_BACKEND = env('LLM_CACHE_BACKEND', default='database')
+LLM_CACHE_ALIAS = env('LLM_CACHE_ALIAS', default='default')
+LLM_CACHE_TTL_SECONDS = env.int(
+    'LLM_CACHE_TTL_SECONDS', default=30 * 24 * 60 * 60)
+LLM_CACHE_MAX_ENTRIES = env.int('LLM_CACHE_MAX_ENTRIES', default=10000)
+
+# config for semantic search
+# Transcripts are embedded in chunks of SEMANTIC_CHUNK_TOKENS, either with the
+# Azure OpenAI deployment EMBEDDING_DEPLOYMENT ("openai") or offline by feature
+# hashing into EMBEDDING_DIMENSIONS buckets ("hashing")
+EMBEDDING_BACKEND = env('EMBEDDING_BACKEND', default='hashing')
+EMBEDDING_DEPLOYMENT = env(
+    'EMBEDDING_DEPLOYMENT', default='text-embedding-3-small')
+EMBEDDING_DIMENSIONS = env.int('EMBEDDING_DIMENSIONS', default=512)
+SEMANTIC_CHUNK_TOKENS = env.int('SEMANTIC_CHUNK_TOKENS', default=200)
+# Number of users whose vector index is kept in memory per process
+SEMANTIC_INDEX_CACHE_SIZE = env.int('SEMANTIC_INDEX_CACHE_SIZE', default=100)
+# Chunks created this long before an index last caught up are checked again,
+# as a transaction that commits late can add chunks below the indexed ids
+SEMANTIC_INDEX_LOOKBACK_SECONDS = env.int(
+    'SEMANTIC_INDEX_LOOKBACK_SECONDS', default=300)
@@ -0,0 +1,188 @@
+import asyncio
+import email.utils
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+from django.test import SimpleTestCase, override_settings
+
+from . import clients
+from .ratelimit import DECREASE_COOLDOWN_SECONDS, AdaptiveLimiter, TokenBucket, _retry_after
+
+LIMITER_SETTINGS = dict(
+    OPENAI_INITIAL_CONCURRENCY=8, OPENAI_MIN_CONCURRENCY=1, OPENAI_MAX_CONCURRENCY=16,
+    OPENAI_MAX_RETRIES=2, OPENAI_BACKOFF_BASE_SECONDS=0.0, OPENAI_BACKOFF_MAX_SECONDS=0.0)
+
+
+def rate_limit_error(headers=None):
+    request = httpx.Request('POST', 'https://example.invalid/chat/completions')
+    response = httpx.Response(429, headers=headers or {}, request=request)
+    return openai.RateLimitError("Too many requests", response=response, body=None)
+
+
+class FakeStream:
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAsyncClient:
+
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class LoopClientTests(SimpleTestCase):
+
+    def test_shared_within_a_loop_and_closed_with_it(self):
+        made = []
+
+        def create():
+            made.append(FakeAsyncClient())
+            return made[-1]
+
+        async def get_twice():
+            first = clients._get_or_create_for_loop('test', create)
+            self.assertIs(clients._get_or_create_for_loop('test', create), first)
+            self.assertFalse(first.closed)
+
+        asyncio.run(get_twice())
+        asyncio.run(get_twice())
+        self.assertEqual([client.closed for client in made], [True, True])
+        self.assertEqual(len(clients._loop_clients), 0)
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def test_refill_and_wait(self):
+        bucket = TokenBucket(60)
+        bucket.take(60)
+        self.assertEqual(bucket.wait_time(1), 1.0)
+        bucket.refill(bucket.updated + 0.5)
+        self.assertAlmostEqual(bucket.available, 0.5)
+        self.assertAlmostEqual(bucket.wait_time(1), 0.5)
+        bucket.refill(bucket.updated + 600)
+        self.assertEqual(bucket.available, 60)
+        self.assertEqual(bucket.wait_time(1), 0.0)
+
+    def test_oversized_request_waits_for_full_bucket(self):
+        bucket = TokenBucket(60)
+        bucket.take(30)
+        self.assertEqual(bucket.wait_time(1000), 30.0)
+
+
+class RetryAfterTests(SimpleTestCase):
+
+    def test_headers(self):
+        self.assertEqual(_retry_after(rate_limit_error({'retry-after-ms': '1500'})), 1.5)
+        self.assertEqual(_retry_after(rate_limit_error({'retry-after': '3'})), 3.0)
+        self.assertIsNone(_retry_after(rate_limit_error({'retry-after': 'soon'})))
+        self.assertIsNone(_retry_after(rate_limit_error()))
+
+    def test_http_date(self):
+        when = email.utils.formatdate(time.time() + 30, usegmt=True)
+        self.assertAlmostEqual(_retry_after(rate_limit_error({'retry-after': when})), 30, delta=2)
+
+
+@override_settings(**LIMITER_SETTINGS)
+class AdaptiveLimiterTests(SimpleTestCase):
+
+    def test_throttle_halves_once_per_cooldown(self):
+        limiter = AdaptiveLimiter('test')
+        for _ in range(2):
+            limiter.acquire()
+            limiter.release(throttled=True)
+        self.assertEqual(limiter.concurrency, 4)
+
+        limiter.last_decrease -= DECREASE_COOLDOWN_SECONDS + 1
+        limiter.acquire()
+        limiter.release(throttled=True)
+        self.assertEqual(limiter.concurrency, 2)
+
+    def test_success_grows_additively(self):
+        limiter = AdaptiveLimiter('test')
+        limiter.acquire()
+        limiter.release(succeeded=True)
+        self.assertEqual(limiter.concurrency, 8 + 1 / 8)
+
+    def test_concurrency_floor(self):
+        limiter = AdaptiveLimiter('test')
+        for _ in range(5):
+            limiter.last_decrease = float('-inf')
+            limiter.acquire()
+            limiter.release(throttled=True)
+        self.assertEqual(limiter.concurrency, 1)
+
+    def test_retry_after_pauses_every_caller(self):
+        limiter = AdaptiveLimiter('test')
+        limiter.acquire()
+        limiter.release(throttled=True, retry_after=30)
+        with limiter.condition:
+            self.assertGreater(limiter._try_acquire(0), 29)
+
+    def test_limit_blocks_until_release(self):
+        limiter = AdaptiveLimiter('test')
+        limiter.concurrency = 1
+        limiter.acquire()
+        with limiter.condition:
+            self.assertIsNone(limiter._try_acquire(0))
+        limiter.release(succeeded=True)
+        with limiter.condition:
+            self.assertEqual(limiter._try_acquire(0), 0)
+
+    def test_call_retries_throttled_and_refunds_tokens(self):
+        limiter = AdaptiveLimiter('test', tokens_per_minute=1000)
+        attempts = []
+
+        def function():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise rate_limit_error({'retry-after': '0'})
+            return SimpleNamespace(usage=SimpleNamespace(total_tokens=100))
+
+        limiter.call(function, tokens=400)
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(limiter.counters['retries'], 1)
+        # 400 reserved on each attempt, 300 of the second given back
+        self.assertAlmostEqual(limiter.tokens.available, 500, delta=5)
+
+    def test_call_gives_up_after_max_retries(self):
+        limiter = AdaptiveLimiter('test')
+
+        def function():
+            raise rate_limit_error()
+
+        with self.assertRaises(openai.RateLimitError):
+            limiter.call(function)
+        self.assertEqual(limiter.counters['failures'], 1)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_stream_holds_slot_until_last_chunk(self):
+        limiter = AdaptiveLimiter('test', tokens_per_minute=1000)
+        chunks = [SimpleNamespace(usage=None), SimpleNamespace(usage=None),
+                  SimpleNamespace(usage=SimpleNamespace(total_tokens=100))]
+        in_flight = [limiter.in_flight for _ in limiter.stream(lambda: FakeStream(chunks), tokens=400)]
+        self.assertEqual(in_flight, [1, 1, 1])
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertAlmostEqual(limiter.tokens.available, 900, delta=5)
+
+    def test_abandoned_stream_releases_and_closes(self):
+        limiter = AdaptiveLimiter('test')
+        response = FakeStream([SimpleNamespace(usage=None)] * 3)
+        stream = limiter.stream(lambda: response)
+        next(stream)
+        stream.close()
+        self.assertTrue(response.closed)
+        self.assertEqual(limiter.in_flight, 0)
@@ -1,6 +1,7 @@
 
 from django.contrib import admin
 from django.urls import path, include
+from .views import LLMCacheStatsView, OpenAILimiterStatsView
 
 
 urlpatterns = [
@@ -9,4 +10,10 @@ urlpatterns = [
     path('files/', include('files.urls')),
     path('transcriptions/', include('transcription.urls')),
     path('summarizer/', include('summarizer.urls')),
+    path('jobs/', include('jobs.urls')),
+    path('meetings/', include('meetings.urls')),
+    path('async/', include('meetingscribe.async_urls')),
+    path('ops/openai-limits/', OpenAILimiterStatsView.as_view(),
+         name='openai-limits'),
+    path('ops/llm-cache/', LLMCacheStatsView.as_view(), name='llm-cache'),
 ]
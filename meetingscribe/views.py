@@ -0,0 +1,39 @@
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from summarizer import llm_cache
+
+from .ratelimit import get_limiter_stats
+
+
+class OpenAILimiterStatsView(APIView):
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Rate limiter state of this worker process, per deployment: the
+        current concurrency limit, calls in flight and waiting, remaining
+        budgets and throttle/retry counts since the process started.
+        GET /ops/openai-limits/
+        """
+        return Response({
+            "data": get_limiter_stats()
+        }, status=status.HTTP_200_OK)
+
+
+class LLMCacheStatsView(APIView):
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Hits, misses and hit rate of the LLM response cache in this worker
+        process since it started.
+        GET /ops/llm-cache/
+        """
+        return Response({
+            "data": llm_cache.get_stats()
+        }, status=status.HTTP_200_OK)
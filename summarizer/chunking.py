@@ -0,0 +1,115 @@
+import re
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """
+    Return the tiktoken encoding when tiktoken is installed, otherwise None.
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            # tiktoken is optional, fall back to an estimate
+            _encoding = None
+        _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+
+def split_into_chunks(text, max_tokens):
+    """
+    Split text into chunks of at most ``max_tokens`` tokens, breaking at
+    sentence boundaries where possible.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for sentence in _SENTENCE_END.split(text.strip()):
+        tokens = count_tokens(sentence)
+        if tokens > max_tokens:
+            # A single run-on sentence is split on words instead
+            pieces = _split_words(sentence, max_tokens)
+        else:
+            pieces = [(sentence, tokens)]
+
+        for piece, piece_tokens in pieces:
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append(' '.join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def _split_words(sentence, max_tokens):
+    pieces = []
+    words = []
+    for word in sentence.split():
+        candidate = ' '.join(words + [word])
+        if words and count_tokens(candidate) > max_tokens:
+            piece = ' '.join(words)
+            pieces.append((piece, count_tokens(piece)))
+            words = []
+        words.append(word)
+    if words:
+        piece = ' '.join(words)
+        pieces.append((piece, count_tokens(piece)))
+    return pieces
+
+
+def normalize(text):
+    """
+    Normalise text for duplicate detection.
+    """
+    text = _NON_WORD.sub(' ', (text or '').lower())
+    return _SPACES.sub(' ', text).strip()
+
+
+def merge_action_items(chunk_items):
+    """
+    Merge action items from several chunks, dropping duplicates. When the same
+    item appears twice, missing fields are filled in from the later copy.
+    """
+    merged = {}
+    for items in chunk_items:
+        for item in items:
+            key = normalize(item.get('description'))
+            if not key:
+                continue
+            if key not in merged:
+                merged[key] = dict(item)
+                continue
+            for field, value in item.items():
+                if value and not merged[key].get(field):
+                    merged[key][field] = value
+    return list(merged.values())
+
+
+def merge_key_points(chunk_points):
+    merged = {}
+    for points in chunk_points:
+        for point in points:
+            key = normalize(point.get('content'))
+            if key and key not in merged:
+                merged[key] = dict(point)
+    return list(merged.values())
@@ -0,0 +1,127 @@
+"""
+Read-through cache of chat completion responses.
+
+Responses are keyed on the model, the sampling parameters, the system prompt
+and a digest of the user text, so the same prompt over the same transcript is
+only sent to the model once while the entry lives. The backend is chosen with
+LLM_CACHE_BACKEND:
+
+- "database": LLMCacheEntry rows, expired after LLM_CACHE_TTL_SECONDS and
+  trimmed to the LLM_CACHE_MAX_ENTRIES most recently used
+- "django": the Django cache named LLM_CACHE_ALIAS (e.g. Redis), which
+  applies its own size limit
+- "none": caching disabled
+"""
+import hashlib
+import json
+import random
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LLMCacheEntry
+
+# Share of writes that also run eviction on the database backend
+EVICT_PROBABILITY = 0.02
+
+_stats = dict(hits=0, misses=0, writes=0)
+_stats_lock = threading.Lock()
+
+
+def make_key(system_message, text, **params):
+    text_digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    material = json.dumps(
+        [params, system_message, text_digest], sort_keys=True)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class DatabaseBackend:
+
+    def get(self, key):
+        cutoff = timezone.now() - timedelta(seconds=settings.LLM_CACHE_TTL_SECONDS)
+        response = LLMCacheEntry.objects.filter(
+            key=key, created_at__gte=cutoff).values_list('response', flat=True).first()
+        if response is not None:
+            LLMCacheEntry.objects.filter(key=key).update(
+                hits=F('hits') + 1, last_used_at=timezone.now())
+        return response
+
+    def set(self, key, model, response):
+        now = timezone.now()
+        LLMCacheEntry.objects.update_or_create(
+            key=key,
+            defaults=dict(model=model, response=response,
+                          created_at=now, last_used_at=now))
+        if random.random() < EVICT_PROBABILITY:
+            self.evict()
+
+    def evict(self):
+        cutoff = timezone.now() - timedelta(seconds=settings.LLM_CACHE_TTL_SECONDS)
+        LLMCacheEntry.objects.filter(created_at__lt=cutoff).delete()
+        # Everything used less recently than the newest MAX_ENTRIES goes
+        oldest_kept = LLMCacheEntry.objects.order_by('-last_used_at').values_list(
+            'last_used_at', flat=True)[settings.LLM_CACHE_MAX_ENTRIES:settings.LLM_CACHE_MAX_ENTRIES + 1]
+        for last_used_at in oldest_kept:
+            LLMCacheEntry.objects.filter(last_used_at__lte=last_used_at).delete()
+
+
+class DjangoCacheBackend:
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(f"llm:{key}")
+
+    def set(self, key, model, response):
+        self.cache.set(f"llm:{key}", response,
+                       timeout=settings.LLM_CACHE_TTL_SECONDS)
+
+
+class NullBackend:
+
+    def get(self, key):
+        return None
+
+    def set(self, key, model, response):
+        pass
+
+
+def get_backend():
+    backend = settings.LLM_CACHE_BACKEND
+    if backend == 'database':
+        return DatabaseBackend()
+    if backend == 'django':
+        return DjangoCacheBackend(settings.LLM_CACHE_ALIAS)
+    if backend == 'none':
+        return NullBackend()
+    raise ValueError(f"Unknown LLM cache backend: {backend}")
+
+
+def get(key):
+    response = get_backend().get(key)
+    with _stats_lock:
+        _stats['hits' if response is not None else 'misses'] += 1
+    return response
+
+
+def set(key, model, response):
+    get_backend().set(key, model, response)
+    with _stats_lock:
+        _stats['writes'] += 1
+
+
+def get_stats():
+    """
+    Hit and miss counts of this process since it started.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+    stats['backend'] = settings.LLM_CACHE_BACKEND
+    return stats
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:48
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('summarizer', '0004_summarychunk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actionitem',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('description', config='english'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddField(
+            model_name='keypoint',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('content', config='english'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddField(
+            model_name='summary',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('subject', config='english'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='actionitem',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='action_item_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='keypoint',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='key_point_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='summary',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='summary_search_idx'),
+        ),
+    ]
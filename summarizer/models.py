@@ -1,16 +1,27 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
-from transcription.models import Transcription
+from transcription.models import SEARCH_CONFIG, Transcription
 
 
 class Summary(models.Model):
     transcription = models.OneToOneField(
         Transcription, on_delete=models.CASCADE)
     subject = models.CharField(max_length=255, blank=True, null=True)
+    search_vector = models.GeneratedField(
+        expression=SearchVector('subject', config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Summary for {self.transcription.audio_file.name} "
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='summary_search_idx'),
+        ]
+
 
 class actionItem(models.Model):
     summary = models.ForeignKey(
@@ -19,15 +30,63 @@ class actionItem(models.Model):
     assigned_to = models.CharField(max_length=255, blank=True, null=True)
     due_date = models.CharField(blank=True, null=True)
     status = models.CharField(max_length=50, default='pending')
+    search_vector = models.GeneratedField(
+        expression=SearchVector('description', config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True)
 
     def __str__(self):
         return f"Action Item: {self.description[:50]} for {self.summary.transcription.audio_file.name}"
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'],
+                     name='action_item_search_idx'),
+        ]
+
 
 class KeyPoint(models.Model):
     summary = models.ForeignKey(
         Summary, on_delete=models.CASCADE, related_name='key_points')
     content = models.TextField()
+    search_vector = models.GeneratedField(
+        expression=SearchVector('content', config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True)
 
     def __str__(self):
         return f"Key Point: {self.content[:50]}"
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='key_point_search_idx'),
+        ]
+
+
+class SummaryChunk(models.Model):
+    """
+    Cached summary of one transcript chunk, keyed by a digest of the prompt
+    and chunk text, so unchanged chunks are not sent to the model again.
+    """
+    digest = models.CharField(max_length=64, unique=True)
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Summary chunk {self.digest[:12]}"
+
+
+class LLMCacheEntry(models.Model):
+    """
+    Cached chat completion, keyed by a digest of the model, parameters,
+    system prompt and user text. See summarizer.llm_cache.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    model = models.CharField(max_length=100)
+    response = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    last_used_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.model} response {self.key[:12]}"
@@ -23,6 +23,12 @@ class SummaryResultSerializer(serializers.ModelSerializer):
         fields = ['id', 'subject', 'action_items', 'key_points', 'created_at']
 
 
+class SummarizeRequestSerializer(serializers.Serializer):
+    resummarize = serializers.BooleanField(default=False, required=False)
+    mode = serializers.ChoiceField(
+        choices=['combined', 'sectioned'], default='combined', required=False)
+
+
 # Alternative: If you're passing the data as a dictionary (not model instances)
 class SummaryResultDictSerializer(serializers.Serializer):
     subject = serializers.CharField()
@@ -1,36 +1,101 @@
-import environ
-from openai import AzureOpenAI
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cached_property
+from asgiref.sync import sync_to_async
+from meetingscribe.clients import get_async_openai_client, get_openai_client
+from meetingscribe.ratelimit import get_limiter
 from transcription.services import TranscriptionService
+import hashlib
 import json
+from django.conf import settings
+from django.db import connections, transaction
 from django.utils import timezone
-from .models import Summary, actionItem, KeyPoint
+from .chunking import count_tokens, merge_action_items, merge_key_points, split_into_chunks
+from . import llm_cache
+from .models import Summary, SummaryChunk, actionItem, KeyPoint
+from .streaming import LIST_EVENTS, SummaryStreamParser, extract_json
 
-# Initialize environment variables
-env = environ.Env()
+SUMMARY_INSTRUCTION = (
+    "You are a helpful assistant. "
+    "Read the following meeting transcript and return a JSON object with three fields: "
+    "'subject' (a short subject line), "
+    "'action_items' (a list of action items), "
+    "and 'key_points' (a list of key points).\n\n"
+    "Return ONLY valid JSON in this format:"
+)
+SUMMARY_FORMAT = '''
+                {
+                "subject": "Short subject line.",
+                "action_items": [
+                    {
+                    "description": "Description of the action item.",
+                    "assigned_to": "Person assigned.",
+                    "due_date": "Due date if available.",
+                    "status": "pending"
+                    }
+                ],
+                "key_points": [
+                    {
+                    "content": "Key point text here."
+                    }
+                ]
+                }
+                '''
+
+SUMMARY_MODE_COMBINED = 'combined'
+SUMMARY_MODE_SECTIONED = 'sectioned'
+SUMMARY_SECTIONS = ('subject', 'action_items', 'key_points')
+
+
+def _parse_list(content):
+    return extract_json(content, '[', ']')
+
+
+def _check_finished(finish_reason):
+    # A response cut off at max_tokens is incomplete JSON or a truncated
+    # subject, so it is an error rather than something to parse or cache
+    if finish_reason == 'length':
+        raise ValueError("Model response was cut off at max_tokens")
+
+
+def _run_in_worker(function, *args):
+    # Pool threads open their own database connections (the response cache),
+    # which are closed when the task is done
+    try:
+        return function(*args)
+    finally:
+        connections.close_all()
 
 
 class SummarizerService:
 
     def __init__(self, user):
-        self.client = AzureOpenAI(
-            azure_endpoint=env('OPENAI_API_BASE'),
-            api_key=env('OPENAI_API_KEY'),
-            api_version="2024-12-01-preview"
-        )
         self.user = user
 
-    def get_subject(self, text):
+    @cached_property
+    def client(self):
+        return get_openai_client(api_version="2024-12-01-preview")
+
+    @cached_property
+    def async_client(self):
+        return get_async_openai_client(api_version="2024-12-01-preview")
+
+    @cached_property
+    def transcription_service(self):
+        return TranscriptionService(self.user)
+
+    def get_subject(self, text, max_tokens=1024, use_cache=True):
         instruction = (
             "You are a helpful assistant. "
             "Read the following meeting transcript and return ONLY a short subject line summarizing the meeting."
         )
-        return self._call_gpt(instruction, text)
+        return self._call_gpt(instruction, text, max_tokens=max_tokens,
+                              use_cache=use_cache)
 
-    def extract_action_items(self, text):
+    def extract_action_items(self, text, max_tokens=1024, use_cache=True):
         instruction = (
             "You are a helpful assistant. "
             "Extract all action items from this meeting transcript. "
-            "Return JSON array with fields: description, assigned_to, due_date"
+            "Return ONLY a JSON array with fields: description, assigned_to, due_date"
         )
         format_example = '''
 [
@@ -42,13 +107,15 @@ class SummarizerService:
 }
 ]
 '''
-        return self._call_gpt(instruction + "\nFormat:\n" + format_example, text)
+        return self._call_gpt(instruction + "\nFormat:\n" + format_example, text,
+                              max_tokens=max_tokens, validate=_parse_list,
+                              use_cache=use_cache)
 
-    def extract_key_points(self, text):
+    def extract_key_points(self, text, max_tokens=1024, use_cache=True):
         instruction = (
             "You are a helpful assistant. "
             "Extract the key points from this meeting transcript. "
-            "Return JSON array with each item having a 'content' field."
+            "Return ONLY a JSON array with each item having a 'content' field."
         )
         format_example = '''
 [
@@ -57,91 +124,374 @@ class SummarizerService:
 }
 ]
 '''
-        return self._call_gpt(instruction + "\nFormat:\n" + format_example, text)
-
-    def _call_gpt(self, system_message, text):
-        response = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": text}
-            ],
-            max_tokens=1024,
-            temperature=0.3,
-            top_p=1.0
-        )
-        return response.choices[0].message.content
+        return self._call_gpt(instruction + "\nFormat:\n" + format_example, text,
+                              max_tokens=max_tokens, validate=_parse_list,
+                              use_cache=use_cache)
 
-    def summarize_all(self, audio_id):
+    def _call_gpt(self, system_message, text, max_tokens=1024, validate=None,
+                  use_cache=True):
+        """
+        Send one prompt to the model, through the response cache. A response
+        that is cut off or fails ``validate`` (e.g. json.loads) raises and is
+        not cached. Without ``use_cache`` the model is always called and its
+        response replaces the cached one.
+        """
+        params = self._gpt_params(max_tokens)
+        key = llm_cache.make_key(system_message, text, **params)
+        cached = llm_cache.get(key) if use_cache else None
+        if cached is not None:
+            return cached
 
-        transcription_service = TranscriptionService(self.user)
-        transcription = transcription_service.get_transcription(
+        response = get_limiter('gpt-4').call(
+            lambda: self.client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": text}
+                ],
+                **params
+            ),
+            tokens=self._estimate_tokens(system_message, text, max_tokens))
+        _check_finished(response.choices[0].finish_reason)
+        content = response.choices[0].message.content
+        if validate:
+            validate(content)
+        llm_cache.set(key, params['model'], content)
+        return content
+
+    def _gpt_params(self, max_tokens):
+        return dict(model="gpt-4", max_tokens=max_tokens,
+                    temperature=0.3, top_p=1.0)
+
+    def _estimate_tokens(self, system_message, text, max_tokens):
+        # Reserved from the tokens-per-minute budget before the call
+        return count_tokens(system_message) + count_tokens(text) + max_tokens
+
+    async def _acall_gpt(self, system_message, text, max_tokens=1024, validate=None):
+        params = self._gpt_params(max_tokens)
+        key = llm_cache.make_key(system_message, text, **params)
+        cached = await sync_to_async(llm_cache.get)(key)
+        if cached is not None:
+            return cached
+
+        response = await get_limiter('gpt-4').acall(
+            lambda: self.async_client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": text}
+                ],
+                **params
+            ),
+            tokens=self._estimate_tokens(system_message, text, max_tokens))
+        _check_finished(response.choices[0].finish_reason)
+        content = response.choices[0].message.content
+        if validate:
+            validate(content)
+        await sync_to_async(llm_cache.set)(key, params['model'], content)
+        return content
+
+    def _stream_gpt(self, system_message, text, max_tokens=1024, validate=None):
+        """
+        Like _call_gpt, but yields the response text as it is generated. A
+        cached response is yielded in one piece.
+        """
+        params = self._gpt_params(max_tokens)
+        key = llm_cache.make_key(system_message, text, **params)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        # The limiter slot is held until the last chunk, which reports the
+        # tokens used
+        response = get_limiter('gpt-4').stream(
+            lambda: self.client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": text}
+                ],
+                stream=True,
+                stream_options={"include_usage": True},
+                **params
+            ),
+            tokens=self._estimate_tokens(system_message, text, max_tokens))
+        parts = []
+        finish_reason = None
+        try:
+            for chunk in response:
+                # Azure sends content filter results, and the final usage, in
+                # chunks without choices
+                if not chunk.choices:
+                    continue
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                if chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
+        finally:
+            # Gives the slot back at once if the client stops reading
+            response.close()
+
+        _check_finished(finish_reason)
+        content = ''.join(parts)
+        if validate:
+            validate(content)
+        llm_cache.set(key, params['model'], content)
+
+    def get_transcription_to_summarize(self, audio_id, resummarize=False):
+        transcription = self.transcription_service.get_transcription(
             audio_file_id=audio_id)
         if not transcription:
             raise ValueError(
                 "Transcription not found for the given audio file ")
+        # Checked before calling the model so a duplicate request costs nothing
+        if not resummarize and Summary.objects.filter(transcription=transcription).exists():
+            raise ValueError(
+                "Summary already exists, set resummarize to replace it")
+        return transcription
+
+    def summarize_all(self, audio_id, resummarize=False, mode=SUMMARY_MODE_COMBINED):
+
+        transcription = self.get_transcription_to_summarize(
+            audio_id, resummarize)
         text = transcription.text
 
-        instruction = (
-            "You are a helpful assistant. "
-            "Read the following meeting transcript and return a JSON object with three fields: "
-            "'subject' (a short subject line), "
-            "'action_items' (a list of action items), "
-            "and 'key_points' (a list of key points).\n\n"
-            "Return ONLY valid JSON in this format:"
-        )
-        format_example = '''
-                {
-                "subject": "Short subject line.",
-                "action_items": [
-                    {
-                    "description": "Description of the action item.",
-                    "assigned_to": "Person assigned.",
-                    "due_date": "Due date if available.",
-                    "status": "pending"
-                    }
-                ],
-                "key_points": [
-                    {
-                    "content": "Key point text here."
-                    }
-                ]
-                }
-                '''
-        data = json.loads(self._call_gpt(
-            instruction + "\nFormat:\n" + format_example, text))
-        result = self.save_summary(transcription, data)
+        if count_tokens(text) > settings.SUMMARY_CHUNK_TOKENS:
+            data = self.summarize_chunks(text)
+        elif mode == SUMMARY_MODE_SECTIONED:
+            data = self.summarize_sections(text)
+        else:
+            data = self.summarize_text(text)
+        result = self.save_summary(transcription, data, replace=resummarize)
 
         return result
 
-    def save_summary(self, transcription, summary_data):
+    def summarize_sections(self, text, sections=SUMMARY_SECTIONS, use_cache=True):
+        """
+        Run the subject, action item and key point prompts concurrently, each
+        with its own small output budget, so a summary takes about as long as
+        its slowest section rather than one long combined response.
+        """
+        max_tokens = settings.SUMMARY_SECTION_MAX_TOKENS
+        runners = {
+            'subject': lambda: self.get_subject(
+                text, max_tokens=settings.SUMMARY_SUBJECT_MAX_TOKENS,
+                use_cache=use_cache).strip().strip('"'),
+            'action_items': lambda: _parse_list(self.extract_action_items(
+                text, max_tokens=max_tokens, use_cache=use_cache)),
+            'key_points': lambda: _parse_list(self.extract_key_points(
+                text, max_tokens=max_tokens, use_cache=use_cache)),
+        }
+        with ThreadPoolExecutor(max_workers=len(sections)) as executor:
+            futures = {
+                section: executor.submit(_run_in_worker, runners[section])
+                for section in sections
+            }
+        return {section: future.result() for section, future in futures.items()}
 
-        summary = Summary.objects.create(
-            transcription=transcription,
-            subject=summary_data.get('subject', ''),
-            created_at=timezone.now()
+    def recompute_section(self, audio_id, section):
+        """
+        Regenerate one section of an existing summary, leaving the others.
+        """
+        if section not in SUMMARY_SECTIONS:
+            raise ValueError(f"Unknown summary section: {section}")
+        transcription = self.transcription_service.get_transcription(
+            audio_file_id=audio_id)
+        if not transcription:
+            raise ValueError(
+                "Transcription not found for the given audio file ")
+        try:
+            summary = Summary.objects.get(transcription=transcription)
+        except Summary.DoesNotExist:
+            raise ValueError("Summary not found, summarize the audio file first")
+
+        # Cached responses are skipped, or this would return the old section
+        text = transcription.text
+        if count_tokens(text) > settings.SUMMARY_CHUNK_TOKENS:
+            value = self.summarize_chunked_section(text, section, use_cache=False)
+        else:
+            value = self.summarize_sections(text, [section], use_cache=False)[section]
+
+        with transaction.atomic():
+            if section == 'subject':
+                Summary.objects.filter(id=summary.id).update(subject=value)
+            elif section == 'action_items':
+                summary.action_items.all().delete()
+                actionItem.objects.bulk_create([
+                    actionItem(summary=summary, **self._action_item_fields(item))
+                    for item in value
+                ])
+            else:
+                summary.key_points.all().delete()
+                KeyPoint.objects.bulk_create([
+                    KeyPoint(summary=summary, **self._key_point_fields(point))
+                    for point in value
+                ])
+
+        return {section: value}
+
+    def summarize_chunked_section(self, text, section, use_cache=True):
+        """
+        Map-reduce one section of a transcript too long for one request:
+        only that section's prompt is run on each chunk, and the results are
+        merged as in summarize_chunks.
+        """
+        chunks = split_into_chunks(text, settings.SUMMARY_CHUNK_TOKENS)
+        with ThreadPoolExecutor(max_workers=settings.SUMMARY_MAX_WORKERS) as executor:
+            values = list(executor.map(
+                lambda chunk: _run_in_worker(
+                    self.summarize_sections, chunk, [section], use_cache)[section],
+                chunks))
+
+        if section == 'subject':
+            return self.merge_subjects(values, use_cache=use_cache)
+        if section == 'action_items':
+            return merge_action_items(values)
+        return merge_key_points(values)
+
+    async def asummarize_all(self, audio_id, resummarize=False, mode=SUMMARY_MODE_COMBINED):
+        """
+        Async version of summarize_all, for the ASGI views. A transcript that
+        fits in one request is summarized on the event loop; longer ones go
+        through the threaded chunked path.
+        """
+        transcription = await sync_to_async(self.get_transcription_to_summarize)(
+            audio_id, resummarize)
+        text = transcription.text
+
+        if count_tokens(text) > settings.SUMMARY_CHUNK_TOKENS:
+            data = await sync_to_async(self.summarize_chunks)(text)
+        elif mode == SUMMARY_MODE_SECTIONED:
+            data = await sync_to_async(self.summarize_sections)(text)
+        else:
+            data = json.loads(await self._acall_gpt(
+                SUMMARY_INSTRUCTION + "\nFormat:\n" + SUMMARY_FORMAT, text,
+                validate=json.loads))
+
+        return await sync_to_async(self.save_summary)(
+            transcription, data, replace=resummarize)
+
+    def stream_summary(self, transcription, resummarize=False):
+        """
+        Summarize a transcription, yielding (event, data) pairs as the parts
+        of the summary are generated: the subject, then each action item and
+        key point as soon as its JSON object is complete. The summary is
+        saved once the model has finished, and a final "done" event carries
+        the saved result.
+
+        Transcripts too long for one request are summarized in chunks as in
+        summarize_all, and their parts are sent once merged.
+        """
+        text = transcription.text
+        if count_tokens(text) <= settings.SUMMARY_CHUNK_TOKENS:
+            parser = SummaryStreamParser()
+            for delta in self._stream_gpt(
+                    SUMMARY_INSTRUCTION + "\nFormat:\n" + SUMMARY_FORMAT, text,
+                    validate=json.loads):
+                yield from parser.feed(delta)
+            data = parser.result()
+        else:
+            data = self.summarize_chunks(text)
+            yield 'subject', {'subject': data.get('subject')}
+            for field, event in LIST_EVENTS.items():
+                for element in data.get(field, []):
+                    yield event, element
+
+        yield 'done', self.save_summary(transcription, data, replace=resummarize)
+
+    def summarize_text(self, text):
+        return json.loads(self._call_gpt(
+            SUMMARY_INSTRUCTION + "\nFormat:\n" + SUMMARY_FORMAT, text,
+            validate=json.loads))
+
+    def summarize_chunks(self, text):
+        """
+        Map-reduce summary for transcripts that do not fit in one request.
+
+        The transcript is split into token-bounded chunks that are summarized
+        concurrently, then the subjects, action items and key points are
+        merged. Chunk results are stored as SummaryChunk rows, so only new or
+        changed chunks cost a model call on the next run.
+        """
+        chunks = split_into_chunks(text, settings.SUMMARY_CHUNK_TOKENS)
+        digests = [self._chunk_digest(chunk) for chunk in chunks]
+        results = {
+            chunk.digest: chunk.data
+            for chunk in SummaryChunk.objects.filter(digest__in=digests)
+        }
+        missing = {
+            digest: chunk for digest, chunk in zip(digests, chunks)
+            if digest not in results
+        }
+        print(f"Summarizing {len(missing)} of {len(chunks)} transcript chunks")
+
+        errors = []
+        with ThreadPoolExecutor(max_workers=settings.SUMMARY_MAX_WORKERS) as executor:
+            futures = {
+                executor.submit(_run_in_worker, self.summarize_text, chunk): digest
+                for digest, chunk in missing.items()
+            }
+            for future in as_completed(futures):
+                digest = futures[future]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    print(f"Chunk {digest[:12]} failed: {e}")
+                    errors.append(e)
+                    continue
+                SummaryChunk.objects.get_or_create(
+                    digest=digest, defaults={'data': data})
+                results[digest] = data
+
+        if errors:
+            raise errors[0]
+
+        ordered = [results[digest] for digest in digests]
+        return dict(
+            subject=self.merge_subjects(
+                [data.get('subject') for data in ordered]),
+            action_items=merge_action_items(
+                data.get('action_items', []) for data in ordered),
+            key_points=merge_key_points(
+                data.get('key_points', []) for data in ordered)
         )
-        action_items = []
 
-        for item in summary_data.get('action_items', []):
-            actionItem.objects.create(
-                summary=summary,
-                description=item.get('description', ''),
-                assigned_to=item.get('assigned_to', ''),
-                due_date=item.get('due_date'),
-                status=item.get('status', 'pending')
-            )
-            action_items.append(item)
+    def merge_subjects(self, subjects, use_cache=True):
+        subjects = list(dict.fromkeys(s.strip() for s in subjects if s and s.strip()))
+        if len(subjects) <= 1:
+            return subjects[0] if subjects else ''
 
-        key_points = []
+        instruction = (
+            "You are a helpful assistant. "
+            "The following are subject lines for consecutive parts of one meeting. "
+            "Return ONLY a single short subject line for the whole meeting."
+        )
+        return self._call_gpt(instruction, "\n".join(subjects),
+                              max_tokens=settings.SUMMARY_SUBJECT_MAX_TOKENS,
+                              use_cache=use_cache).strip()
 
-        for point in summary_data.get('key_points', []):
-            KeyPoint.objects.create(
-                summary=summary,
-                content=point.get('content', '')
-            )
+    def _chunk_digest(self, chunk):
+        key = "\n".join([SUMMARY_INSTRUCTION, SUMMARY_FORMAT, chunk])
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
 
-            key_points.append(point)
+    def save_summary(self, transcription, summary_data, replace=False):
+        """
+        Persist a summary and its items in one transaction. With ``replace``
+        an existing summary for the transcription is updated in place and its
+        items are swapped for the new ones.
+        """
+        action_items = list(summary_data.get('action_items', []))
+        key_points = list(summary_data.get('key_points', []))
+
+        summary = self._write_summary(
+            transcription,
+            subject=summary_data.get('subject', ''),
+            action_items=[
+                self._action_item_fields(item) for item in action_items
+            ],
+            key_points=[
+                self._key_point_fields(point) for point in key_points
+            ],
+            replace=replace
+        )
 
         result = dict(
             subject=summary.subject,
@@ -151,22 +501,94 @@ class SummarizerService:
 
         return result
 
-    def get_summary(self, audio_id):
-        try:
-            transcription_service = TranscriptionService(self.user)
-            transcription = transcription_service.get_transcription(
-                audio_file_id=audio_id)
-            if not transcription:
-                return None
+    def _action_item_fields(self, item):
+        return dict(
+            description=item.get('description', ''),
+            assigned_to=item.get('assigned_to', ''),
+            due_date=item.get('due_date'),
+            status=item.get('status', 'pending')
+        )
 
-            summary = Summary.objects.get(transcription=transcription)
-            action_items = summary.action_items.all()
-            key_points = summary.key_points.all()
-            result = dict(
-                subject=summary.subject,
-                action_items=[item for item in action_items],
-                key_points=[point for point in key_points]
-            )
-            return result
+    def _key_point_fields(self, point):
+        return dict(content=point.get('content', ''))
+
+    def copy_summary(self, source_transcription, transcription):
+        """
+        Copy the summary of ``source_transcription`` onto ``transcription``.
+        Used when an identical recording was already summarized.
+        """
+        try:
+            source = Summary.objects.prefetch_related('action_items', 'key_points').get(
+                transcription=source_transcription)
         except Summary.DoesNotExist:
             return None
+
+        return self._write_summary(
+            transcription,
+            subject=source.subject,
+            action_items=[
+                dict(
+                    description=item.description,
+                    assigned_to=item.assigned_to,
+                    due_date=item.due_date,
+                    status=item.status
+                )
+                for item in source.action_items.all()
+            ],
+            key_points=[
+                dict(content=point.content) for point in source.key_points.all()
+            ]
+        )
+
+    def _write_summary(self, transcription, subject, action_items, key_points, replace=False):
+        # One transaction and one INSERT per table, so a failure never
+        # leaves a summary with only some of its items
+        with transaction.atomic():
+            if replace:
+                summary, created = Summary.objects.select_for_update().get_or_create(
+                    transcription=transcription,
+                    defaults={'subject': subject}
+                )
+                if not created:
+                    summary.subject = subject
+                    summary.save(update_fields=['subject'])
+                    summary.action_items.all().delete()
+                    summary.key_points.all().delete()
+            else:
+                # get_or_create rather than a check and an INSERT, so of two
+                # concurrent jobs the loser also gets the ValueError
+                summary, created = Summary.objects.get_or_create(
+                    transcription=transcription,
+                    defaults={'subject': subject, 'created_at': timezone.now()}
+                )
+                if not created:
+                    raise ValueError(
+                        "Summary already exists for this transcription")
+
+            actionItem.objects.bulk_create([
+                actionItem(summary=summary, **item) for item in action_items
+            ])
+            KeyPoint.objects.bulk_create([
+                KeyPoint(summary=summary, **point) for point in key_points
+            ])
+        return summary
+
+    def get_summary(self, audio_id):
+        # The summary and its items in three queries, instead of walking
+        # audio file -> transcription -> summary -> items one lookup at a time
+        summary = Summary.objects.prefetch_related('action_items', 'key_points').filter(
+            transcription__audio_file__id=audio_id,
+            transcription__audio_file__user=self.user
+        ).order_by('-created_at').first()
+        if not summary:
+            # Still raises ValueError when the audio file does not exist
+            self.transcription_service.audio_file_service.get_audio_file_by_id(
+                audio_id)
+            return None
+
+        result = dict(
+            subject=summary.subject,
+            action_items=list(summary.action_items.all()),
+            key_points=list(summary.key_points.all())
+        )
+        return result
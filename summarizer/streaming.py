@@ -0,0 +1,114 @@
+import json
+
+# Top-level fields of the summary JSON and the event sent for each element
+LIST_EVENTS = {
+    'action_items': 'action_item',
+    'key_points': 'key_point',
+}
+
+
+def extract_json(text, opener='{', closer='}'):
+    """
+    Decode the JSON object (or with '[' and ']', array) in a model response,
+    ignoring any code fence or prose the model wrapped around it.
+    """
+    start = text.find(opener)
+    end = text.rfind(closer)
+    if start == -1 or end < start:
+        kind = 'object' if opener == '{' else 'array'
+        raise ValueError(f"Model response did not contain a JSON {kind}")
+    return json.loads(text[start:end + 1])
+
+
+class SummaryStreamParser:
+    """
+    Incremental parser for the summary JSON as the model streams it.
+
+    Text is fed in as it arrives and ``feed`` returns the parts that became
+    complete: the subject once its string closes, and each action item or key
+    point once its object closes. Only the top level of the document is
+    tracked, so each character is scanned once and completed elements are
+    decoded with ``json.loads``.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.key = None
+        self.expecting_value = False
+        self.element_start = None
+
+    def feed(self, text):
+        self.buffer += text
+        events = []
+        buffer = self.buffer
+        for position in range(self.position, len(buffer)):
+            char = buffer[position]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        events.extend(self._top_level_string(
+                            buffer[self.string_start:position + 1]))
+                continue
+
+            if char == '"':
+                self.in_string = True
+                self.string_start = position
+            elif char in '{[':
+                self.depth += 1
+                if self.depth == 3 and char == '{' and self.key in LIST_EVENTS:
+                    self.element_start = position
+            elif char in '}]':
+                if self.depth == 3 and char == '}' and self.element_start is not None:
+                    events.extend(self._element(
+                        buffer[self.element_start:position + 1]))
+                    self.element_start = None
+                self.depth -= 1
+            elif self.depth == 1:
+                if char == ':':
+                    self.expecting_value = True
+                elif char == ',':
+                    self.expecting_value = False
+
+        self.position = len(buffer)
+        return events
+
+    def result(self):
+        """
+        Decode the whole document once the stream has ended.
+        """
+        return extract_json(self.buffer)
+
+    def _top_level_string(self, literal):
+        value = json.loads(literal)
+        if not self.expecting_value:
+            self.key = value
+            return []
+        self.expecting_value = False
+        if self.key == 'subject':
+            return [('subject', {'subject': value})]
+        return []
+
+    def _element(self, literal):
+        try:
+            element = json.loads(literal)
+        except ValueError:
+            return []
+        return [(LIST_EVENTS[self.key], element)]
+
+
+def format_event(event, data):
+    """
+    Encode one server-sent event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
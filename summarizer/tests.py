@@ -1,3 +1,96 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from .services import SummarizerService, _check_finished, _parse_list
+from .streaming import SummaryStreamParser, extract_json, format_event
+
+SUMMARY = json.dumps({
+    "subject": "Budget \"Q3\" review {draft}",
+    "action_items": [
+        {"description": "Send the [final] numbers", "assigned_to": "Ana",
+         "due_date": "Friday", "status": "pending"},
+        {"description": "Book a room", "assigned_to": "", "due_date": "", "status": "pending"},
+    ],
+    "key_points": [{"content": "Costs are up } 5%"}],
+}, indent=2)
+
+
+class ExtractJsonTests(SimpleTestCase):
+
+    def test_strips_code_fence(self):
+        self.assertEqual(
+            extract_json('```json\n{"subject": "Budget"}\n```'), {'subject': 'Budget'})
+        self.assertEqual(
+            _parse_list('Here you go:\n```json\n[{"content": "a"}]\n```'), [{'content': 'a'}])
+
+    def test_missing_json(self):
+        with self.assertRaises(ValueError):
+            extract_json('no json here')
+        with self.assertRaises(ValueError):
+            _parse_list('{"content": "a"}')
+
+
+class CheckFinishedTests(SimpleTestCase):
+
+    def test_truncated_response_is_an_error(self):
+        _check_finished('stop')
+        _check_finished(None)
+        with self.assertRaises(ValueError):
+            _check_finished('length')
+
+
+class SummaryStreamParserTests(SimpleTestCase):
+
+    def feed_in_pieces(self, text, size):
+        parser = SummaryStreamParser()
+        events = []
+        for start in range(0, len(text), size):
+            events.extend(parser.feed(text[start:start + size]))
+        return parser, events
+
+    def test_events_in_order_whatever_the_split(self):
+        data = json.loads(SUMMARY)
+        expected = (
+            [('subject', {'subject': data['subject']})]
+            + [('action_item', item) for item in data['action_items']]
+            + [('key_point', point) for point in data['key_points']])
+        for size in (1, 3, 7, len(SUMMARY)):
+            parser, events = self.feed_in_pieces(SUMMARY, size)
+            self.assertEqual(events, expected)
+            self.assertEqual(parser.result(), data)
+
+    def test_element_sent_only_once_complete(self):
+        parser = SummaryStreamParser()
+        self.assertEqual(parser.feed('{"subject": "Plan", "key_points": [{"content": "a'), [
+            ('subject', {'subject': 'Plan'})])
+        self.assertEqual(parser.feed('"}'), [('key_point', {'content': 'a'})])
+
+    def test_result_ignores_code_fence(self):
+        parser, events = self.feed_in_pieces('```json\n' + SUMMARY + '\n```', 5)
+        self.assertEqual(len(events), 4)
+        self.assertEqual(parser.result(), json.loads(SUMMARY))
+
+    def test_format_event(self):
+        self.assertEqual(format_event('subject', {'subject': 'Plan'}),
+                         'event: subject\ndata: {"subject": "Plan"}\n\n')
+
+
+class ChunkedSectionTests(SimpleTestCase):
+
+    def test_only_requested_section_is_regenerated(self):
+        service = SummarizerService(user=None)
+        sections = {
+            'one': {'key_points': [{'content': 'Costs are up'}]},
+            'two': {'key_points': [{'content': 'costs are up.'}, {'content': 'Hire'}]},
+        }
+        with mock.patch('summarizer.services.split_into_chunks', return_value=['one', 'two']), \
+                mock.patch.object(SummarizerService, 'summarize_sections',
+                                  side_effect=lambda chunk, names, use_cache: sections[chunk]) as run, \
+                mock.patch.object(SummarizerService, 'summarize_chunks') as chunks:
+            value = service.summarize_chunked_section('text', 'key_points', use_cache=False)
+        self.assertEqual(value, [{'content': 'Costs are up'}, {'content': 'Hire'}])
+        self.assertEqual(sorted(call.args for call in run.call_args_list), [
+            ('one', ['key_points'], False), ('two', ['key_points'], False)])
+        chunks.assert_not_called()
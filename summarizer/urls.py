@@ -1,9 +1,13 @@
 from django.urls import path, include
-from .views import SummarizerView
+from .views import SummarizerView, SummarySectionView, SummaryStreamView
 
 urlpatterns = [
     path('summarize/<str:audio_id>/',
          SummarizerView.as_view(), name='summarize'),
+    path('summarize/<str:audio_id>/sections/<str:section>/',
+         SummarySectionView.as_view(), name='summarize-section'),
+    path('summarize/<str:audio_id>/stream/',
+         SummaryStreamView.as_view(), name='summarize-stream'),
 
 
 ]
@@ -1,8 +1,17 @@
+import json
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from meetingscribe.async_views import jwt_required
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from summarizer.services import SummarizerService
-from .serializers import SummaryResultDictSerializer
+from summarizer.services import SUMMARY_SECTIONS, SummarizerService
+from .serializers import SummaryResultDictSerializer, SummarizeRequestSerializer
+from .streaming import format_event
+from transcription.services import TranscriptionService
+from jobs.models import Job
+from jobs.services import JobService
+from jobs.serializers import JobSerializer
 
 
 class SummarizerView(APIView):
@@ -12,17 +21,32 @@ class SummarizerView(APIView):
 
     def post(self, request, audio_id):
         """
-        Summarize the audio file with the given ID.
+        Queue a summary of the audio file with the given ID.
         POST /summarizer/summarize/{audio_id}/
+        Send {"resummarize": true} to replace an existing summary, and
+        {"mode": "sectioned"} to generate the sections concurrently.
+        Poll the returned job at GET /jobs/{job_id}/.
         """
+        request_serializer = SummarizeRequestSerializer(data=request.data)
+        if not request_serializer.is_valid():
+            return Response(request_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        resummarize = request_serializer.validated_data['resummarize']
+        mode = request_serializer.validated_data['mode']
+
         try:
-            summarizer_service = SummarizerService(request.user)
-            summary = summarizer_service.summarize_all(audio_id)
-            serializer = SummaryResultDictSerializer(summary)
+            transcription = TranscriptionService(
+                request.user).get_transcription(audio_id)
+            if not transcription:
+                raise ValueError(
+                    "Transcription not found for the given audio file ")
+            job = JobService(request.user).enqueue(
+                Job.KIND_SUMMARIZE, audio_file_id=audio_id, resummarize=resummarize,
+                mode=mode)
 
             return Response({
-                "data": serializer.data
-            }, status=status.HTTP_200_OK)
+                "message": "Summary queued",
+                "data": JobSerializer(job).data
+            }, status=status.HTTP_202_ACCEPTED)
 
         except ValueError as e:
             return Response(
@@ -52,3 +76,113 @@ class SummarizerView(APIView):
                 {"error": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+
+class SummarySectionView(APIView):
+
+    def post(self, request, audio_id, section):
+        """
+        Queue regeneration of one section of an existing summary.
+        POST /summarizer/summarize/{audio_id}/sections/{section}/
+        section is one of subject, action_items, key_points.
+        Poll the returned job at GET /jobs/{job_id}/.
+        """
+        try:
+            if section not in SUMMARY_SECTIONS:
+                raise ValueError(f"Unknown summary section: {section}")
+            transcription = TranscriptionService(
+                request.user).get_transcription(audio_id)
+            if not transcription:
+                raise ValueError(
+                    "Transcription not found for the given audio file ")
+            job = JobService(request.user).enqueue(
+                Job.KIND_SUMMARIZE, audio_file_id=audio_id, section=section)
+
+            return Response({
+                "message": "Summary section queued",
+                "data": JobSerializer(job).data
+            }, status=status.HTTP_202_ACCEPTED)
+
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+
+class SummaryStreamView(APIView):
+    """
+    Summarize an audio file and stream the summary as server-sent events.
+    """
+
+    def post(self, request, audio_id):
+        """
+        Summarize the audio file with the given ID, streaming the result.
+        POST /summarizer/summarize/{audio_id}/stream/
+        Sends "subject", "action_item" and "key_point" events as each part is
+        generated, then "done" with the saved summary, or "error".
+        """
+        request_serializer = SummarizeRequestSerializer(data=request.data)
+        if not request_serializer.is_valid():
+            return Response(request_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        resummarize = request_serializer.validated_data['resummarize']
+
+        try:
+            summarizer_service = SummarizerService(request.user)
+            transcription = summarizer_service.get_transcription_to_summarize(
+                audio_id, resummarize)
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        def events():
+            try:
+                for event, data in summarizer_service.stream_summary(
+                        transcription, resummarize):
+                    yield format_event(event, data)
+            except Exception as e:
+                print(f"Streaming summary failed: {e}")
+                yield format_event('error', {"error": str(e)})
+
+        response = StreamingHttpResponse(
+            events(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+@require_POST
+@jwt_required
+async def summarize_async(request, audio_id):
+    """
+    Summarize an audio file within the request, without a background job.
+    POST /async/summarizer/summarize/{audio_id}/
+    Send {"resummarize": true} to replace an existing summary.
+    """
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON body"}, status=status.HTTP_400_BAD_REQUEST)
+    request_serializer = SummarizeRequestSerializer(data=body)
+    if not request_serializer.is_valid():
+        return JsonResponse(request_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        summarizer_service = SummarizerService(request.user)
+        summary = await summarizer_service.asummarize_all(
+            audio_id, resummarize=request_serializer.validated_data['resummarize'],
+            mode=request_serializer.validated_data['mode'])
+
+        return JsonResponse({
+            "message": "Summary created successfully",
+            "data": summary
+        }, status=status.HTTP_201_CREATED)
+
+    except ValueError as e:
+        return JsonResponse(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
@@ -0,0 +1,133 @@
+import re
+
+import ffmpeg
+
+
+_SILENCE_START = re.compile(r"silence_start: (-?\d+(?:\.\d+)?)")
+_SILENCE_END = re.compile(r"silence_end: (-?\d+(?:\.\d+)?)")
+_WORD = re.compile(r"\w+")
+
+
+def probe_duration(path):
+    """
+    Return the duration of an audio file in seconds.
+    """
+    info = ffmpeg.probe(path)
+    return float(info['format']['duration'])
+
+
+def detect_silences(path, noise_db=-35, min_silence_seconds=0.5):
+    """
+    Return a list of (start, end) silent intervals found by ffmpeg's
+    silencedetect filter.
+    """
+    _, stderr = (
+        ffmpeg
+        .input(path)
+        .filter('silencedetect', noise=f"{noise_db}dB", d=min_silence_seconds)
+        .output('-', format='null')
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    log = stderr.decode('utf-8', errors='ignore')
+    starts = [float(value) for value in _SILENCE_START.findall(log)]
+    ends = [float(value) for value in _SILENCE_END.findall(log)]
+    return list(zip(starts, ends))
+
+
+def plan_segments(duration, silences, target_seconds, overlap_seconds, search_seconds=None):
+    """
+    Split ``duration`` seconds of audio into segments of roughly
+    ``target_seconds``.
+
+    Each cut is moved to the middle of the latest silence found in the
+    ``search_seconds`` before the target boundary. When there is no silence
+    to cut at, the neighbouring segments overlap by ``overlap_seconds`` so a
+    word split by the cut is heard whole by at least one of them.
+
+    Returns a list of (start, end) tuples in seconds.
+    """
+    if search_seconds is None:
+        search_seconds = target_seconds / 4
+
+    cuts = []  # (position, cut_in_silence)
+    position = 0.0
+    while duration - position > target_seconds:
+        boundary = position + target_seconds
+        candidates = [
+            (start + end) / 2 for start, end in silences
+            if boundary - search_seconds <= (start + end) / 2 <= boundary
+        ]
+        if candidates:
+            cuts.append((max(candidates), True))
+        else:
+            cuts.append((boundary, False))
+        position = cuts[-1][0]
+
+    segments = []
+    start, start_in_silence = 0.0, True
+    for cut, in_silence in cuts:
+        end = cut if in_silence else min(duration, cut + overlap_seconds)
+        begin = start if start_in_silence else max(0.0, start - overlap_seconds)
+        segments.append((begin, end))
+        start, start_in_silence = cut, in_silence
+    begin = start if start_in_silence else max(0.0, start - overlap_seconds)
+    segments.append((begin, duration))
+    return segments
+
+
+def extract_segment(path, start, end, output_path):
+    """
+    Cut [start, end) out of ``path`` into a compact mono MP3 at ``output_path``.
+    """
+    (
+        ffmpeg
+        .input(path, ss=start, t=end - start)
+        .output(output_path, ac=1, ar=16000, acodec='libmp3lame', audio_bitrate='64k')
+        .overwrite_output()
+        .run(quiet=True)
+    )
+    return output_path
+
+
+def _normalize(word):
+    return word.lower()
+
+
+def stitch_segments(texts, overlapping=None, max_overlap_words=40):
+    """
+    Join segment transcripts in order. Where a segment overlaps the previous
+    one in time (``overlapping[i]`` is true), words at its start that repeat
+    the end of the previous transcript are dropped.
+    """
+    if overlapping is None:
+        overlapping = [True] * len(texts)
+
+    result = []
+    for text, overlaps in zip(texts, overlapping):
+        words = text.split()
+        if not words:
+            continue
+        if result and overlaps:
+            previous = [_normalize(w) for w in _WORD.findall(' '.join(result[-max_overlap_words:]))]
+            current = [_normalize(w) for w in _WORD.findall(' '.join(words[:max_overlap_words]))]
+            overlap = 0
+            for size in range(min(len(previous), len(current)), 0, -1):
+                if previous[-size:] == current[:size]:
+                    overlap = size
+                    break
+            words = _drop_leading_words(words, overlap)
+        result.extend(words)
+    return ' '.join(result)
+
+
+def _drop_leading_words(words, count):
+    """
+    Drop the first ``count`` word tokens (as counted by ``_WORD``) from a list
+    of whitespace-separated words, keeping trailing punctuation intact.
+    """
+    dropped = 0
+    index = 0
+    while index < len(words) and dropped < count:
+        dropped += len(_WORD.findall(words[index]))
+        index += 1
+    return words[index:]
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+
+from transcription.models import Transcription
+
+
+class Command(BaseCommand):
+    help = "Report how much silence was cut from each recording before transcription"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, default=None,
+                            help="Only report this user's transcriptions")
+        parser.add_argument('--limit', type=int, default=50,
+                            help="Recordings listed, most silence removed first")
+
+    def handle(self, *args, **options):
+        transcriptions = Transcription.objects.select_related('audio_file')
+        if options['user_id'] is not None:
+            transcriptions = transcriptions.filter(audio_file__user_id=options['user_id'])
+
+        for transcription in transcriptions.filter(
+                removed_seconds__gt=0).order_by('-removed_seconds')[:options['limit']]:
+            audio_file = transcription.audio_file
+            self.stdout.write(
+                f"{audio_file.id}  {audio_file.name}: removed "
+                f"{transcription.removed_seconds:.1f}s of "
+                f"{audio_file.durtion_seconds}s "
+                f"({self.share(transcription.removed_seconds, audio_file.durtion_seconds)})")
+
+        totals = transcriptions.aggregate(
+            removed=Sum('removed_seconds'), duration=Sum('audio_file__durtion_seconds'))
+        removed, duration = totals['removed'] or 0, totals['duration'] or 0
+        self.stdout.write(
+            f"Removed {removed / 60:.1f} of {duration / 60:.1f} minute(s) "
+            f"across {transcriptions.count()} transcription(s) ({self.share(removed, duration)})")
+
+    def share(self, removed, duration):
+        return f"{removed / duration:.1%}" if duration else "n/a"
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0002_rename_extention_audiofile_extension'),
+        ('transcription', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptionSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('start_seconds', models.FloatField()),
+                ('end_seconds', models.FloatField()),
+                ('text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('audio_file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transcription_segments', to='files.audiofile')),
+            ],
+            options={
+                'ordering': ['index'],
+                'unique_together': {('audio_file', 'index')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:48
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcription', '0002_transcriptionsegment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcription',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('text', config='english'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='transcription',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='transcription_search_idx'),
+        ),
+    ]
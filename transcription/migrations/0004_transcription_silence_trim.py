@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcription', '0003_transcription_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcription',
+            name='removed_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='transcription',
+            name='time_offsets',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcription', '0004_transcription_silence_trim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcription',
+            name='segment_times',
+            field=models.BinaryField(blank=True, default=bytes),
+        ),
+        migrations.AddField(
+            model_name='transcription',
+            name='segment_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='transcriptionsegment',
+            name='segment_times',
+            field=models.BinaryField(blank=True, default=bytes),
+        ),
+        migrations.AddField(
+            model_name='transcriptionsegment',
+            name='segment_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -1,11 +1,59 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
 
+# Text search configuration used for every search vector and query
+SEARCH_CONFIG = 'english'
+
 
 class Transcription(models.Model):
     audio_file = models.ForeignKey(
         'files.AudioFile', on_delete=models.CASCADE, related_name='transcriptions')
     text = models.TextField()
+    # Maintained by PostgreSQL on every insert and update
+    search_vector = models.GeneratedField(
+        expression=SearchVector('text', config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True)
+    # Silence cut out before transcription, and [trimmed_start,
+    # original_start, duration] of each kept region so positions in the
+    # transcribed audio can be mapped back to the original recording
+    removed_seconds = models.FloatField(default=0)
+    time_offsets = models.JSONField(default=list, blank=True)
+    # Whisper's timed segments in original-file seconds, as a SegmentTimeline
+    segment_times = models.BinaryField(default=bytes, blank=True)
+    segment_text = models.TextField(default='', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Transcription for {self.audio_file.name} at {self.created_at}"
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'],
+                     name='transcription_search_idx'),
+        ]
+
+
+class TranscriptionSegment(models.Model):
+    """
+    Checkpoint for one segment of a chunked transcription, so a retry only
+    re-sends the segments that have not been transcribed yet.
+    """
+    audio_file = models.ForeignKey(
+        'files.AudioFile', on_delete=models.CASCADE, related_name='transcription_segments')
+    index = models.PositiveIntegerField()
+    start_seconds = models.FloatField()
+    end_seconds = models.FloatField()
+    text = models.TextField()
+    # Timed segments, relative to the start of this segment's audio
+    segment_times = models.BinaryField(default=bytes, blank=True)
+    segment_text = models.TextField(default='', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Segment {self.index} of {self.audio_file.name}"
+
+    class Meta:
+        ordering = ['index']
+        unique_together = ('audio_file', 'index')
@@ -1,3 +1,4 @@
+from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 from .models import Transcription
 from users.serializers import UserSerializer
@@ -8,5 +9,22 @@ class TranscriptionSerializer(ModelSerializer):
 
     class Meta:
         model = Transcription
-        fields = ('id', 'text', 'audio_file', 'user', 'created_at')
-        read_only_fields = ('id', 'user', 'created_at')
+        fields = ('id', 'text', 'audio_file', 'user', 'removed_seconds', 'created_at')
+        read_only_fields = ('id', 'user', 'removed_seconds', 'created_at')
+
+
+class SegmentRangeQuerySerializer(serializers.Serializer):
+    start = serializers.FloatField(required=False, default=None, min_value=0)
+    end = serializers.FloatField(required=False, default=None, min_value=0)
+
+    def validate(self, data):
+        if data['start'] is not None and data['end'] is not None and data['end'] <= data['start']:
+            raise serializers.ValidationError("end must be after start")
+        return data
+
+
+class TimedSegmentSerializer(serializers.Serializer):
+    index = serializers.IntegerField()
+    start = serializers.FloatField()
+    end = serializers.FloatField()
+    text = serializers.CharField(allow_blank=True)
@@ -1,19 +1,31 @@
-from .models import Transcription
+from .models import Transcription, TranscriptionSegment
+from .chunking import (detect_silences, extract_segment, plan_segments,
+                       probe_duration, stitch_segments)
+from .timeline import SegmentTimeline
+from .transcoding import SPEECH_FORMATS, run_in_pool, transcode
+from .vad import SpeechTrim, TimeMap, trim_silence
 from files.services import AudioFileService
-import requests
-import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from django.conf import settings
-import environ
-from openai import AzureOpenAI
-
-env = environ.Env()
+from functools import cached_property
+from asgiref.sync import sync_to_async
+from meetingscribe.clients import get_async_openai_client, get_openai_client
+from meetingscribe.ratelimit import get_limiter
+import io
+import json
+import os
+import shutil
+import tempfile
 
 
 class TranscriptionService:
     def __init__(self, user):
-        self.audio_file_service = AudioFileService(user)
         self.user = user
 
+    @cached_property
+    def audio_file_service(self):
+        return AudioFileService(self.user)
+
     def get_transcription(self, audio_file_id):
         audio_file = self.audio_file_service.get_audio_file_by_id(
             audio_file_id)
@@ -28,69 +40,530 @@ class TranscriptionService:
         audio_file = self.audio_file_service.get_audio_file_by_id(
             audio_file_id)
 
-        # Get SAS URL of the audio file from Azure Blob Storage
-        audio_file_url = self.audio_file_service.get_audio_file_url(
+        # An identical recording that was already transcribed is copied
+        reused = self.reuse_transcription(audio_file)
+        if reused:
+            return reused.text
+
+        # Stream the audio from Azure Blob Storage into a bounded buffer
+        trimmed = self.trim_speech(audio_file)
+        if trimmed is not None:
+            audio_stream, extension, trim = trimmed
+        else:
+            audio_stream, extension = self.open_speech_stream(audio_file)
+            trim = None
+        with audio_stream:
+            # Get transcription text
+            if self.needs_segmenting(audio_file, self._stream_size(audio_stream),
+                                     trim.trimmed_seconds if trim else None):
+                transcription_text, timeline = self.transcribe_in_segments(
+                    audio_file, audio_stream, extension, trim)
+            else:
+                transcription_text, timeline = self.transcribe_audio(
+                    audio_stream, filename=f"{audio_file.id}.{extension}")
+
+        # Create Transcription record
+        transcription = Transcription.objects.create(
+            audio_file=audio_file,
+            text=transcription_text,
+            **self._timing_fields(timeline, trim)
+        )
+        self.index_for_search(transcription)
+
+        return transcription_text
+
+    async def acreate_transcription(self, audio_file_id):
+        """
+        Async version of create_transcription, for the ASGI views. The
+        download and the Whisper call run on the event loop, so a request
+        waiting on them does not hold a thread.
+        """
+        audio_file = await self.audio_file_service.aget_audio_file_by_id(
             audio_file_id)
 
-        # Download audio file
-        temp_file = self.download_audio_file(
-            audio_file_url=audio_file_url,
-            extension=f".{audio_file.extension}"
+        reused = await sync_to_async(self.reuse_transcription)(audio_file)
+        if reused:
+            return reused.text
+
+        # Trimming and encoding wait on the process pool and touch no models,
+        # so they need not wait behind other requests' synchronous work
+        trimmed = await sync_to_async(
+            self.trim_speech, thread_sensitive=False)(audio_file)
+        trim = None
+        if trimmed is not None:
+            audio_stream, extension, trim = trimmed
+        elif self.needs_transcoding(audio_file):
+            # Encoding needs a local file and the process pool
+            audio_stream, extension = await sync_to_async(
+                self.open_speech_stream)(audio_file)
+        else:
+            audio_stream = await self.audio_file_service.aopen_audio_stream(audio_file)
+            extension = audio_file.extension
+
+        with audio_stream:
+            if self.needs_segmenting(audio_file, self._stream_size(audio_stream),
+                                     trim.trimmed_seconds if trim else None):
+                # Splitting runs ffmpeg and a thread pool, so it stays synchronous
+                transcription_text, timeline = await sync_to_async(self.transcribe_in_segments)(
+                    audio_file, audio_stream, extension, trim)
+            else:
+                transcription_text, timeline = await OpenAIService(
+                    self.user).acreate_transcription(
+                    audio_stream, filename=f"{audio_file.id}.{extension}")
+
+        transcription = await Transcription.objects.acreate(
+            audio_file=audio_file,
+            text=transcription_text,
+            **self._timing_fields(timeline, trim)
         )
+        await sync_to_async(self.index_for_search)(transcription)
 
+        return transcription_text
+
+    def transcribe_audio(self, audio_stream, filename):
+        """
+        Transcribe an audio stream with Whisper via OpenAIService and return
+        its text and SegmentTimeline.
+        """
+        openai_service = OpenAIService(self.user)
+        transcription_text, timeline = openai_service.create_transcription(
+            audio_stream, filename)
+
+        return transcription_text, timeline
+
+    def get_timeline(self, audio_file_id):
+        """
+        Return the SegmentTimeline of an audio file's transcription.
+        """
+        audio_file = self.audio_file_service.get_audio_file_by_id(
+            audio_file_id)
+        fields = Transcription.objects.filter(audio_file=audio_file).values(
+            'segment_times', 'segment_text').first()
+        if fields is None:
+            raise ValueError("Transcription not found")
+        return SegmentTimeline.from_fields(**fields)
+
+    def reuse_transcription(self, audio_file):
+        """
+        Copy the transcription of the user's own earlier upload with the same
+        content, and its summary when DEDUP_REUSE_SUMMARY is enabled, instead of
+        calling Whisper again. Returns None when there is nothing to reuse.
+        """
+        if not audio_file.content_hash:
+            return None
+
+        source = Transcription.objects.filter(
+            audio_file__user=self.user,
+            audio_file__content_hash=audio_file.content_hash
+        ).exclude(audio_file=audio_file).order_by('created_at').first()
+        if not source:
+            return None
+
+        print(f"Reusing transcription {source.id} for audio file {audio_file.id}")
+        transcription = Transcription.objects.create(
+            audio_file=audio_file,
+            text=source.text,
+            removed_seconds=source.removed_seconds,
+            time_offsets=source.time_offsets,
+            segment_times=source.segment_times,
+            segment_text=source.segment_text,
+        )
+        self.index_for_search(transcription)
+
+        if settings.DEDUP_REUSE_SUMMARY:
+            # Imported lazily: the summarizer app builds on this service
+            from summarizer.services import SummarizerService
+            SummarizerService(self.user).copy_summary(source, transcription)
+
+        return transcription
+
+    def index_for_search(self, transcription):
+        """
+        Add a new transcription to the semantic search index. A failure here
+        does not fail the transcription; `manage.py index_transcripts`
+        picks up transcriptions that were missed.
+        """
+        # Imported lazily: the meetings app builds on this service
+        from meetings.services import SemanticSearchService
         try:
-            # Get transcription text
-            transcription_text = self.transcribe_audio(temp_file)
-            # Create Transcription record
-            transcription = Transcription.objects.create(
-                audio_file=audio_file,
-                text=transcription_text,
+            SemanticSearchService(self.user).index_transcription(transcription)
+        except Exception as e:
+            print(f"Indexing transcription {transcription.id} failed: {e}")
+
+    def needs_transcoding(self, audio_file):
+        # Files already close to speech bitrate are sent as they are
+        if not settings.TRANSCODE_ENABLED:
+            return False
+        bytes_per_second = audio_file.size / max(audio_file.durtion_seconds, 1)
+        return bytes_per_second > settings.TRANSCODE_SKIP_BYTES_PER_SECOND
+
+    def get_transcoded_blob_name(self, audio_file):
+        # Keyed by content within the owner's folder, so a user's duplicate
+        # recordings share one encode but other users' uploads never do
+        key = audio_file.content_hash or audio_file.id
+        speech_format = settings.TRANSCODE_FORMAT
+        extension = SPEECH_FORMATS[speech_format]['extension']
+        return (f"{self.audio_file_service.dir_root}transcoded/{audio_file.user_id}/"
+                f"{key}-{speech_format}-{settings.TRANSCODE_BITRATE}.{extension}")
+
+    def get_trimmed_blob_name(self, audio_file):
+        # Next to the transcoded audio; the time map is stored beside it as
+        # JSON, with the same name and a .json extension
+        base, extension = os.path.splitext(self.get_transcoded_blob_name(audio_file))
+        return f"{base}-trimmed{extension}"
+
+    def open_speech_stream(self, audio_file, work_dir=None):
+        """
+        Open the audio to send to Whisper and return (stream, extension).
+
+        High-bitrate uploads are transcoded to 16 kHz mono speech audio in
+        the transcoding process pool, which usually shrinks them many times
+        over. The result is cached in blob storage, so retries and duplicate
+        recordings download it instead of encoding again. The original is
+        read from ``work_dir`` when trim_speech already downloaded it there.
+        """
+        source_path = work_dir and self._source_path(audio_file, work_dir)
+        if not self.needs_transcoding(audio_file):
+            if source_path and os.path.exists(source_path):
+                return self._spool(source_path), audio_file.extension
+            return self.audio_file_service.open_audio_stream(audio_file), audio_file.extension
+
+        speech_format = SPEECH_FORMATS[settings.TRANSCODE_FORMAT]
+        blob_name = self.get_transcoded_blob_name(audio_file)
+        if self.audio_file_service.azure_blob_service.get_size(blob_name) is not None:
+            return self.audio_file_service.open_blob_stream(blob_name), speech_format['extension']
+
+        if work_dir is None:
+            with tempfile.TemporaryDirectory() as work_dir:
+                return self._transcode_speech(audio_file, work_dir, blob_name)
+        return self._transcode_speech(audio_file, work_dir, blob_name)
 
+    def _transcode_speech(self, audio_file, work_dir, blob_name):
+        output_path = transcode(
+            self._download_source(audio_file, work_dir),
+            self._transcoded_path(work_dir),
+            settings.TRANSCODE_FORMAT,
+            settings.TRANSCODE_BITRATE,
+            settings.TRANSCODE_MAX_WORKERS
+        )
+        return self._open_transcoded(audio_file, output_path, blob_name)
+
+    def _transcoded_path(self, work_dir):
+        speech_format = SPEECH_FORMATS[settings.TRANSCODE_FORMAT]
+        return os.path.join(work_dir, f"transcoded.{speech_format['extension']}")
+
+    def _open_transcoded(self, audio_file, output_path, blob_name):
+        speech_format = SPEECH_FORMATS[settings.TRANSCODE_FORMAT]
+        print(f"Transcoded audio file {audio_file.id}: "
+              f"{audio_file.size} -> {os.path.getsize(output_path)} bytes")
+
+        stream = self._spool(output_path)
+        with open(output_path, 'rb') as output:
+            self._cache_blob(blob_name, output, speech_format['content_type'])
+        return stream, speech_format['extension']
+
+    def _source_path(self, audio_file, work_dir):
+        return os.path.join(work_dir, f"source.{audio_file.extension}")
+
+    def _download_source(self, audio_file, work_dir):
+        # Downloaded once per work dir, and shared by trimming and transcoding
+        source_path = self._source_path(audio_file, work_dir)
+        if not os.path.exists(source_path):
+            with self.audio_file_service.open_audio_stream(audio_file) as audio_stream:
+                with open(source_path, 'wb') as source:
+                    shutil.copyfileobj(audio_stream, source)
+        return source_path
+
+    def _spool(self, path):
+        stream = tempfile.SpooledTemporaryFile(
+            max_size=settings.AUDIO_SPOOL_MAX_BYTES)
+        with open(path, 'rb') as source:
+            shutil.copyfileobj(source, stream)
+        stream.seek(0)
+        return stream
+
+    def trim_speech(self, audio_file):
+        """
+        Open the audio to send to Whisper with its silent stretches cut out
+        and return (stream, extension, trim). ``trim`` maps positions in the
+        stream back to the original recording; it is None when trimming
+        would remove less than VAD_MIN_REMOVED_SECONDS, and the audio is
+        then opened as open_speech_stream does, from the original already
+        downloaded. Returns None when trimming is disabled or was already
+        found not to be worth it, without downloading anything.
+
+        Speech is found in the original upload, and the kept audio encoded
+        from it once, in the transcoding process pool. The trimmed audio and
+        its time map are cached in blob storage, as is a decision not to
+        trim, so a retry does not decode the recording again.
+        """
+        if not settings.VAD_ENABLED:
+            return None
+
+        speech_format = SPEECH_FORMATS[settings.TRANSCODE_FORMAT]
+        blob_service = self.audio_file_service.azure_blob_service
+        blob_name = self.get_trimmed_blob_name(audio_file)
+        map_name = f"{os.path.splitext(blob_name)[0]}.json"
+
+        cached = self._read_time_map(map_name)
+        if cached is not None:
+            if not cached['time_offsets']:
+                return None
+            if blob_service.get_size(blob_name) is not None:
+                trim = SpeechTrim(cached['original_seconds'], TimeMap(cached['time_offsets']))
+                return (self.audio_file_service.open_blob_stream(blob_name),
+                        speech_format['extension'], trim)
+
+        # Unless it is cached, the transcoded audio is encoded alongside the
+        # analysis, from the same decoded samples, in case it is not trimmed
+        transcoded_blob_name = self.get_transcoded_blob_name(audio_file)
+        transcode_too = (self.needs_transcoding(audio_file)
+                         and blob_service.get_size(transcoded_blob_name) is None)
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            output_path = os.path.join(
+                work_dir, f"trimmed.{speech_format['extension']}")
+            transcoded_path = self._transcoded_path(work_dir) if transcode_too else None
+            trim = run_in_pool(
+                settings.TRANSCODE_MAX_WORKERS,
+                trim_silence,
+                self._download_source(audio_file, work_dir),
+                output_path,
+                settings.TRANSCODE_FORMAT,
+                settings.TRANSCODE_BITRATE,
+                frame_seconds=settings.VAD_FRAME_SECONDS,
+                margin_db=settings.VAD_MARGIN_DB,
+                min_threshold_db=settings.VAD_MIN_THRESHOLD_DB,
+                min_speech_seconds=settings.VAD_MIN_SPEECH_SECONDS,
+                min_silence_seconds=settings.VAD_MIN_SILENCE_SECONDS,
+                padding_seconds=settings.VAD_PADDING_SECONDS,
+                min_removed_seconds=settings.VAD_MIN_REMOVED_SECONDS,
+                transcoded_path=transcoded_path
             )
-        finally:
-            # Always clean up the temp file
-            temp_file.close()
-            import os
-            os.unlink(temp_file.name)
+            if trim is None:
+                self._cache_blob(map_name, json.dumps(dict(time_offsets=None)),
+                                 'application/json')
+                if transcoded_path:
+                    return self._open_transcoded(
+                        audio_file, transcoded_path, transcoded_blob_name) + (None,)
+                return self.open_speech_stream(audio_file, work_dir) + (None,)
+            print(f"Trimmed {trim.removed_seconds:.1f}s of silence from audio file "
+                  f"{audio_file.id} ({trim.original_seconds:.1f}s -> "
+                  f"{trim.trimmed_seconds:.1f}s)")
 
-        return transcription_text
+            stream = self._spool(output_path)
+            with open(output_path, 'rb') as output:
+                # The audio goes first, as the time map marks it complete
+                if self._cache_blob(blob_name, output, speech_format['content_type']):
+                    self._cache_blob(map_name, json.dumps(dict(
+                        original_seconds=trim.original_seconds,
+                        time_offsets=trim.time_map.to_list())), 'application/json')
 
-    def download_audio_file(self, audio_file_url, extension=".mp3"):
-        print(f"Downloading audio file from: {audio_file_url}")
-        response = requests.get(audio_file_url, stream=True)
-        response.raise_for_status()
+        return stream, speech_format['extension'], trim
 
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=extension)
-        temp_file.write(response.content)
-        temp_file.flush()
-        temp_file.seek(0)
-        return temp_file
+    def _read_time_map(self, map_name):
+        blob_service = self.audio_file_service.azure_blob_service
+        if blob_service.get_size(map_name) is None:
+            return None
+        return json.loads(blob_service.download_to_stream(map_name, io.BytesIO()).read())
 
-    def transcribe_audio(self, temp_file):
+    def _cache_blob(self, blob_name, data, content_type):
+        try:
+            self.audio_file_service.azure_blob_service.upload(
+                blob_name, data, content_type=content_type)
+        except Exception as e:
+            # Caching is best effort, e.g. another worker got there first
+            print(f"Caching {blob_name} failed: {e}")
+            return False
+        return True
+
+    def _timing_fields(self, timeline, trim):
+        # Segment times are stored in original-file time
+        if trim is None:
+            return timeline.to_fields()
+        timeline = SegmentTimeline.from_segments(
+            (trim.time_map.to_original(segment['start']),
+             trim.time_map.to_original(segment['end'], end=True),
+             segment['text'])
+            for segment in timeline.segments()
+        )
+        return dict(removed_seconds=round(trim.removed_seconds, 3),
+                    time_offsets=trim.time_map.to_list(),
+                    **timeline.to_fields())
+
+    def _stream_size(self, stream):
+        size = stream.seek(0, os.SEEK_END)
+        stream.seek(0)
+        return size
+
+    def needs_segmenting(self, audio_file, size=None, duration=None):
+        # Whisper rejects files above its upload limit, and long recordings
+        # finish sooner when their segments are transcribed in parallel
+        if size is None:
+            size = audio_file.size
+        if duration is None:
+            duration = audio_file.durtion_seconds
+        return (size > settings.WHISPER_MAX_BYTES
+                or duration > 2 * settings.TRANSCRIPTION_SEGMENT_SECONDS)
+
+    def transcribe_in_segments(self, audio_file, audio_stream, extension=None, trim=None):
         """
-        Transcribe audio file with Whisper via OpenAIService.
+        Split the audio at silences, transcribe the segments concurrently and
+        stitch the text back together in order. Each finished segment is
+        saved as a TranscriptionSegment, so a retry after a failure only
+        re-sends the segments that are still missing.
+
+        For audio trimmed by ``trim_speech``, the cuts go where silence was
+        removed and segment boundaries are saved in original-file time.
+
+        Returns the text and a SegmentTimeline of the whole audio.
         """
-        openai_service = OpenAIService(self.user)
-        transcription_text = openai_service.create_transcription(
-            temp_file.name)
+        with tempfile.TemporaryDirectory() as work_dir:
+            source_path = os.path.join(
+                work_dir, f"source.{extension or audio_file.extension}")
+            with open(source_path, 'wb') as source:
+                shutil.copyfileobj(audio_stream, source)
 
-        return transcription_text
+            if trim:
+                duration, silences = trim.trimmed_seconds, trim.silences
+                to_original = trim.time_map.to_original
+            else:
+                duration, silences = probe_duration(source_path), detect_silences(source_path)
+
+                def to_original(seconds, end=False):
+                    return float(seconds)
+            segments = plan_segments(
+                duration,
+                silences,
+                target_seconds=settings.TRANSCRIPTION_SEGMENT_SECONDS,
+                overlap_seconds=settings.TRANSCRIPTION_SEGMENT_OVERLAP_SECONDS
+            )
+
+            # Reuse checkpoints whose boundaries match the current plan
+            saved = {
+                segment.index: segment
+                for segment in TranscriptionSegment.objects.filter(audio_file=audio_file)
+            }
+            texts = {}
+            timelines = {}
+            pending = []
+            for index, (start, end) in enumerate(segments):
+                checkpoint = saved.get(index)
+                if (checkpoint
+                        and abs(checkpoint.start_seconds - to_original(start)) < 0.01
+                        and abs(checkpoint.end_seconds - to_original(end, end=True)) < 0.01):
+                    texts[index] = checkpoint.text
+                    timelines[index] = SegmentTimeline.from_model(checkpoint)
+                else:
+                    pending.append((index, start, end))
+            TranscriptionSegment.objects.filter(
+                audio_file=audio_file, index__gte=len(segments)).delete()
+            print(f"Transcribing {len(pending)} of {len(segments)} segments")
+
+            openai_service = OpenAIService(self.user)
+            errors = []
+            with ThreadPoolExecutor(max_workers=settings.TRANSCRIPTION_MAX_WORKERS) as executor:
+                futures = {
+                    executor.submit(self._transcribe_segment, openai_service,
+                                    source_path, work_dir, index, start, end): (index, start, end)
+                    for index, start, end in pending
+                }
+                # Checkpoints are written from this thread as segments finish
+                for future in as_completed(futures):
+                    index, start, end = futures[future]
+                    try:
+                        text, timeline = future.result()
+                    except Exception as e:
+                        print(f"Segment {index} failed: {e}")
+                        errors.append(e)
+                        continue
+                    TranscriptionSegment.objects.update_or_create(
+                        audio_file=audio_file,
+                        index=index,
+                        defaults=dict(start_seconds=to_original(start),
+                                      end_seconds=to_original(end, end=True), text=text,
+                                      **timeline.to_fields())
+                    )
+                    texts[index] = text
+                    timelines[index] = timeline
+
+        if errors:
+            raise errors[0]
+
+        overlapping = [
+            index > 0 and segments[index][0] < segments[index - 1][1]
+            for index in range(len(segments))
+        ]
+        text = stitch_segments([texts[index] for index in range(len(segments))], overlapping)
+
+        # Where audio segments overlap, each keeps the timed segments that
+        # start on its side of the middle of the overlap
+        timed = []
+        for index, (start, end) in enumerate(segments):
+            lower = (start + segments[index - 1][1]) / 2 if overlapping[index] else float('-inf')
+            upper = (end + segments[index + 1][0]) / 2 if (
+                index + 1 < len(segments) and overlapping[index + 1]) else float('inf')
+            timed.extend(
+                (segment['start'], segment['end'], segment['text'])
+                for segment in timelines[index].shifted(start).segments()
+                if lower <= segment['start'] < upper
+            )
+        return text, SegmentTimeline.from_segments(timed)
+
+    def _transcribe_segment(self, openai_service, source_path, work_dir, index, start, end):
+        segment_path = extract_segment(
+            source_path, start, end, os.path.join(work_dir, f"segment-{index}.mp3"))
+        try:
+            with open(segment_path, "rb") as segment:
+                return openai_service.create_transcription(
+                    segment, os.path.basename(segment_path))
+        finally:
+            os.unlink(segment_path)
 
 
 class OpenAIService:
     def __init__(self, user):
         self.user = user
 
-        self.client = AzureOpenAI(
-            azure_endpoint=env('OPENAI_API_BASE'),
-            api_key=env('OPENAI_API_KEY'),
-            api_version="2024-06-01"
-        )
+    @cached_property
+    def client(self):
+        return get_openai_client(api_version="2024-06-01")
+
+    @cached_property
+    def async_client(self):
+        return get_async_openai_client(api_version="2024-06-01")
+
+    def create_transcription(self, audio_stream, filename):
+        """
+        Transcribe an audio stream and return its text and SegmentTimeline.
+        """
+        def transcribe():
+            # Rewound for every attempt, as a failed one may have read it
+            audio_stream.seek(0)
+            # The file name tells Whisper which container format to decode
+            return self.client.audio.transcriptions.create(
+                model="whisper",
+                file=(filename, audio_stream),
+                response_format="verbose_json"
+            )
+
+        response = get_limiter('whisper').call(transcribe)
+        return response.text, self._timeline(response)
 
-    def create_transcription(self, audio_file_path):
-        with open(audio_file_path, "rb") as audio:
-            response = self.client.audio.transcriptions.create(
+    async def acreate_transcription(self, audio_stream, filename):
+        def transcribe():
+            audio_stream.seek(0)
+            return self.async_client.audio.transcriptions.create(
                 model="whisper",
-                file=audio
+                file=(filename, audio_stream),
+                response_format="verbose_json"
             )
-        return response.text
+
+        response = await get_limiter('whisper').acall(transcribe)
+        return response.text, self._timeline(response)
+
+    def _timeline(self, response):
+        return SegmentTimeline.from_segments(
+            (segment.start, segment.end, segment.text)
+            for segment in response.segments or []
+        )
@@ -0,0 +1,37 @@
+# Content type of each subtitle format
+SUBTITLE_FORMATS = {
+    'srt': 'application/x-subrip',
+    'vtt': 'text/vtt',
+}
+
+
+def format_timestamp(seconds, decimal_marker):
+    milliseconds = max(0, round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{decimal_marker}{milliseconds:03d}"
+
+
+def iter_subtitles(segments, subtitle_format):
+    """
+    Yield an SRT or WebVTT document cue by cue, from segment dicts as
+    returned by SegmentTimeline.segments.
+    """
+    if subtitle_format not in SUBTITLE_FORMATS:
+        raise ValueError(f"Unknown subtitle format: {subtitle_format}")
+
+    if subtitle_format == 'vtt':
+        yield "WEBVTT\n\n"
+    marker = ',' if subtitle_format == 'srt' else '.'
+    number = 0
+    for segment in segments:
+        if not segment['text']:
+            continue
+        number += 1
+        timing = (f"{format_timestamp(segment['start'], marker)} --> "
+                  f"{format_timestamp(segment['end'], marker)}")
+        if subtitle_format == 'srt':
+            yield f"{number}\n{timing}\n{segment['text']}\n\n"
+        else:
+            yield f"{timing}\n{segment['text']}\n\n"
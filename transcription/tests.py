@@ -1,3 +1,173 @@
-from django.test import TestCase
+import os
+from concurrent.futures.process import BrokenProcessPool
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase
+
+from . import transcoding
+from .subtitles import format_timestamp, iter_subtitles
+from .timeline import SegmentTimeline
+from .vad import (SAMPLE_RATE, SpeechTrim, TimeMap, detect_speech, frame_levels,
+                  speech_pieces, speech_threshold)
+
+
+class FrameLevelsTests(SimpleTestCase):
+
+    def test_levels_in_dbfs_with_partial_last_frame(self):
+        samples = np.concatenate([
+            np.full(100, 16384, dtype=np.int16), np.zeros(100, dtype=np.int16),
+            np.full(50, 16384, dtype=np.int16)])
+        levels = frame_levels(samples, 100)
+        self.assertEqual(len(levels), 3)
+        self.assertAlmostEqual(levels[0], -6.02, places=2)
+        self.assertAlmostEqual(levels[1], -100, places=3)
+        # Half a frame of the same signal, padded with silence
+        self.assertAlmostEqual(levels[2], -9.03, places=2)
+
+    def test_empty(self):
+        self.assertEqual(len(frame_levels(np.zeros(0, dtype=np.int16), 100)), 0)
+
+
+class SpeechThresholdTests(SimpleTestCase):
+
+    def test_margin_above_noise_floor(self):
+        levels = np.array([-70.0] * 50 + [-20.0] * 50)
+        self.assertEqual(speech_threshold(levels, 10, -55), -55)
+        self.assertEqual(speech_threshold(levels + 30, 10, -55), -30)
+
+    def test_no_closer_than_margin_to_speech(self):
+        levels = np.array([-30.0] * 10 + [-25.0] * 90)
+        self.assertEqual(speech_threshold(levels, 10, -55), -35)
+
+
+class DetectSpeechTests(SimpleTestCase):
+
+    def detect(self, mask, **options):
+        levels = np.where(np.array(mask, dtype=bool), -10.0, -80.0)
+        options = dict(dict(min_speech_seconds=2, min_silence_seconds=3,
+                            padding_seconds=1), **options)
+        starts, ends = detect_speech(levels, 1.0, -40.0, **options)
+        return list(zip(starts.tolist(), ends.tolist()))
+
+    def test_pads_and_keeps_long_gaps(self):
+        mask = [0] * 5 + [1] * 3 + [0] * 10 + [1] * 4 + [0] * 5
+        self.assertEqual(self.detect(mask), [(4, 9), (17, 23)])
+
+    def test_merges_short_gaps_and_drops_clicks(self):
+        mask = [1] + [0] * 5 + [1] * 3 + [0] * 3 + [1] * 3 + [0] * 5
+        self.assertEqual(self.detect(mask), [(5, 16)])
+
+    def test_no_speech(self):
+        self.assertEqual(self.detect([0] * 10), [])
+
+
+class TimeMapTests(SimpleTestCase):
+
+    def setUp(self):
+        # Speech at 2-5s and 10-12s of a 15s recording
+        frame_samples = SAMPLE_RATE // 100
+        self.pieces = speech_pieces(np.array([200, 1000]), np.array([500, 1300]),
+                                    frame_samples, 12 * SAMPLE_RATE)
+        self.time_map = TimeMap(self.pieces)
+
+    def test_pieces(self):
+        self.assertEqual(self.pieces, [(0.0, 2.0, 3.0), (3.0, 10.0, 2.0)])
+
+    def test_to_original(self):
+        self.assertEqual(self.time_map.to_original(1.5), 3.5)
+        self.assertEqual(self.time_map.to_original(4.0), 11.0)
+        self.assertEqual(self.time_map.to_original(9.0), 12.0)
+
+    def test_join_maps_to_either_side(self):
+        self.assertEqual(self.time_map.joins, [3.0])
+        self.assertEqual(self.time_map.to_original(3.0), 10.0)
+        self.assertEqual(self.time_map.to_original(3.0, end=True), 5.0)
+
+    def test_round_trips_as_list(self):
+        self.assertEqual(TimeMap(self.time_map.to_list()).pieces, self.time_map.pieces)
+
+    def test_speech_trim(self):
+        trim = SpeechTrim(15.0, self.time_map)
+        self.assertEqual(trim.trimmed_seconds, 5.0)
+        self.assertEqual(trim.removed_seconds, 10.0)
+        self.assertEqual(trim.silences, [(3.0, 3.0)])
+
+    def test_empty_map_is_identity(self):
+        self.assertEqual(TimeMap([]).to_original(7.5), 7.5)
+
+
+class SegmentTimelineTests(SimpleTestCase):
+
+    def setUp(self):
+        self.timeline = SegmentTimeline.from_segments([
+            (10.0, 12.0, " third "),
+            (0.0, 9.5, "first,\n long"),
+            (2.0, 4.0, "second"),
+        ])
+
+    def test_sorted_with_texts_on_one_line(self):
+        self.assertEqual([(s['start'], s['end'], s['text']) for s in self.timeline.segments()], [
+            (0.0, 9.5, "first, long"), (2.0, 4.0, "second"), (10.0, 12.0, "third")])
+
+    def test_fields_round_trip(self):
+        restored = SegmentTimeline.from_fields(**self.timeline.to_fields())
+        self.assertEqual(list(restored.segments()), list(self.timeline.segments()))
+        self.assertEqual(len(SegmentTimeline.from_fields(None, '')), 0)
+
+    def test_between_includes_long_earlier_segments(self):
+        self.assertEqual(self.timeline.between(5, 11).tolist(), [0, 2])
+        self.assertEqual(self.timeline.between(3, 4).tolist(), [0, 1])
+        self.assertEqual(self.timeline.between(9.5, 10).tolist(), [])
+        self.assertEqual(self.timeline.between(end=2).tolist(), [0])
+        self.assertEqual(self.timeline.between(start=11).tolist(), [2])
+        self.assertEqual(self.timeline.between().tolist(), [0, 1, 2])
+
+    def test_between_empty(self):
+        self.assertEqual(SegmentTimeline().between(1, 2).tolist(), [])
+
+    def test_shifted(self):
+        shifted = self.timeline.shifted(600)
+        self.assertEqual([s['start'] for s in shifted.segments()], [600.0, 602.0, 610.0])
+        self.assertEqual(shifted.texts, self.timeline.texts)
+
+
+class SubtitleTests(SimpleTestCase):
+
+    segments = [
+        dict(index=0, start=1.5, end=3661.25, text="Hello"),
+        dict(index=1, start=4000.0, end=4001.0, text=""),
+        dict(index=2, start=4002.0, end=4003.0, text="Bye"),
+    ]
+
+    def test_format_timestamp(self):
+        self.assertEqual(format_timestamp(3661.2506, ','), "01:01:01,251")
+        self.assertEqual(format_timestamp(-0.2, '.'), "00:00:00.000")
+
+    def test_srt(self):
+        self.assertEqual(''.join(iter_subtitles(self.segments, 'srt')), (
+            "1\n00:00:01,500 --> 01:01:01,250\nHello\n\n"
+            "2\n01:06:42,000 --> 01:06:43,000\nBye\n\n"))
+
+    def test_vtt(self):
+        self.assertEqual(''.join(iter_subtitles(self.segments, 'vtt')), (
+            "WEBVTT\n\n"
+            "00:00:01.500 --> 01:01:01.250\nHello\n\n"
+            "01:06:42.000 --> 01:06:43.000\nBye\n\n"))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            list(iter_subtitles(self.segments, 'ass'))
+
+
+class ProcessPoolTests(SimpleTestCase):
+
+    def tearDown(self):
+        if transcoding._pool is not None:
+            transcoding._pool.shutdown()
+            transcoding._pool = None
+
+    def test_broken_pool_is_replaced(self):
+        with self.assertRaises(BrokenProcessPool):
+            # The worker dies on the task and again on the retry
+            transcoding.run_in_pool(1, os._exit, 1)
+        self.assertEqual(transcoding.run_in_pool(1, abs, -3), 3)
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class SegmentTimeline:
+    """
+    Timed segments of a transcript, held as arrays rather than one row per
+    segment.
+
+    ``times`` is an (n, 2) float32 array of start and end seconds, sorted by
+    start, and ``texts`` the matching segment texts. On a model they are
+    stored as ``segment_times`` (the raw float32 bytes) and
+    ``segment_text`` (the texts, one per line).
+    """
+
+    def __init__(self, times=None, texts=()):
+        self.times = np.empty((0, 2), dtype=np.float32) if times is None else times
+        self.texts = list(texts)
+
+    @classmethod
+    def from_segments(cls, segments):
+        """
+        Build a timeline from (start, end, text) tuples in any order.
+        """
+        segments = sorted(segments, key=lambda segment: segment[0])
+        times = np.array([(start, end) for start, end, _ in segments],
+                         dtype=np.float32).reshape(-1, 2)
+        # Texts are stored one per line
+        return cls(times, [' '.join(text.split()) for _, _, text in segments])
+
+    @classmethod
+    def from_fields(cls, segment_times, segment_text):
+        times = np.frombuffer(bytes(segment_times or b''), dtype=np.float32).reshape(-1, 2)
+        return cls(times, segment_text.split('\n') if len(times) else [])
+
+    @classmethod
+    def from_model(cls, instance):
+        return cls.from_fields(instance.segment_times, instance.segment_text)
+
+    def to_fields(self):
+        return dict(segment_times=self.times.astype(np.float32).tobytes(),
+                    segment_text='\n'.join(self.texts))
+
+    def __len__(self):
+        return len(self.texts)
+
+    def shifted(self, offset):
+        return SegmentTimeline(self.times + np.float32(offset), self.texts)
+
+    def between(self, start=None, end=None):
+        """
+        Indices of the segments overlapping [start, end), found by binary
+        search over the start times and the running maximum of end times.
+        """
+        starts, ends = self.times[:, 0], self.times[:, 1]
+        first, last = 0, len(starts)
+        if start is not None and last:
+            first = int(np.searchsorted(np.maximum.accumulate(ends), start, side='right'))
+        if end is not None:
+            last = int(np.searchsorted(starts, end, side='left'))
+        if start is None:
+            return np.arange(first, last)
+        # Segments that started earlier may still overlap the range
+        return first + np.flatnonzero(ends[first:last] > start)
+
+    def segments(self, indices=None):
+        if indices is None:
+            indices = range(len(self))
+        for index in indices:
+            start, end = self.times[index]
+            yield dict(index=int(index), start=round(float(start), 3),
+                       end=round(float(end), 3), text=self.texts[index])
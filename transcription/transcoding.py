@@ -0,0 +1,75 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import ffmpeg
+
+# Output container, codec and content type of each speech format
+SPEECH_FORMATS = {
+    'mp3': dict(extension='mp3', acodec='libmp3lame', content_type='audio/mpeg'),
+    'opus': dict(extension='ogg', acodec='libopus', content_type='audio/ogg'),
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def transcode_file(source_path, output_path, speech_format, bitrate):
+    """
+    Re-encode ``source_path`` as 16 kHz mono speech audio at ``output_path``.
+    Runs in a worker process of the transcoding pool.
+    """
+    codec = SPEECH_FORMATS[speech_format]['acodec']
+    (
+        ffmpeg
+        .input(source_path)
+        .output(output_path, ac=1, ar=16000, acodec=codec, audio_bitrate=bitrate,
+                vn=None)
+        .overwrite_output()
+        .run(quiet=True)
+    )
+    return output_path
+
+
+def _get_pool(max_workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned rather than forked, so workers do not inherit the
+            # parent's threads and database connections
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def run_in_pool(max_workers, function, *args, **kwargs):
+    """
+    Run ``function`` in the shared process pool and wait for the result. At
+    most ``max_workers`` encodes run at once per process; callers beyond
+    that queue instead of competing for CPU.
+
+    A worker killed mid-task (ffmpeg or numpy running out of memory) breaks
+    the whole pool, so it is replaced and the task retried once.
+    """
+    global _pool
+    pool = _get_pool(max_workers)
+    try:
+        return pool.submit(function, *args, **kwargs).result()
+    except BrokenProcessPool as e:
+        print(f"Transcoding pool broken, starting a new one: {e}")
+        with _pool_lock:
+            # Another caller may have replaced it already
+            if _pool is pool:
+                _pool = None
+        pool.shutdown(wait=False)
+    return _get_pool(max_workers).submit(function, *args, **kwargs).result()
+
+
+def transcode(source_path, output_path, speech_format, bitrate, max_workers):
+    """
+    Transcode in the shared process pool and wait for the result.
+    """
+    return run_in_pool(
+        max_workers, transcode_file, source_path, output_path, speech_format, bitrate)
@@ -1,6 +1,10 @@
 from django.urls import path, include
-from .views import TranscriptionView
+from .views import TranscriptionSegmentsView, TranscriptionSubtitlesView, TranscriptionView
 
 
 urlpatterns = [
-    path('transcriptions/<str:audio_file_id>/', TranscriptionView.as_view(), name='create-transcription')]
+    path('transcriptions/<str:audio_file_id>/', TranscriptionView.as_view(), name='create-transcription'),
+    path('transcriptions/<str:audio_file_id>/segments/',
+         TranscriptionSegmentsView.as_view(), name='transcription-segments'),
+    path('transcriptions/<str:audio_file_id>/subtitles/<str:subtitle_format>/',
+         TranscriptionSubtitlesView.as_view(), name='transcription-subtitles')]
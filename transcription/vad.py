@@ -0,0 +1,285 @@
+import ffmpeg
+import numpy as np
+
+from .transcoding import SPEECH_FORMATS
+
+# Rate the audio is decoded at for analysis and trimming; Whisper resamples
+# everything to 16 kHz anyway
+SAMPLE_RATE = 16000
+
+# Frames decoded and analysed per block, so neither the samples nor their
+# float copy are held whole on long recordings
+BLOCK_FRAMES = 4096
+
+
+def iter_pcm(path, block_samples):
+    """
+    Decode an audio file to 16 kHz mono 16-bit samples, yielding them in
+    blocks of ``block_samples`` (the last one may be shorter), so a long
+    recording is never held in memory whole.
+    """
+    process = (
+        ffmpeg
+        .input(path)
+        .output('pipe:', format='s16le', acodec='pcm_s16le', ac=1, ar=SAMPLE_RATE)
+        .global_args('-loglevel', 'error', '-nostats')
+        .run_async(pipe_stdout=True)
+    )
+    try:
+        while True:
+            data = process.stdout.read(2 * block_samples)
+            if not data:
+                break
+            yield np.frombuffer(data, dtype=np.int16)
+    except BaseException:
+        process.kill()
+        raise
+    finally:
+        process.stdout.close()
+    if process.wait() != 0:
+        raise RuntimeError(f"Decoding audio failed with exit code {process.returncode}")
+
+
+def open_encoder(output_path, speech_format, bitrate):
+    """
+    Start an encoder that writes 16 kHz mono samples fed to its stdin as
+    ``speech_format`` at ``output_path``.
+    """
+    return (
+        ffmpeg
+        .input('pipe:', format='s16le', ac=1, ar=SAMPLE_RATE)
+        .output(output_path, ac=1, ar=SAMPLE_RATE,
+                acodec=SPEECH_FORMATS[speech_format]['acodec'], audio_bitrate=bitrate)
+        .overwrite_output()
+        .global_args('-loglevel', 'error', '-nostats')
+        .run_async(pipe_stdin=True)
+    )
+
+
+def decode_levels(path, frame_samples, pcm_output=None):
+    """
+    Return the level of each frame of an audio file, as frame_levels, and
+    its length in samples. The decoded samples are also written to
+    ``pcm_output`` if given.
+    """
+    levels = []
+    sample_count = 0
+    for block in iter_pcm(path, frame_samples * BLOCK_FRAMES):
+        levels.append(frame_levels(block, frame_samples))
+        sample_count += len(block)
+        if pcm_output is not None:
+            pcm_output.write(block.tobytes())
+    if not levels:
+        return np.empty(0, dtype=np.float32), 0
+    return np.concatenate(levels), sample_count
+
+
+def frame_levels(samples, frame_samples):
+    """
+    Return the RMS level of each frame of ``frame_samples`` samples in dBFS.
+    The last, partial frame is padded with silence.
+    """
+    count = -(-len(samples) // frame_samples)
+    levels = np.empty(count, dtype=np.float32)
+    for first in range(0, count, BLOCK_FRAMES):
+        last = min(count, first + BLOCK_FRAMES)
+        block = samples[first * frame_samples:last * frame_samples].astype(np.float32)
+        if len(block) < (last - first) * frame_samples:
+            block = np.pad(block, (0, (last - first) * frame_samples - len(block)))
+        frames = block.reshape(last - first, frame_samples) / 32768.0
+        power = np.einsum('ij,ij->i', frames, frames) / frame_samples
+        levels[first:last] = 10 * np.log10(np.maximum(power, 1e-10))
+    return levels
+
+
+def speech_threshold(levels, margin_db, min_threshold_db):
+    """
+    Level separating speech from silence: ``margin_db`` above the noise
+    floor, but no closer than ``margin_db`` to the level of loud speech, so
+    recordings with little silence keep their quieter words.
+    """
+    noise_floor, speech_level = np.percentile(levels, [10, 95])
+    return float(max(min_threshold_db,
+                     min(noise_floor + margin_db, speech_level - margin_db)))
+
+
+def detect_speech(levels, frame_seconds, threshold_db, min_speech_seconds,
+                  min_silence_seconds, padding_seconds):
+    """
+    Return speech regions as (start, end) frame index arrays.
+
+    Frames above ``threshold_db`` are speech. Bursts shorter than
+    ``min_speech_seconds`` (clicks, coughs) are dropped, each region is
+    widened by ``padding_seconds`` so word onsets and tails are kept, and
+    regions separated by less than ``min_silence_seconds`` are merged.
+    """
+    mask = np.concatenate(([False], levels > threshold_db, [False]))
+    edges = np.flatnonzero(np.diff(mask.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+
+    keep = ends - starts >= max(1, round(min_speech_seconds / frame_seconds))
+    starts, ends = starts[keep], ends[keep]
+    if not len(starts):
+        return starts, ends
+
+    padding = round(padding_seconds / frame_seconds)
+    starts = np.maximum(0, starts - padding)
+    ends = np.minimum(len(levels), ends + padding)
+
+    # A region is kept separate only after a long enough gap
+    separate = starts[1:] - ends[:-1] >= round(min_silence_seconds / frame_seconds)
+    starts = starts[np.concatenate(([True], separate))]
+    ends = ends[np.concatenate((separate, [True]))]
+    return starts, ends
+
+
+def speech_pieces(starts, ends, frame_samples, sample_count):
+    """
+    Return the TimeMap pieces for keeping the frames from ``starts`` up to
+    ``ends`` of a recording ``sample_count`` samples long.
+    """
+    pieces = []
+    trimmed_start = 0.0
+    for start, end in zip(starts * frame_samples,
+                          np.minimum(ends * frame_samples, sample_count)):
+        duration = (end - start) / SAMPLE_RATE
+        pieces.append((round(float(trimmed_start), 3), round(float(start) / SAMPLE_RATE, 3),
+                       round(float(duration), 3)))
+        trimmed_start += duration
+    return pieces
+
+
+class TimeMap:
+    """
+    Maps positions in trimmed audio back to the original recording.
+
+    The trimmed audio is the kept regions of the original played back to
+    back. ``pieces`` holds (trimmed_start, original_start, duration) for each
+    region, in seconds.
+    """
+
+    def __init__(self, pieces):
+        self.pieces = [tuple(piece) for piece in pieces]
+        self.trimmed_starts = np.array(
+            [piece[0] for piece in self.pieces], dtype=np.float64)
+
+    def to_original(self, seconds, end=False):
+        """
+        Map a position in the trimmed audio to the original recording. A
+        position exactly at a join maps to the start of the following
+        region, or with ``end`` to the end of the preceding one.
+        """
+        if not self.pieces:
+            return seconds
+        index = max(0, int(np.searchsorted(
+            self.trimmed_starts, seconds, side='left' if end else 'right')) - 1)
+        trimmed_start, original_start, duration = self.pieces[index]
+        return original_start + min(seconds - trimmed_start, duration)
+
+    @property
+    def joins(self):
+        """
+        Positions in the trimmed audio where a removed silence used to be.
+        """
+        return [piece[0] for piece in self.pieces[1:]]
+
+    def to_list(self):
+        return [list(piece) for piece in self.pieces]
+
+
+class SpeechTrim:
+    """
+    Outcome of trimming one recording.
+    """
+
+    def __init__(self, original_seconds, time_map):
+        self.original_seconds = original_seconds
+        self.time_map = time_map
+        self.trimmed_seconds = sum(piece[2] for piece in time_map.pieces)
+
+    @property
+    def removed_seconds(self):
+        return self.original_seconds - self.trimmed_seconds
+
+    @property
+    def silences(self):
+        # Pseudo silences at the joins, in the (start, end) form that
+        # plan_segments takes, so segment cuts land where audio was removed
+        return [(join, join) for join in self.time_map.joins]
+
+
+def encode_speech(source_path, output_path, speech_format, bitrate, frame_samples,
+                  starts, ends):
+    """
+    Encode the frames from ``starts`` up to ``ends`` of ``source_path`` as 16
+    kHz mono ``speech_format`` at ``output_path``, in one pass from the
+    original. The audio is cut into frames of ``frame_samples`` samples as it
+    is decoded, so frame numbers line up with those of decode_levels.
+    """
+    selected = '+'.join(
+        f"between(n,{start},{end - 1})" for start, end in zip(starts, ends))
+    audio = (
+        ffmpeg
+        .input(source_path)
+        .audio
+        .filter('aformat', sample_rates=SAMPLE_RATE, channel_layouts='mono')
+        .filter('asetnsamples', n=frame_samples, p=0)
+        .filter('aselect', selected)
+        .filter('asetpts', 'N/SR/TB')
+    )
+    (
+        ffmpeg
+        .output(audio, output_path, ac=1, ar=SAMPLE_RATE,
+                acodec=SPEECH_FORMATS[speech_format]['acodec'], audio_bitrate=bitrate)
+        .overwrite_output()
+        .global_args('-loglevel', 'error', '-nostats')
+        .run()
+    )
+
+
+def trim_silence(source_path, output_path, speech_format, bitrate, frame_seconds,
+                 margin_db, min_threshold_db, min_speech_seconds,
+                 min_silence_seconds, padding_seconds, min_removed_seconds=0,
+                 transcoded_path=None):
+    """
+    Cut the silent stretches out of ``source_path`` and encode the remaining
+    speech as 16 kHz mono ``speech_format`` at ``output_path``. Runs in a
+    worker process of the transcoding pool.
+
+    Returns a SpeechTrim, or None (and writes nothing to ``output_path``)
+    when the recording has no speech at all or trimming would remove less
+    than ``min_removed_seconds``. With ``transcoded_path``, the whole
+    recording is also encoded there from the samples decoded for analysis,
+    so it need not be decoded again when it is not trimmed.
+    """
+    frame_samples = round(frame_seconds * SAMPLE_RATE)
+    if transcoded_path is None:
+        levels, sample_count = decode_levels(source_path, frame_samples)
+    else:
+        encoder = open_encoder(transcoded_path, speech_format, bitrate)
+        try:
+            levels, sample_count = decode_levels(source_path, frame_samples, encoder.stdin)
+        except BaseException:
+            encoder.kill()
+            raise
+        finally:
+            encoder.stdin.close()
+        if encoder.wait() != 0:
+            raise RuntimeError(f"Encoding audio failed with exit code {encoder.returncode}")
+    if not len(levels):
+        return None
+
+    threshold = speech_threshold(levels, margin_db, min_threshold_db)
+    starts, ends = detect_speech(levels, frame_seconds, threshold, min_speech_seconds,
+                                 min_silence_seconds, padding_seconds)
+    if not len(starts):
+        return None
+
+    trim = SpeechTrim(sample_count / SAMPLE_RATE, TimeMap(
+        speech_pieces(starts, ends, frame_samples, sample_count)))
+    if trim.removed_seconds < min_removed_seconds:
+        return None
+
+    encode_speech(source_path, output_path, speech_format, bitrate, frame_samples,
+                  starts, ends)
+    return trim
@@ -1,28 +1,39 @@
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from meetingscribe.async_views import jwt_required
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .services import TranscriptionService
-from .serializers import TranscriptionSerializer
+from .serializers import (SegmentRangeQuerySerializer, TimedSegmentSerializer,
+                          TranscriptionSerializer)
+from .subtitles import SUBTITLE_FORMATS, iter_subtitles
+from files.services import AudioFileService
+from jobs.models import Job
+from jobs.services import JobService
+from jobs.serializers import JobSerializer
 
 
 class TranscriptionView(APIView):
 
     def post(self, request, audio_file_id):
         """
-        Create a transcription for an audio file.
-        POST /transcriptions/
+        Queue a transcription for an audio file.
+        POST /transcriptions/{audio_file_id}/
+        Poll the returned job at GET /jobs/{job_id}/.
         """
         try:
 
             user = request.user
-            transcription_service = TranscriptionService(user)
-            transcription = transcription_service.create_transcription(
-                audio_file_id)
+            # Fail fast on unknown files instead of queueing a doomed job
+            AudioFileService(user).get_audio_file_by_id(audio_file_id)
+            job = JobService(user).enqueue(
+                Job.KIND_TRANSCRIBE, audio_file_id=audio_file_id)
 
             return Response({
-                "message": "Transcription created successfully",
-                "data": transcription,
-            }, status=status.HTTP_201_CREATED)
+                "message": "Transcription queued",
+                "data": JobSerializer(job).data,
+            }, status=status.HTTP_202_ACCEPTED)
 
         except ValueError as e:
             return Response(
@@ -56,3 +67,91 @@ class TranscriptionView(APIView):
                 {"error": str(e)},
                 status=status.HTTP_404_NOT_FOUND
             )
+
+
+class TranscriptionSegmentsView(APIView):
+
+    def get(self, request, audio_file_id):
+        """
+        Retrieve the timed segments of a transcription that overlap a time
+        range, in seconds from the start of the original recording.
+        GET /transcriptions/{audio_file_id}/segments/?start=&end=
+        """
+        query_serializer = SegmentRangeQuerySerializer(data=request.query_params)
+        if not query_serializer.is_valid():
+            return Response(query_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        start = query_serializer.validated_data['start']
+        end = query_serializer.validated_data['end']
+
+        try:
+            timeline = TranscriptionService(request.user).get_timeline(audio_file_id)
+            segments = timeline.segments(timeline.between(start, end))
+            serializer = TimedSegmentSerializer(segments, many=True)
+
+            return Response({
+                "data": serializer.data,
+                "total_segments": len(timeline),
+            }, status=status.HTTP_200_OK)
+
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+
+class TranscriptionSubtitlesView(APIView):
+
+    def get(self, request, audio_file_id, subtitle_format):
+        """
+        Download a transcription as subtitles, streamed cue by cue.
+        GET /transcriptions/{audio_file_id}/subtitles/{srt|vtt}/?start=&end=
+        """
+        if subtitle_format not in SUBTITLE_FORMATS:
+            return Response(
+                {"error": "Subtitle format must be srt or vtt"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        query_serializer = SegmentRangeQuerySerializer(data=request.query_params)
+        if not query_serializer.is_valid():
+            return Response(query_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            timeline = TranscriptionService(request.user).get_timeline(audio_file_id)
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        indices = timeline.between(query_serializer.validated_data['start'],
+                                   query_serializer.validated_data['end'])
+        response = StreamingHttpResponse(
+            iter_subtitles(timeline.segments(indices), subtitle_format),
+            content_type=f"{SUBTITLE_FORMATS[subtitle_format]}; charset=utf-8")
+        response['Content-Disposition'] = (
+            f'attachment; filename="{audio_file_id}.{subtitle_format}"')
+        return response
+
+
+@require_POST
+@jwt_required
+async def transcribe_async(request, audio_file_id):
+    """
+    Transcribe an audio file within the request, without a background job.
+    POST /async/transcriptions/{audio_file_id}/
+    """
+    try:
+        transcription_service = TranscriptionService(request.user)
+        text = await transcription_service.acreate_transcription(audio_file_id)
+
+        return JsonResponse({
+            "message": "Transcription created successfully",
+            "data": {"audio_file_id": audio_file_id, "text": text},
+        }, status=status.HTTP_201_CREATED)
+
+    except ValueError as e:
+        return JsonResponse(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
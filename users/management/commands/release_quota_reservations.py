@@ -0,0 +1,20 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.models import QuotaReservation
+from users.services import UserQuotaService
+
+
+class Command(BaseCommand):
+    help = "Give back quota held by uploads that never finished"
+
+    def handle(self, *args, **options):
+        user_ids = QuotaReservation.objects.filter(
+            expires_at__lt=timezone.now()).values_list('user_id', flat=True).distinct()
+
+        minutes = 0
+        for user in User.objects.filter(id__in=list(user_ids)):
+            minutes += UserQuotaService(user).release_expired()
+
+        self.stdout.write(f"Released {minutes} reserved minute(s)")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userquota',
+            name='reserved_minutes',
+            field=models.PositiveIntegerField(default=0, help_text='Minutes held by uploads in progress'),
+        ),
+    ]
@@ -10,6 +10,8 @@ class UserQuota(models.Model):
         default=60, help_text="Maximum minutes of audio per month")
     used_minutes = models.PositiveIntegerField(
         default=0, help_text="Used minutes of audio this month")
+    reserved_minutes = models.PositiveIntegerField(
+        default=0, help_text="Minutes held by uploads in progress")
     reset_date = models.DateField(
         auto_now_add=True, help_text="Date when the quota resets")
     created_at = models.DateTimeField(
@@ -17,3 +19,28 @@ class UserQuota(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - Quota: {self.used_minutes}/{self.max_minutes} minutes"
+
+
+class QuotaReservation(models.Model):
+    """
+    Minutes held against a user's quota by one upload in progress. They are
+    counted in UserQuota.reserved_minutes until the upload commits or
+    releases them, or until the reservation expires and is swept, so a
+    worker that dies mid-upload cannot hold the quota for good.
+    """
+
+    user = models.ForeignKey(
+        AuthUser, on_delete=models.CASCADE, related_name='quota_reservations')
+    minutes = models.PositiveIntegerField(help_text="Minutes held")
+    expires_at = models.DateTimeField(
+        help_text="When the reservation is given back if still open")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.minutes} minutes reserved"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'expires_at'],
+                         name='users_reservation_expiry_idx'),
+        ]
@@ -1,9 +1,15 @@
 from .dtos import UserDTO
 from django.contrib.auth.models import User as AuthUser
-from .models import UserQuota
+from .models import QuotaReservation, UserQuota
+from django.conf import settings
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from datetime import timedelta, date
+import math
 
 
 class UserService:
@@ -98,24 +104,84 @@ class UserQuotaService:
         except UserQuota.DoesNotExist:
             return None
 
-    def update_quota(self, used_minutes):
+    def has_remaining(self):
+        self.release_expired()
         quota = self.get_quota()
-        if not quota:
-            raise ValueError("User quota does not exist")
+        return bool(quota) and quota.used_minutes + quota.reserved_minutes < quota.max_minutes
+
+    def reserve(self, minutes):
+        """
+        Hold ``minutes`` of quota, rounded up, for an upload in progress and
+        return the QuotaReservation. The check and the increment are a single
+        conditional UPDATE, so parallel uploads cannot overshoot the quota and
+        no row lock is held while the upload runs. Every reservation should
+        be followed by commit() or release(); one that is not is given back
+        after QUOTA_RESERVATION_TTL_MINUTES.
+        """
+        self.release_expired()
+        minutes = math.ceil(minutes)
+        with transaction.atomic():
+            reserved = UserQuota.objects.filter(
+                user=self.user,
+                max_minutes__gte=F('used_minutes') + F('reserved_minutes') + minutes
+            ).update(reserved_minutes=F('reserved_minutes') + minutes)
+            if not reserved:
+                raise ValueError("Audio file duration exceeds user's limit")
+            return QuotaReservation.objects.create(
+                user=self.user,
+                minutes=minutes,
+                expires_at=timezone.now() + timedelta(
+                    minutes=settings.QUOTA_RESERVATION_TTL_MINUTES)
+            )
 
-        quota.used_minutes += used_minutes
-        if quota.used_minutes > quota.max_minutes:
-            raise ValueError("Quota exceeded")
+    def commit(self, reservation):
+        """
+        Turn a reservation into used minutes. The minutes are used even if
+        the reservation already expired, as the upload went through.
+        """
+        with transaction.atomic():
+            held = self._close(reservation)
+            UserQuota.objects.filter(user=self.user).update(
+                reserved_minutes=Greatest(F('reserved_minutes') - held, 0),
+                used_minutes=F('used_minutes') + reservation.minutes
+            )
 
-        quota.save()
-        return quota
+    def release(self, reservation):
+        """
+        Give back a reservation whose upload failed.
+        """
+        with transaction.atomic():
+            held = self._close(reservation)
+            if held:
+                UserQuota.objects.filter(user=self.user).update(
+                    reserved_minutes=Greatest(F('reserved_minutes') - held, 0))
+
+    def release_expired(self):
+        """
+        Give back the user's reservations that outlived their upload.
+        """
+        with transaction.atomic():
+            # Skipped rows are being closed by their upload right now
+            expired = list(QuotaReservation.objects.select_for_update(skip_locked=True).filter(
+                user=self.user, expires_at__lt=timezone.now()).values_list('id', 'minutes'))
+            if not expired:
+                return 0
+            QuotaReservation.objects.filter(id__in=[id for id, _ in expired]).delete()
+            minutes = sum(minutes for _, minutes in expired)
+            UserQuota.objects.filter(user=self.user).update(
+                reserved_minutes=Greatest(F('reserved_minutes') - minutes, 0))
+        return minutes
+
+    def _close(self, reservation):
+        # Deleting the row decides who gives the minutes back, so a
+        # reservation is never returned twice
+        deleted, _ = QuotaReservation.objects.filter(id=reservation.id).delete()
+        return reservation.minutes if deleted else 0
 
     def reset_quota(self):
-        quota = self.get_quota()
-        if not quota:
+        # A plain UPDATE, so reservations made meanwhile are not overwritten
+        updated = UserQuota.objects.filter(user=self.user).update(
+            used_minutes=0, reset_date=date.today())
+        if not updated:
             raise ValueError("User quota does not exist")
-
-        quota.used_minutes = 0
-        quota.reset_date = date.today()
-        quota.save()
-        return quota
+        return self.get_quota()